@@ -1,11 +1,12 @@
 import streamlit as st
 import os
 import json
-import sqlite3
 import pandas as pd
-from datetime import datetime
-import speech_recognition as sr
-import google.generativeai as genai
+import ses_analizi
+import ses_bolutleme
+import gemini_istemcisi as genai
+import konu_katalogu
+import gemini_siniri
 
 # --- 2. AYARLAR ---
 # Şifreyi kodun içine YAZMIYORUZ. Streamlit Secrets'tan çekiyoruz.
@@ -19,31 +20,8 @@ except Exception as e:
     st.error(f"API Key hatası: {e}")
 
 # --- 3. VERİTABANI ---
-def init_db():
-    conn = sqlite3.connect('okul_sinav.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sonuclar (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ad_soyad TEXT,
-            sinif_no TEXT,
-            konu TEXT,
-            konusma_metni TEXT,
-            puan_100luk INTEGER,
-            detaylar TEXT,
-            tarih DATETIME
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def sonuc_kaydet(ad, no, konu, metin, puan, detaylar):
-    conn = sqlite3.connect('okul_sinav.db')
-    c = conn.cursor()
-    c.execute("INSERT INTO sonuclar (ad_soyad, sinif_no, konu, konusma_metni, puan_100luk, detaylar, tarih) VALUES (?, ?, ?, ?, ?, ?, ?)",
-              (ad, no, konu, metin, puan, json.dumps(detaylar, ensure_ascii=False), datetime.now()))
-    conn.commit()
-    conn.close()
+# Bağlantı, pragmalar, indeksler ve şema göçleri sinav_db modülünde
+from sinav_db import init_db, sonuc_kaydet, ogrenci_gecmisi
 
 # --- 4. EXCEL OKUMA ---
 def konulari_getir():
@@ -51,37 +29,25 @@ def konulari_getir():
     if not os.path.exists(dosya_yolu):
         return {}
     try:
-        df = pd.read_excel(dosya_yolu, engine='openpyxl')
-        df.columns = df.columns.str.strip()
-        required_cols = ['Konu', 'Giriş', 'Gelişme', 'Sonuç']
-        if all(col in df.columns for col in required_cols):
-            df = df.dropna(subset=['Konu'])
-            konu_sozlugu = {}
-            for index, row in df.iterrows():
-                konu_sozlugu[row['Konu']] = {
-                    'Giriş': row['Giriş'], 'Gelişme': row['Gelişme'], 'Sonuç': row['Sonuç']
-                }
-            return konu_sozlugu
-        return {}
+        # Çalışma kitabı sadece değiştiğinde yeniden ayrıştırılır
+        return konu_katalogu.katalog_yukle(dosya_yolu)
     except Exception:
         return {}
 
 # --- 5. SES VE AI ---
 def sesi_metne_cevir(audio_file):
-    r = sr.Recognizer()
+    # Kayıt sessizliklerden bölünüp parçalar aynı anda tanınır (bkz. ses_bolutleme)
     try:
-        with sr.AudioFile(audio_file) as source:
-            audio_data = r.record(source)
-            text = r.recognize_google(audio_data, language="tr-TR")
-            return text
-    except sr.UnknownValueError:
-        return "Ses anlaşılamadı."
+        text, _ = ses_bolutleme.metne_cevir(audio_file.getvalue(), ses_bolutleme.GoogleTaniyici("tr-TR"))
+        return text if text else "Ses anlaşılamadı."
     except Exception as e:
         return f"Hata: {str(e)}"
 
-def yapay_zeka_puanla_ve_duzelt(konu, detaylar, ham_metin):
+def yapay_zeka_puanla_ve_duzelt(konu, detaylar, ham_metin, ozellikler=None):
     try:
         model = genai.GenerativeModel('gemini-flash-latest')
+        # Kayıttan yerel olarak ölçülen süre, duraklama ve konuşma hızı Akıcılık için verilir
+        ses_olcumleri = f"SES ÖLÇÜMLERİ: {ses_analizi.istem_metni(ozellikler)}" if ozellikler else ""
         
         prompt = f"""
         Sen bir Türkçe öğretmenisin.
@@ -91,6 +57,7 @@ def yapay_zeka_puanla_ve_duzelt(konu, detaylar, ham_metin):
         SONUÇ: {detaylar['Sonuç']}
         
         ÖĞRENCİ METNİ: {ham_metin}
+        {ses_olcumleri}
         
         GÖREV:
         1. Metni noktalama ve imla kurallarına göre düzelt.
@@ -98,7 +65,7 @@ def yapay_zeka_puanla_ve_duzelt(konu, detaylar, ham_metin):
            - Konu ve İçerik
            - Düzen
            - Dili Kullanma
-           - Akıcılık
+           - Akıcılık (ses ölçümleri verildiyse onları nesnel veri olarak kullan)
         
         SADECE JSON VER:
         {{
@@ -109,7 +76,8 @@ def yapay_zeka_puanla_ve_duzelt(konu, detaylar, ham_metin):
             "ogretmen_yorumu": "Yorumun"
         }}
         """
-        response = model.generate_content(prompt)
+        # Kota sınırı ve geçici hatalarda tekrar deneme main.py ile ortak
+        response = gemini_siniri.cagir(lambda: model.generate_content(prompt), "sinav", len(prompt) // 3 + gemini_siniri.ISTEM_JETONU)
         text = response.text.replace("```json", "").replace("```", "")
         return json.loads(text)
     except Exception as e:
@@ -130,6 +98,12 @@ with col_center:
     with c1: ad_soyad = st.text_input("Adı Soyadı")
     with c2: sinif_no = st.text_input("Sınıf / Numara")
     
+    if ad_soyad and sinif_no:
+        gecmis = ogrenci_gecmisi(ad_soyad, sinif_no)
+        if gecmis:
+            with st.expander(f"Önceki Sınavlar ({len(gecmis)})"):
+                st.dataframe(pd.DataFrame(gecmis)[["tarih", "konu", "puan_100luk"]], hide_index=True, use_container_width=True)
+    
     st.markdown("<br>", unsafe_allow_html=True)
     konular = konulari_getir()
     secilen_konu = None
@@ -188,13 +162,17 @@ with col_center:
 
     if ses_kaydi and secilen_konu:
         if st.button("Bitir ve Puanla", type="primary", use_container_width=True):
+            # Boş, sessiz, kırpılmış veya çok kısa kayıt tanımaya ve modele gönderilmeden reddedilir
+            on_analiz = ses_analizi.analiz_et(ses_kaydi.getvalue())
             if not ad_soyad:
                 st.error("Ad Soyad giriniz!")
+            elif on_analiz and on_analiz["sorun"]:
+                st.error(on_analiz["sorun"])
             else:
                 with st.spinner("Puanlanıyor..."):
                     ham_metin = sesi_metne_cevir(ses_kaydi)
                     if ham_metin and "anlaşılamadı" not in ham_metin:
-                        sonuc = yapay_zeka_puanla_ve_duzelt(secilen_konu, konular[secilen_konu], ham_metin)
+                        sonuc = yapay_zeka_puanla_ve_duzelt(secilen_konu, konular[secilen_konu], ham_metin, on_analiz)
                         
                         duzeltilmis = sonuc.get("duzeltilmis_metin", ham_metin)
                         puan = sonuc.get("yuzluk_sistem_puani", 0)
@@ -0,0 +1,101 @@
+import json
+
+# --- ARTIMLI JSON OKUYUCU ---
+# Model cevabı parça parça gelirken en üst düzey JSON nesnesinin alanlarını çıkarır.
+# Tamamlanan alanlar (ör. kriter_puanlari) hemen, yazılmakta olan metin alanı (ör. transkript)
+# geldiği kadarıyla okunabilir. Nihai sonuç yine tüm metin üzerinden json.loads ile alınır.
+
+
+def _kacis_mi(ham, konum):
+    """ham[konum] konumundaki ters bölü bir kaçış dizisi başlatıyor mu (kendisi kaçırılmamış mı)?"""
+    onceki = ham[:konum]
+    return (len(onceki) - len(onceki.rstrip("\\"))) % 2 == 0
+
+
+def _kismi_dizge(ham):
+    """Yarım kalmış bir JSON dizgesinin o ana kadarki çözülmüş hali."""
+    # Sonda yarım kaçış dizisi varsa (\ veya eksik \uXXXX) onu dışarıda bırak
+    sondaki = len(ham) - len(ham.rstrip("\\"))
+    if sondaki % 2:
+        ham = ham[:-1]
+    u = ham.rfind("\\u")
+    if u != -1 and len(ham) - u < 6 and _kacis_mi(ham, u):
+        ham = ham[:u]
+    # Vekil çiftin (emoji vb.) yalnızca ilk yarısı geldiyse onu da beklet
+    u = ham.rfind("\\u")
+    if u != -1 and len(ham) - u == 6 and _kacis_mi(ham, u) and ham[u + 2:u + 4].lower() in ("d8", "d9", "da", "db"):
+        ham = ham[:u]
+    try:
+        return json.loads(f'"{ham}"')
+    except ValueError:
+        return ham
+
+
+class ArtimliJson:
+    def __init__(self):
+        self.tampon = ""
+        self.alanlar = {}
+        self._i = 0
+        self._derinlik = 0
+        self._dizgide = False
+        self._kacis = False
+        self._anahtar_basi = None
+        self._anahtar = None
+        self._deger_basi = None
+
+    def _alani_bitir(self, son):
+        ham = self.tampon[self._deger_basi:son].strip()
+        try:
+            self.alanlar[self._anahtar] = json.loads(ham)
+        except ValueError:
+            pass
+        self._anahtar = None
+        self._deger_basi = None
+
+    def besle(self, parca):
+        """Yeni gelen metni işler ve bu parçayla tamamlanan alanların adlarını döndürür."""
+        self.tampon += parca
+        tamamlanan = []
+        tampon = self.tampon
+        for i in range(self._i, len(tampon)):
+            c = tampon[i]
+            if self._dizgide:
+                if self._kacis:
+                    self._kacis = False
+                elif c == "\\":
+                    self._kacis = True
+                elif c == '"':
+                    self._dizgide = False
+                    if self._anahtar_basi is not None:
+                        self._anahtar = json.loads(tampon[self._anahtar_basi:i + 1])
+                        self._anahtar_basi = None
+                continue
+
+            if self._derinlik == 1 and self._anahtar is not None and self._deger_basi is None and c not in " \t\r\n:":
+                self._deger_basi = i
+
+            if c == '"':
+                self._dizgide = True
+                if self._derinlik == 1 and self._anahtar is None and self._deger_basi is None:
+                    self._anahtar_basi = i
+            elif c in "{[":
+                self._derinlik += 1
+            elif c in "}]":
+                if self._derinlik == 1 and self._deger_basi is not None:
+                    ad = self._anahtar
+                    self._alani_bitir(i)
+                    tamamlanan.append(ad)
+                self._derinlik = max(0, self._derinlik - 1)
+            elif c == "," and self._derinlik == 1 and self._deger_basi is not None:
+                ad = self._anahtar
+                self._alani_bitir(i)
+                tamamlanan.append(ad)
+        self._i = len(tampon)
+        return tamamlanan
+
+    def durum(self):
+        """Tamamlanan alanlar + (varsa) yazılmakta olan dizge alanının şimdiye kadarki hali."""
+        sonuc = dict(self.alanlar)
+        if self._dizgide and self._derinlik == 1 and self._deger_basi is not None and self._anahtar is not None:
+            sonuc[self._anahtar] = _kismi_dizge(self.tampon[self._deger_basi + 1:])
+        return sonuc
@@ -0,0 +1,117 @@
+"""
+Soğuk açılış profili: main.py'nin ilk çiziminde içe aktarılan modüller ve süreleri.
+
+    python benchmark/acilis_profili.py                  # rapor + bütçe kontrolü
+    python benchmark/acilis_profili.py --butce-ms 800 --ilk 25
+
+Yeni bir Python süreci `-X importtime` ile başlatılır. Streamlit sunucunun kendisi her durumda yüklü olduğu için
+ölçüm dışında tutulur. main.py, streamlit.testing.v1.AppTest ile bir kez (giriş ekranı, yönetici girişi yok) çalıştırılır.
+Rapor, bu ilk çalıştırmada yüklenen paketleri kendi içe aktarma sürelerine göre sıralar.
+
+Kontroller:
+  - ilk çalıştırmanın duvar saati süresi --butce-ms'i geçmemeli
+  - AGIR_PAKETLER'den hiçbiri ilk çizimde yüklenmemeli (ilk kullanımda yüklenmeleri gerekir)
+Kontrollerden biri başarısız olursa çıkış kodu 1'dir.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+KOK = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ISARET = "--- ILK CIZIM ---"
+BUTCE_MS = 1000
+AGIR_PAKETLER = ["google.generativeai", "gspread", "oauth2client", "pandas", "openpyxl"]
+
+
+def _ic_olcum():
+    """Alt süreçte çalışır: Streamlit yüklendikten sonra main.py'yi bir kez çalıştırır."""
+    from streamlit.testing.v1 import AppTest
+
+    onceki = set(sys.modules)
+    print(ISARET, file=sys.stderr, flush=True)
+    baslangic = time.perf_counter()
+    at = AppTest.from_file(os.path.join(KOK, "main.py"), default_timeout=120).run()
+    sure = time.perf_counter() - baslangic
+    print(json.dumps({
+        "sure_ms": round(sure * 1000, 1),
+        "hata": [str(e.value) for e in at.exception],
+        "yeni_moduller": sorted(set(sys.modules) - onceki),
+    }))
+
+
+def importtime_ayristir(satirlar):
+    """'import time: self | cumulative | ad' satırlarından {modül: kendi süresi (µs)}."""
+    sureler = {}
+    for satir in satirlar:
+        if not satir.startswith("import time:") or "self [us]" in satir:
+            continue
+        try:
+            kendi, _, ad = satir[len("import time:"):].split("|")
+            sureler[ad.strip()] = int(kendi)
+        except ValueError:
+            continue
+    return sureler
+
+
+def paket_toplamlari(sureler):
+    toplam = {}
+    for ad, us in sureler.items():
+        paket = ad.split(".")[0]
+        if paket == "google" and ad.count("."):
+            paket = ".".join(ad.split(".")[:2])
+        toplam[paket] = toplam.get(paket, 0) + us
+    return sorted(toplam.items(), key=lambda x: -x[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--butce-ms", type=float, default=BUTCE_MS, help="ilk çalıştırma için izin verilen süre")
+    parser.add_argument("--ilk", type=int, default=15, help="raporda gösterilecek paket sayısı")
+    parser.add_argument("--ic", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.ic:
+        _ic_olcum()
+        return
+
+    ortam = dict(os.environ, KONUSMA_VERI_KLASORU=tempfile.mkdtemp(prefix="konusma_acilis_"))
+    islem = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--ic"],
+        cwd=KOK, env=ortam, capture_output=True, text=True
+    )
+    if islem.returncode != 0 or not islem.stdout.strip():
+        print(islem.stderr[-3000:], file=sys.stderr)
+        sys.exit(islem.returncode or 1)
+    sonuc = json.loads(islem.stdout.strip().splitlines()[-1])
+    hata_satirlari = islem.stderr.split(ISARET, 1)
+    sureler = importtime_ayristir(hata_satirlari[1].splitlines() if len(hata_satirlari) > 1 else [])
+
+    print(f"İlk çalıştırma: {sonuc['sure_ms']:.0f} ms (bütçe {args.butce_ms:.0f} ms)")
+    print(f"Bu sırada içe aktarma: {sum(sureler.values()) / 1000:.0f} ms, {len(sureler)} modül\n")
+    print(f"{'Paket':<32}{'ms':>10}")
+    for paket, us in paket_toplamlari(sureler)[:args.ilk]:
+        print(f"{paket:<32}{us / 1000:>10.1f}")
+
+    yuklenen_agir = [p for p in AGIR_PAKETLER if p in sonuc["yeni_moduller"]]
+    basarisiz = []
+    if sonuc["hata"]:
+        basarisiz.append(f"main.py hata verdi: {sonuc['hata']}")
+    if sonuc["sure_ms"] > args.butce_ms:
+        basarisiz.append(f"ilk çalıştırma bütçeyi aştı ({sonuc['sure_ms']:.0f} > {args.butce_ms:.0f} ms)")
+    if yuklenen_agir:
+        basarisiz.append(f"ilk çizimde yüklenmemesi gereken paket(ler): {', '.join(yuklenen_agir)}")
+
+    print()
+    for satir in basarisiz:
+        print(f"BAŞARISIZ: {satir}")
+    if basarisiz:
+        sys.exit(1)
+    print("Soğuk açılış bütçesi içinde.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Çevrimdışı performans ölçümü.
+
+Gemini ve Google Sheets yerine benchmark/sahte_servisler.py'deki taklitler kullanılır;
+main.py ve Sinav.py streamlit.testing.v1.AppTest ile çalıştırılır.
+
+    python benchmark/calistir.py                 # tüm ölçümler
+    python benchmark/calistir.py --hizli         # küçük tablolarla kısa tur
+    python benchmark/calistir.py --oturum 30 --model-gecikme 1.5
+
+Her çalıştırmanın sonucu benchmark/sonuclar.jsonl dosyasına eklenir ve bir önceki
+çalıştırmayla karşılaştırılır; ESIK'ten fazla kötüleşen ölçümler işaretlenir.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+KOK = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SONUC_DOSYASI = os.path.join(KOK, "benchmark", "sonuclar.jsonl")
+ESIK = 0.20  # %20'den fazla kötüleşme gerileme sayılır
+
+sys.path.insert(0, KOK)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["KONUSMA_VERI_KLASORU"] = tempfile.mkdtemp(prefix="konusma_bench_")
+# Uygulamanın kendi verimi ölçülür; gerçek kota davranışı için GEMINI_DAKIKALIK_ISTEK elle verilebilir
+os.environ.setdefault("GEMINI_DAKIKALIK_ISTEK", "100000")
+
+import numpy as np  # noqa: E402
+
+import sahte_servisler  # noqa: E402
+
+
+def yuzdelikler(sureler):
+    ms = np.array(sureler) * 1000
+    return {
+        "adet": len(ms),
+        "ortalama_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def ornek_wav(tohum, saniye=5, hiz=48000):
+    rng = np.random.default_rng(tohum)
+    t = np.arange(int(saniye * hiz)) / hiz
+    ses = 0.3 * np.sin(2 * np.pi * (180 + tohum % 50) * t) + 0.02 * rng.standard_normal(len(t))
+    stereo = np.stack([ses, ses], axis=1)
+    tampon = io.BytesIO()
+    with wave.open(tampon, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(hiz)
+        w.writeframes((stereo * 32767).astype("<i2").tobytes())
+    return tampon.getvalue()
+
+
+def yerel_durumu_sifirla():
+    """Her ölçüm boş yerel depolarla başlasın diye veri klasörünü ve açık bağlantıları yeniler."""
+    import yerel_depo
+    yerel_depo.VERI_KLASORU = tempfile.mkdtemp(prefix="konusma_bench_")
+    for ad in ("sonuc_indeksi", "sonuc_kuyrugu", "puanlama_isleri", "sonuc_onbellegi"):
+        modul = sys.modules.get(ad)
+        if modul is not None:
+            modul._conn = None
+    if "sonuc_onbellegi" in sys.modules:
+        sys.modules["sonuc_onbellegi"]._bellek.clear()
+
+
+def uygulama(dosya):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(KOK, dosya), default_timeout=300)
+    for anahtar, deger in sahte_servisler.SIRLAR.items():
+        at.secrets[anahtar] = deger
+    return at
+
+
+# --- ÖLÇÜMLER ---
+def olc_yeniden_calistirma(dosya, tekrar):
+    """Ad alanına her harf girişinde betiğin baştan sona çalışma süresi."""
+    at = uygulama(dosya)
+    at.run()
+    sureler = []
+    for i in range(tekrar):
+        at.main.text_input[0].input(f"Öğrenci {i}")
+        t = time.perf_counter()
+        at.run()
+        sureler.append(time.perf_counter() - t)
+    if at.exception:
+        raise RuntimeError(f"{dosya}: {at.exception[0].value}")
+    return yuzdelikler(sureler)
+
+
+def olc_parcalar(tekrar):
+    """
+    Sınav ekranında ad alanı değişince tam sayfa yerine sadece kimlik parçası çalışır (main.py olculu_parca).
+    AppTest parçaları tek başına çalıştıramaz; parça süreleri tam çalıştırmalar sırasında olcum'a yazılanlardan okunur.
+    """
+    import olcum
+    at = uygulama("main.py")
+    at.run()
+    for i in range(tekrar):
+        at.main.text_input[0].input(f"Öğrenci {i}")
+        at.run()
+    asamalar = olcum.ozet()["asamalar"]
+    return {
+        ad: {"p50_ms": asamalar[ad]["p50_ms"], "p95_ms": asamalar[ad]["p95_ms"]}
+        for ad in ("sayfa_sinav_ekrani", "parca_kimlik", "parca_konu", "parca_kayit", "parca_sonuc") if ad in asamalar
+    }
+
+
+def olc_hak_kontrolu(boyutlar, tekrar=3):
+    """Sınıf ve numara girildiğindeki yeniden çalıştırma süresi, tablo büyüklüğüne göre."""
+    import pandas as pd
+    sonuc = {}
+    for boyut in boyutlar:
+        sahte_servisler.SAYFA.doldur(boyut)
+        yerel_durumu_sifirla()
+        at = uygulama("main.py")
+        at.run()
+        at.main.selectbox[0].select("5/C")
+        at.main.text_input[1].input("1")
+        t = time.perf_counter()
+        at.run()
+        ilk = time.perf_counter() - t
+
+        sicak = []
+        for i in range(tekrar):
+            at.main.text_input[0].input(f"Ad {i}")
+            t = time.perf_counter()
+            at.run()
+            sicak.append(time.perf_counter() - t)
+
+        # Karşılaştırma için eski yöntem: tüm tabloyu indirip pandas ile süzmek
+        t = time.perf_counter()
+        df = pd.DataFrame(sahte_servisler.SAYFA.get_all_records())
+        df["Okul No"] = df["Okul No"].astype(str)
+        len(df[(df["Sınıf"] == "5/C") & (df["Okul No"] == "1")])
+        eski = time.perf_counter() - t
+
+        sonuc[str(boyut)] = {
+            "ilk_ms": round(ilk * 1000, 2),
+            "sicak_ms": round(float(np.mean(sicak)) * 1000, 2),
+            "eski_yontem_ms": round(eski * 1000, 2),
+        }
+    return sonuc
+
+
+def olc_puanlama(tekrar):
+    """Tek bir puanlamanın (hazırlama, yükleme, bekleme, model, ayrıştırma) uçtan uca süresi."""
+    import puanlama
+    sureler = []
+    for i in range(tekrar):
+        veri = ornek_wav(i)
+        t = time.perf_counter()
+        puanlama.sesi_analiz_et(veri, "Teknoloji Bağımlılığı", {"Giriş": "a", "Gelişme": "b", "Sonuç": "c"})
+        sureler.append(time.perf_counter() - t)
+    return yuzdelikler(sureler)
+
+
+def olc_es_zamanli(oturum_sayisi):
+    """N oturum aynı anda gönderdiğinde iş kuyruğunun verimi ve işlerin bitiş süreleri."""
+    import puanlama_isleri
+    yerel_durumu_sifirla()
+    kayitlar = [ornek_wav(1000 + i) for i in range(oturum_sayisi)]
+    t = time.perf_counter()
+    isler = [
+        puanlama_isleri.gonder(f"oturum-{i}", f"Öğrenci {i}", "5/C", str(i), "Teknoloji Bağımlılığı",
+                               {"Giriş": "a", "Gelişme": "b", "Sonuç": "c"}, kayitlar[i])
+        for i in range(oturum_sayisi)
+    ]
+    bitenler = {}
+    while len(bitenler) < len(isler):
+        for is_id in isler:
+            if is_id not in bitenler:
+                is_ = puanlama_isleri.is_getir(is_id)
+                if is_["durum"] in (puanlama_isleri.TAMAMLANDI, puanlama_isleri.HATA):
+                    bitenler[is_id] = is_
+        time.sleep(0.05)
+    toplam = time.perf_counter() - t
+    sonuc = yuzdelikler([is_["bitis"] - is_["olusturma"] for is_ in bitenler.values()])
+    sonuc["toplam_sn"] = round(toplam, 2)
+    sonuc["is_per_sn"] = round(oturum_sayisi / toplam, 3)
+    sonuc["hatali"] = sum(1 for is_ in bitenler.values() if is_["durum"] == puanlama_isleri.HATA)
+    return sonuc
+
+
+# --- KAYIT VE KARŞILAŞTIRMA ---
+def _duzlestir(d, onek=""):
+    for k, v in d.items():
+        anahtar = f"{onek}.{k}" if onek else k
+        if isinstance(v, dict):
+            yield from _duzlestir(v, anahtar)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield anahtar, v
+
+
+def _onceki_sonuc():
+    try:
+        with open(SONUC_DOSYASI, encoding="utf-8") as f:
+            satirlar = [s for s in f if s.strip()]
+        return json.loads(satirlar[-1]) if satirlar else None
+    except OSError:
+        return None
+
+
+def karsilastir(onceki, simdiki):
+    eski = dict(_duzlestir(onceki["olcumler"]))
+    gerilemeler = []
+    print(f"\nÖnceki çalıştırma ile karşılaştırma ({onceki['zaman']}, {onceki.get('surum', '?')}):")
+    for anahtar, deger in _duzlestir(simdiki["olcumler"]):
+        if anahtar not in eski or not eski[anahtar] or anahtar.endswith("adet"):
+            continue
+        degisim = (deger - eski[anahtar]) / eski[anahtar]
+        # is_per_sn için büyük değer iyidir, diğerleri süre
+        kotulesme = -degisim if anahtar.endswith("is_per_sn") else degisim
+        isaret = "  ⚠ GERİLEME" if kotulesme > ESIK else ""
+        if isaret:
+            gerilemeler.append(anahtar)
+        print(f"  {anahtar:55s} {eski[anahtar]:>10} → {deger:>10}  ({degisim:+.0%}){isaret}")
+    return gerilemeler
+
+
+def _surum():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=KOK, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hizli", action="store_true", help="küçük tablolar ve az tekrar")
+    parser.add_argument("--boyutlar", default="100,1000,10000", help="hak kontrolü için tablo satır sayıları")
+    parser.add_argument("--tekrar", type=int, default=20, help="yeniden çalıştırma ve puanlama tekrar sayısı")
+    parser.add_argument("--oturum", type=int, default=30, help="eş zamanlı oturum sayısı")
+    parser.add_argument("--model-gecikme", type=float, default=sahte_servisler.AYARLAR["model_gecikme"])
+    parser.add_argument("--sheets-gecikme", type=float, default=sahte_servisler.AYARLAR["sheets_gecikme"])
+    parser.add_argument("--kaydetme", action="store_true", help="sonucu sonuclar.jsonl'e ekleme")
+    args = parser.parse_args()
+
+    if args.hizli:
+        args.boyutlar, args.tekrar, args.oturum = "100,1000", 5, 8
+
+    sahte_servisler.kur(model_gecikme=args.model_gecikme, sheets_gecikme=args.sheets_gecikme)
+    os.chdir(KOK)
+
+    olcumler = {}
+    print("Yeniden çalıştırma süresi ölçülüyor...")
+    olcumler["yeniden_calistirma"] = {d: olc_yeniden_calistirma(d, args.tekrar) for d in ("main.py", "Sinav.py")}
+    olcumler["parcalar"] = olc_parcalar(args.tekrar)
+    print("Sınav hakkı kontrolü ölçülüyor...")
+    olcumler["hak_kontrolu"] = olc_hak_kontrolu([int(b) for b in args.boyutlar.split(",")])
+    print("Puanlama süresi ölçülüyor...")
+    olcumler["puanlama"] = olc_puanlama(args.tekrar)
+    print(f"{args.oturum} eş zamanlı oturum ölçülüyor...")
+    olcumler["es_zamanli"] = olc_es_zamanli(args.oturum)
+
+    sonuc = {
+        "zaman": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "surum": _surum(),
+        "ayarlar": dict(sahte_servisler.AYARLAR, tekrar=args.tekrar, oturum=args.oturum),
+        "olcumler": olcumler,
+        "cagri_sayilari": dict(sahte_servisler.SAYACLAR),
+    }
+    print(json.dumps(sonuc, ensure_ascii=False, indent=2))
+
+    onceki = _onceki_sonuc()
+    gerilemeler = karsilastir(onceki, sonuc) if onceki else []
+    if not args.kaydetme:
+        with open(SONUC_DOSYASI, "a", encoding="utf-8") as f:
+            f.write(json.dumps(sonuc, ensure_ascii=False) + "\n")
+    if gerilemeler:
+        print(f"\n{len(gerilemeler)} ölçümde gerileme var.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+
+# --- SAHTE SERVİSLER ---
+# Ölçümlerin canlı Gemini ve Google Sheets'e gitmeden yapılabilmesi için yerel taklitler.
+# kur() çağrıldığında google.generativeai, gspread ve oauth2client modüllerinin yerine geçer;
+# bu yüzden uygulama modüllerinden ÖNCE çağrılmalıdır.
+
+AYARLAR = {
+    "sheets_gecikme": 0.05,     # her Sheets çağrısı için saniye
+    "yukleme_gecikme": 0.2,     # upload_file
+    "isleme_turu": 1,           # kaç get_file çağrısından sonra ACTIVE olur
+    "model_gecikme": 0.8,       # generate_content ortalaması
+    "model_sapma": 0.3,         # gecikmeye eklenen rastgele pay (± oran)
+    "ilk_parca_orani": 0.3,     # stream=True: ilk parçanın gecikmenin ne kadarında geldiği
+    "parca_boyutu": 40,         # stream=True: parça başına karakter
+}
+
+SAYACLAR = {}
+_sayac_kilidi = threading.Lock()
+
+
+def _say(ad):
+    with _sayac_kilidi:
+        SAYACLAR[ad] = SAYACLAR.get(ad, 0) + 1
+
+
+def _bekle(sure):
+    if sure > 0:
+        time.sleep(sure)
+
+
+def ornek_cevap():
+    return {
+        "transkript": "Teknoloji hayatımızın her alanında yer alıyor. " * 20,
+        "kriter_puanlari": {"konu_icerik": 3, "duzen": 2, "dil": 3, "akicilik": 2},
+        "yuzluk_sistem_puani": 83,
+        "ogretmen_yorumu": "Planına uyarak akıcı bir konuşma yaptın, tebrikler.",
+    }
+
+
+def _cevap_metni(contents):
+    """İstemin istediği JSON biçiminde cevap: tek kayıt, sadece transkript veya toplu puanlama."""
+    istem = contents[-1] if isinstance(contents, list) else contents
+    kimlikler = re.findall(r"### ogrenci_id: (\S+)", istem)
+    cevap = ornek_cevap()
+    if kimlikler:
+        del cevap["transkript"]
+        return json.dumps({"sonuclar": [dict(cevap, ogrenci_id=k) for k in kimlikler]}, ensure_ascii=False)
+    if '"kriter_puanlari"' not in istem:
+        return json.dumps({"transkript": cevap["transkript"]}, ensure_ascii=False)
+    return json.dumps(cevap, ensure_ascii=False)
+
+
+# --- GEMINI ---
+class _Durum:
+    def __init__(self, ad):
+        self.name = ad
+
+
+class SahteDosya:
+    _sira = itertools.count(1)
+
+    def __init__(self, boyut):
+        self.name = f"files/sahte-{next(self._sira)}"
+        self.boyut = boyut
+        self.kalan_tur = AYARLAR["isleme_turu"]
+        self.state = _Durum("PROCESSING" if self.kalan_tur > 0 else "ACTIVE")
+
+
+_dosyalar = {}
+
+
+def upload_file(path, mime_type=None, **kwargs):
+    _say("upload_file")
+    veri = path.read() if hasattr(path, "read") else open(path, "rb").read()
+    _bekle(AYARLAR["yukleme_gecikme"])
+    dosya = SahteDosya(len(veri))
+    _dosyalar[dosya.name] = dosya
+    return dosya
+
+
+def get_file(name):
+    _say("get_file")
+    dosya = _dosyalar[name]
+    dosya.kalan_tur -= 1
+    if dosya.kalan_tur <= 0:
+        dosya.state = _Durum("ACTIVE")
+    return dosya
+
+
+def delete_file(name):
+    _say("delete_file")
+    _dosyalar.pop(getattr(name, "name", name), None)
+
+
+class _Cevap:
+    def __init__(self, text):
+        self.text = text
+
+
+class GenerativeModel:
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        _say("generate_content")
+        sapma = AYARLAR["model_sapma"]
+        gecikme = AYARLAR["model_gecikme"] * random.uniform(1 - sapma, 1 + sapma)
+        metin = _cevap_metni(contents)
+        if stream:
+            return self._akis(metin, gecikme)
+        _bekle(gecikme)
+        return _Cevap(metin)
+
+    @staticmethod
+    def _akis(metin, gecikme):
+        """Toplam gecikme korunarak cevabı parçalar halinde verir."""
+        boyut = AYARLAR["parca_boyutu"]
+        parcalar = [metin[i:i + boyut] for i in range(0, len(metin), boyut)]
+        ilk = gecikme * AYARLAR["ilk_parca_orani"]
+        _bekle(ilk)
+        for parca in parcalar:
+            yield _Cevap(parca)
+            _bekle((gecikme - ilk) / len(parcalar))
+
+
+def _genai_modulu():
+    m = types.ModuleType("google.generativeai")
+    m.configure = lambda **kwargs: None
+    m.upload_file = upload_file
+    m.get_file = get_file
+    m.delete_file = delete_file
+    m.GenerativeModel = GenerativeModel
+    return m
+
+
+# --- GOOGLE SHEETS ---
+BASLIK = ["Tarih", "Ad Soyad", "Sınıf", "Okul No", "Konu", "Puan", "Puan Detayları", "Transkript", "Öğretmen Yorumu"]
+
+
+class SahteSayfa:
+    def __init__(self):
+        self.satirlar = [list(BASLIK)]
+        self._kilit = threading.Lock()
+
+    def doldur(self, satir_sayisi, sinif_listesi=("5/C", "5/D", "5/E", "6/D", "8/D")):
+        with self._kilit:
+            self.satirlar = [list(BASLIK)]
+            for i in range(satir_sayisi):
+                self.satirlar.append([
+                    f"2026-0{i % 9 + 1}-1{i % 10} 10:00", f"Öğrenci {i}", sinif_listesi[i % len(sinif_listesi)],
+                    str(i // len(sinif_listesi) + 1), "Teknoloji Bağımlılığı", str(40 + i % 60),
+                    "İçerik: 2 | Düzen: 2 | Dil: 2 | Akıcılık: 2", "Metin " * 100, "Yorum",
+                ])
+
+    def row_values(self, i):
+        _say("row_values")
+        _bekle(AYARLAR["sheets_gecikme"])
+        with self._kilit:
+            return list(self.satirlar[i - 1]) if len(self.satirlar) >= i else []
+
+    def col_values(self, j):
+        _say("col_values")
+        _bekle(AYARLAR["sheets_gecikme"])
+        with self._kilit:
+            return [r[j - 1] if len(r) >= j else "" for r in self.satirlar]
+
+    def get_all_records(self):
+        _say("get_all_records")
+        # Gerçek API'de süre satır sayısıyla büyür
+        _bekle(AYARLAR["sheets_gecikme"] * (1 + len(self.satirlar) / 1000))
+        with self._kilit:
+            baslik = self.satirlar[0]
+            return [dict(zip(baslik, r)) for r in self.satirlar[1:]]
+
+    def get_values(self, aralik):
+        _say("get_values")
+        baslangic = int("".join(c for c in aralik.split(":")[0] if c.isdigit()))
+        with self._kilit:
+            satirlar = [list(r) for r in self.satirlar[baslangic - 1:]]
+        _bekle(AYARLAR["sheets_gecikme"] * (1 + len(satirlar) / 1000))
+        return satirlar
+
+    def _ekle(self, rows):
+        with self._kilit:
+            ilk = len(self.satirlar) + 1
+            self.satirlar.extend(list(r) for r in rows)
+            son = len(self.satirlar)
+        return {"updates": {"updatedRange": f"Sayfa1!A{ilk}:J{son}"}}
+
+    def append_row(self, row, **kwargs):
+        _say("append_row")
+        _bekle(AYARLAR["sheets_gecikme"])
+        return self._ekle([row])
+
+    def append_rows(self, rows, **kwargs):
+        _say("append_rows")
+        _bekle(AYARLAR["sheets_gecikme"])
+        return self._ekle(rows)
+
+    def update_cell(self, i, j, deger):
+        _say("update_cell")
+        _bekle(AYARLAR["sheets_gecikme"])
+        with self._kilit:
+            while len(self.satirlar) < i:
+                self.satirlar.append([])
+            satir = self.satirlar[i - 1]
+            satir.extend([""] * (j - len(satir)))
+            satir[j - 1] = deger
+
+
+SAYFA = SahteSayfa()
+
+
+class _Tablo:
+    sheet1 = SAYFA
+
+
+class _Istemci:
+    def open(self, ad):
+        _say("open")
+        _bekle(AYARLAR["sheets_gecikme"])
+        return _Tablo()
+
+
+def _gspread_modulu():
+    m = types.ModuleType("gspread")
+    m.authorize = lambda creds: _Istemci()
+    return m
+
+
+def _oauth_modulleri():
+    paket = types.ModuleType("oauth2client")
+    hesap = types.ModuleType("oauth2client.service_account")
+
+    class ServiceAccountCredentials:
+        @classmethod
+        def from_json_keyfile_dict(cls, info, scope):
+            return cls()
+
+    hesap.ServiceAccountCredentials = ServiceAccountCredentials
+    paket.service_account = hesap
+    return paket, hesap
+
+
+def _konusma_tanima_yamala():
+    """Sinav.py'deki recognize_google çağrısını yerel gecikmeli bir taklitle değiştirir."""
+    try:
+        import speech_recognition as sr
+    except ImportError:
+        return
+
+    def recognize_google(self, audio_data, language=None, **kwargs):
+        _say("recognize_google")
+        _bekle(AYARLAR["model_gecikme"])
+        return "teknoloji hayatımızı kolaylaştırıyor"
+
+    sr.Recognizer.recognize_google = recognize_google
+
+
+def kur(**ayarlar):
+    AYARLAR.update(ayarlar)
+    sys.modules["google.generativeai"] = _genai_modulu()
+    sys.modules["gspread"] = _gspread_modulu()
+    paket, hesap = _oauth_modulleri()
+    sys.modules["oauth2client"] = paket
+    sys.modules["oauth2client.service_account"] = hesap
+    _konusma_tanima_yamala()
+
+
+SIRLAR = {
+    "GOOGLE_API_KEY": "sahte-anahtar",
+    "gcp_service_account": {"private_key": "sahte\\nanahtar", "client_email": "sahte@example.com"},
+}
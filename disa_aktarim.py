@@ -0,0 +1,100 @@
+import csv
+import io
+import re
+import tempfile
+from datetime import datetime
+
+import sonuc_indeksi
+from tembel_yukleme import tembel_modul
+
+openpyxl = tembel_modul("openpyxl")
+
+# --- DIŞA AKTARIM ---
+# Dönem sonu not listeleri: her sınıf için ayrı sayfa içeren Excel veya tek bir CSV.
+# Satırlar yerel indeksten parça parça okunur; Excel yalnızca yazma (write_only) kipinde oluşturulur,
+# çıktı bellekte büyümek yerine belli bir boyuttan sonra geçici dosyaya taşınır.
+# Bellekte yalnızca indirilecek son dosyanın baytları tutulur (Streamlit indirmeyi bayt olarak sunar).
+
+PARCA_BOYUTU = 500
+BELLEK_SINIRI = 8 * 1024 ** 2  # bayt; bundan büyük çıktı diske yazılır
+BASLIKLAR = ["Tarih", "Ad Soyad", "Sınıf", "Okul No", "Konu", "Puan", "İçerik", "Düzen", "Dil", "Akıcılık", "Öğretmen Yorumu"]
+
+
+def _tam(deger):
+    return int(deger) if isinstance(deger, float) and deger.is_integer() else deger
+
+
+def _satir(kayit, transkript):
+    degerler = [
+        kayit["tarih"], kayit["ad_soyad"], kayit["sinif"], kayit["okul_no"], kayit["konu"],
+        *(_tam(kayit[s]) for s in sonuc_indeksi.SAYISAL_ALANLAR),
+        kayit["yorum"],
+    ]
+    if transkript:
+        degerler.append(kayit["transkript"])
+    return degerler
+
+
+def _basliklar(transkript):
+    return BASLIKLAR + (["Transkript"] if transkript else [])
+
+
+def csv_parcalari(transkript=False, **filtreler):
+    """CSV içeriğini metin parçaları halinde üretir (Excel'in Türkçe karakterleri tanıması için BOM ile başlar)."""
+    tampon = io.StringIO()
+    yazici = csv.writer(tampon)
+    tampon.write("\ufeff")
+    yazici.writerow(_basliklar(transkript))
+    for i, kayit in enumerate(sonuc_indeksi.disa_aktarim_satirlari(transkript, PARCA_BOYUTU, **filtreler), start=1):
+        yazici.writerow(_satir(kayit, transkript))
+        if i % PARCA_BOYUTU == 0:
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue()
+
+
+def _sayfa_adi(sinif, kullanilan):
+    """Excel sayfa adları '/' gibi karakterleri içeremez ve en fazla 31 karakterdir."""
+    ad = re.sub(r"[\\/*?:\[\]]", "-", sinif or "Sınıfsız")[:31] or "Sınıfsız"
+    aday, n = ad, 2
+    while aday in kullanilan:
+        aday = f"{ad[:28]}({n})"
+        n += 1
+    kullanilan.add(aday)
+    return aday
+
+
+def xlsx_yaz(hedef, transkript=False, **filtreler):
+    """Her sınıf için bir sayfa içeren çalışma kitabını hedef dosya nesnesine yazar."""
+    kitap = openpyxl.Workbook(write_only=True)
+    sayfa, onceki_sinif, kullanilan = None, None, set()
+    for kayit in sonuc_indeksi.disa_aktarim_satirlari(transkript, PARCA_BOYUTU, **filtreler):
+        if sayfa is None or kayit["sinif"] != onceki_sinif:
+            onceki_sinif = kayit["sinif"]
+            sayfa = kitap.create_sheet(_sayfa_adi(onceki_sinif, kullanilan))
+            sayfa.append(_basliklar(transkript))
+        sayfa.append(_satir(kayit, transkript))
+    if sayfa is None:
+        kitap.create_sheet("Sonuçlar").append(_basliklar(transkript))
+    kitap.save(hedef)
+
+
+def xlsx_verisi(transkript=False, **filtreler):
+    """İndirme için hazır Excel dosyasının baytları."""
+    with tempfile.SpooledTemporaryFile(max_size=BELLEK_SINIRI) as hedef:
+        xlsx_yaz(hedef, transkript, **filtreler)
+        hedef.seek(0)
+        return hedef.read()
+
+
+def csv_verisi(transkript=False, **filtreler):
+    with tempfile.SpooledTemporaryFile(max_size=BELLEK_SINIRI) as hedef:
+        for parca in csv_parcalari(transkript, **filtreler):
+            hedef.write(parca.encode("utf-8"))
+        hedef.seek(0)
+        return hedef.read()
+
+
+def dosya_adi(uzanti):
+    return f"sinav_sonuclari_{datetime.now():%Y%m%d_%H%M}.{uzanti}"
@@ -0,0 +1,42 @@
+import threading
+
+from tembel_yukleme import tembel_modul
+
+# --- GEMINI İSTEMCİSİ ---
+# google.generativeai için ince bir cephe: `import gemini_istemcisi as genai` ile aynı adlar kullanılır.
+# configure() yalnızca anahtarı saklar; SDK ilk gerçek çağrıda (upload_file, GenerativeModel, ...) yüklenir
+# ve o anda yapılandırılır. Böylece sayfa ilk çizilirken SDK içe aktarılmaz.
+
+_sdk = tembel_modul("google.generativeai")
+_kilit = threading.Lock()
+_ayarlar = {}
+_yapilandirildi = False
+
+
+def configure(**ayarlar):
+    global _yapilandirildi
+    with _kilit:
+        _ayarlar.update(ayarlar)
+        _yapilandirildi = False
+        if _sdk.yuklendi_mi:
+            _sdk.configure(**_ayarlar)
+            _yapilandirildi = True
+
+
+def _hazir_sdk():
+    global _yapilandirildi
+    if not _yapilandirildi:
+        with _kilit:
+            if not _yapilandirildi:
+                if _ayarlar:
+                    _sdk.configure(**_ayarlar)
+                _yapilandirildi = True
+    return _sdk
+
+
+def yuklendi_mi():
+    return _sdk.yuklendi_mi
+
+
+def __getattr__(ad):
+    return getattr(_hazir_sdk(), ad)
@@ -0,0 +1,247 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import olcum
+import ortak_durum
+
+# --- GEMINI HIZ SINIRI ---
+# Bütün oturumların Gemini çağrıları süreç genelinde tek bir sınırlayıcıdan geçer:
+# dakikalık istek ve jeton (token) kotası için iki jeton kovası ve oturumlar arasında adil (sıralı) bir kuyruk.
+# Bir sınıf aynı anda gönderdiğinde istekler kota hatasına düşmek yerine sırayla ve kotanın izin verdiği hızda gider.
+# Kota (429) ve sunucu (5xx) hataları yedek sonuca düşmeden önce rastgele paylı üstel beklemeyle tekrar denenir.
+# Kovalar ve kota hatası sonrası duraklama ortak_durum deposundadır; birden çok sunucu süreci aynı
+# dakikalık kotayı paylaşır. Oturumlar arası sıra her sürecin kendi içindedir.
+
+DAKIKALIK_ISTEK = int(os.environ.get("GEMINI_DAKIKALIK_ISTEK", "15"))
+DAKIKALIK_JETON = int(os.environ.get("GEMINI_DAKIKALIK_JETON", "1000000"))
+# Kova kapasitesi dakikalık kotanın bu kadarıdır; ani yığılmalarda bile bir dakikada kotanın çok üstüne çıkılmaz
+PATLAMA_ORANI = 1 / 6
+DENEME_SAYISI = 5
+TABAN_BEKLEME = 2      # saniye
+AZAMI_BEKLEME = 60     # saniye
+SES_JETON_SANIYE = 32  # Gemini ses kaydının her saniyesini ~32 jeton sayar
+ISTEM_JETONU = 1500    # istem metni + beklenen cevap için pay
+
+_GECICI_HATALAR = {
+    "ResourceExhausted", "TooManyRequests", "InternalServerError", "ServiceUnavailable",
+    "BadGateway", "GatewayTimeout", "DeadlineExceeded",
+}
+
+
+def tahmini_jeton(sure):
+    """Ses süresinden (saniye) bir puanlama isteğinin yaklaşık jeton tüketimi."""
+    return int((sure or 60) * SES_JETON_SANIYE) + ISTEM_JETONU
+
+
+def kota_hatasi_mi(e):
+    return getattr(e, "code", None) == 429 or type(e).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+def gecici_hata_mi(e):
+    kod = getattr(e, "code", None)
+    return kota_hatasi_mi(e) or (isinstance(kod, int) and 500 <= kod < 600) or type(e).__name__ in _GECICI_HATALAR
+
+
+class _Kova:
+    def __init__(self, dakikalik):
+        self.kapasite = max(1.0, dakikalik * PATLAMA_ORANI)
+        self.hiz = dakikalik / 60
+        self.miktar = self.kapasite
+        self.son = time.monotonic()
+
+    def doldur(self, simdi):
+        self.miktar = min(self.kapasite, self.miktar + (simdi - self.son) * self.hiz)
+        self.son = simdi
+
+    def bekleme(self, miktar, sinirla=True):
+        """
+        miktar kadar jetonun birikmesi için geçmesi gereken süre.
+        sinirla: tek bir alım; kapasiteyi aşan istekler kapasiteye yuvarlanır (yoksa hiç geçemezler).
+        Sıra tahmininde miktar öndeki isteklerin toplamıdır ve yuvarlanmaz.
+        """
+        return max(0.0, ((min(miktar, self.kapasite) if sinirla else miktar) - self.miktar) / self.hiz)
+
+    def harca(self, miktar):
+        self.miktar -= min(miktar, self.kapasite)
+
+
+class _YerelKota:
+    """Süreç içi istek ve jeton kovaları (tek süreçli kullanım ve ölçümler için)."""
+
+    def __init__(self, dakikalik_istek, dakikalik_jeton):
+        self._istek = _Kova(dakikalik_istek)
+        self._jeton = _Kova(dakikalik_jeton)
+        self._duraklama = 0.0      # kota hatasından sonra bu zamana kadar kimseye izin verilmez
+
+    def _bekleme(self, istek, jeton, sinirla):
+        simdi = time.monotonic()
+        self._istek.doldur(simdi)
+        self._jeton.doldur(simdi)
+        return max(self._istek.bekleme(istek, sinirla), self._jeton.bekleme(jeton, sinirla), self._duraklama - simdi)
+
+    def bekleme(self, istek, jeton):
+        """istek kadar istek ve jeton kadar jeton birikene kadarki tahmini süre (sıradaki yer için)."""
+        return self._bekleme(istek, jeton, sinirla=False)
+
+    def al(self, jeton):
+        bekleme = self._bekleme(1, jeton, sinirla=True)
+        if bekleme <= 0:
+            self._istek.harca(1)
+            self._jeton.harca(jeton)
+        return bekleme
+
+    def duraklat(self, sure):
+        self._duraklama = max(self._duraklama, time.monotonic() + sure)
+
+
+class _OrtakKota:
+    """Kovalar ortak depoda; alma ve duraklatma bütün süreçler için atomiktir."""
+
+    AD = "gemini"
+
+    def __init__(self, depo, dakikalik_istek, dakikalik_jeton):
+        self._depo = depo
+        self._kovalar = [(ad, max(1.0, d * PATLAMA_ORANI), d / 60) for ad, d in (("istek", dakikalik_istek), ("jeton", dakikalik_jeton))]
+
+    def _istekler(self, istek, jeton):
+        return [(ad, miktar, kapasite, hiz) for (ad, kapasite, hiz), miktar in zip(self._kovalar, (istek, jeton))]
+
+    def bekleme(self, istek, jeton):
+        return self._depo.kova_tahmin(self.AD, self._istekler(istek, jeton))
+
+    def al(self, jeton):
+        return self._depo.kova_al(self.AD, self._istekler(1, jeton))
+
+    def duraklat(self, sure):
+        self._depo.duraklat(self.AD, sure)
+
+
+class _Bekleyen:
+    def __init__(self, oturum, jeton):
+        self.oturum = oturum
+        self.jeton = jeton
+
+
+class Sinirlayici:
+    """
+    Oturum başına FIFO kuyruklar ve oturumlar arasında sırayla (round-robin) dağıtım.
+    Bir oturum çok sayıda iş gönderse bile diğer oturumların işleri araya girer.
+    """
+
+    def __init__(self, dakikalik_istek=DAKIKALIK_ISTEK, dakikalik_jeton=DAKIKALIK_JETON, depo=None):
+        self._kosul = threading.Condition()
+        # depo verilirse kovalar süreçler arasında paylaşılır
+        self._kota = _YerelKota(dakikalik_istek, dakikalik_jeton) if depo is None else _OrtakKota(depo, dakikalik_istek, dakikalik_jeton)
+        self._kuyruklar = {}       # oturum -> deque[_Bekleyen]
+        self._sira = deque()       # sırası gelecek oturumlar
+
+    def _siradaki(self):
+        return self._kuyruklar[self._sira[0]][0] if self._sira else None
+
+    def _tahmin(self, bekleyen):
+        """Bekleyenin genel sıradaki yeri (1'den başlar) ve tahmini bekleme süresi."""
+        once_istek, once_jeton = 0, 0
+        for tur, oturum in enumerate(self._sira):
+            for i, b in enumerate(self._kuyruklar[oturum]):
+                if b is bekleyen:
+                    benim = (i, tur)
+        for tur, oturum in enumerate(self._sira):
+            for i, b in enumerate(self._kuyruklar[oturum]):
+                if (i, tur) < benim:
+                    once_istek += 1
+                    once_jeton += b.jeton
+        return once_istek + 1, self._kota.bekleme(once_istek + 1, once_jeton + bekleyen.jeton)
+
+    def _cikar(self, bekleyen):
+        kuyruk = self._kuyruklar[bekleyen.oturum]
+        bas_mi = kuyruk[0] is bekleyen
+        kuyruk.remove(bekleyen)
+        if self._sira[0] == bekleyen.oturum and bas_mi:
+            # Sırası kullanılan oturum sona geçer
+            self._sira.popleft()
+            if kuyruk:
+                self._sira.append(bekleyen.oturum)
+        if not kuyruk:
+            del self._kuyruklar[bekleyen.oturum]
+            if bekleyen.oturum in self._sira:
+                self._sira.remove(bekleyen.oturum)
+
+    def al(self, oturum, jeton=0, bildir=None):
+        """
+        Sıra gelip kotada yer açılana kadar bekler.
+        bildir(sira, tahmini_bekleme_saniye) beklerken sıra veya tahmin değiştikçe çağrılır.
+        """
+        bekleyen = _Bekleyen(oturum, jeton)
+        with self._kosul:
+            if oturum not in self._kuyruklar:
+                self._kuyruklar[oturum] = deque()
+                self._sira.append(oturum)
+            self._kuyruklar[oturum].append(bekleyen)
+        baslangic = time.perf_counter()
+        son_bildirim = None
+        try:
+            while True:
+                with self._kosul:
+                    if self._siradaki() is bekleyen and self._kota.al(jeton) <= 0:
+                        self._cikar(bekleyen)
+                        self._kosul.notify_all()
+                        break
+                    sira, bekleme = self._tahmin(bekleyen)
+                if bildir is not None and (sira, round(bekleme)) != son_bildirim:
+                    son_bildirim = (sira, round(bekleme))
+                    bildir(sira, bekleme)
+                with self._kosul:
+                    self._kosul.wait(timeout=min(max(bekleme, 0.05), 1.0))
+        except BaseException:
+            with self._kosul:
+                self._cikar(bekleyen)
+                self._kosul.notify_all()
+            raise
+        beklenen = time.perf_counter() - baslangic
+        if beklenen > 0.01:
+            olcum.kaydet("kota_bekleme", beklenen)
+
+    def duraklat(self, sure):
+        """Kota hatası alındığında herkesin isteklerini bir süre durdurur."""
+        with self._kosul:
+            self._kota.duraklat(sure)
+
+    def bekleyen_sayisi(self):
+        with self._kosul:
+            return sum(len(k) for k in self._kuyruklar.values())
+
+
+_sinirlayici = Sinirlayici(depo=ortak_durum.depo())
+
+
+def bekleyen_sayisi():
+    return _sinirlayici.bekleyen_sayisi()
+
+
+def cagir(islem, oturum=None, jeton=0, bildir=None, sinirla=True):
+    """
+    islem()'i (Gemini çağrısı) sınırlayıcıdan geçirerek çalıştırır; geçici hatalarda tekrar dener.
+    sinirla=False ise yalnızca tekrar deneme uygulanır (dosya yükleme/sorgulama gibi model kotası dışındaki çağrılar).
+    bildir(sira, bekleme): sıra beklerken sira bir sayı, hata sonrası beklerken None'dır.
+    """
+    for deneme in range(DENEME_SAYISI):
+        if sinirla:
+            _sinirlayici.al(oturum or "genel", jeton, bildir)
+        try:
+            return islem()
+        except Exception as e:
+            if not gecici_hata_mi(e) or deneme == DENEME_SAYISI - 1:
+                raise
+            bekleme = min(AZAMI_BEKLEME, TABAN_BEKLEME * 2 ** deneme) * random.uniform(0.5, 1.5)
+            olcum.say("gemini_tekrar")
+            if bildir is not None:
+                bildir(None, bekleme)
+            if sinirla and kota_hatasi_mi(e):
+                # Bekleme sınırlayıcıda yapılır; bu sürede diğer oturumlar da istek göndermez
+                _sinirlayici.duraklat(bekleme)
+                olcum.say("gemini_kota_hatasi")
+            else:
+                time.sleep(bekleme)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+
+from tembel_yukleme import tembel_modul
+
+# Derlenmiş JSON geçerliyken pandas hiç yüklenmez
+pd = tembel_modul("pandas")
+
+# --- KONU KATALOĞU ---
+# konusma_konulari.xlsx her yeniden çalıştırmada tekrar okunmaz.
+# Çalışma kitabı sadece değiştiğinde (mtime/boyut, gerekirse içerik özeti) ayrıştırılır;
+# sonuç yanına JSON olarak yazılır ve tüm oturumlar süreç içindeki aynı kopyayı kullanır.
+
+SUTUNLAR = ['Konu', 'Giriş', 'Gelişme', 'Sonuç']
+
+_kilit = threading.Lock()
+_kataloglar = {}  # dosya yolu -> (imza, konular)
+
+
+def derlenmis_yol(dosya_yolu):
+    return dosya_yolu + ".katalog.json"
+
+
+def _hizli_imza(dosya_yolu):
+    st = os.stat(dosya_yolu)
+    return {"mtime_ns": st.st_mtime_ns, "boyut": st.st_size}
+
+
+def _ozet(dosya_yolu):
+    h = hashlib.sha256()
+    with open(dosya_yolu, "rb") as f:
+        for parca in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(parca)
+    return h.hexdigest()
+
+
+def excelden_derle(dosya_yolu):
+    """
+    Çalışma kitabını okuyup {konu: {'Giriş', 'Gelişme', 'Sonuç'}} sözlüğüne çevirir.
+    Gerekli sütunlardan biri yoksa ValueError fırlatır (çağıran yedek konu listesine düşer).
+    """
+    df = pd.read_excel(dosya_yolu, engine='openpyxl')
+    df.columns = df.columns.astype(str).str.strip()
+    eksik = [col for col in SUTUNLAR if col not in df.columns]
+    if eksik:
+        raise ValueError(f"{dosya_yolu}: eksik sütun(lar): {', '.join(eksik)}")
+    df = df.dropna(subset=['Konu']).drop_duplicates(subset=['Konu'], keep='last')
+    return df.set_index('Konu')[SUTUNLAR[1:]].fillna("").to_dict(orient='index')
+
+
+def _derlenmisi_oku(dosya_yolu):
+    try:
+        with open(derlenmis_yol(dosya_yolu), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _derlenmisi_yaz(dosya_yolu, imza, konular):
+    hedef = derlenmis_yol(dosya_yolu)
+    gecici = f"{hedef}.{os.getpid()}.tmp"
+    try:
+        with open(gecici, "w", encoding="utf-8") as f:
+            json.dump({"imza": imza, "konular": konular}, f, ensure_ascii=False, default=str)
+        os.replace(gecici, hedef)
+    except OSError:
+        # Klasör yazılamıyorsa sadece bellekteki kopya kullanılır
+        pass
+
+
+def katalog_yukle(dosya_yolu="konusma_konulari.xlsx", zorla=False):
+    """
+    Konu kataloğunu döndürür. zorla=True ise çalışma kitabı her durumda yeniden ayrıştırılır.
+    Dosya yoksa FileNotFoundError, gerekli sütunlar eksikse ValueError fırlatır.
+    """
+    imza = _hizli_imza(dosya_yolu)
+    with _kilit:
+        onceki = _kataloglar.get(dosya_yolu)
+        if not zorla and onceki and onceki[0]["mtime_ns"] == imza["mtime_ns"] and onceki[0]["boyut"] == imza["boyut"]:
+            return onceki[1]
+
+        derlenmis = None if zorla else _derlenmisi_oku(dosya_yolu)
+        if derlenmis and all(derlenmis["imza"].get(k) == v for k, v in imza.items()):
+            imza = derlenmis["imza"]
+            konular = derlenmis["konular"]
+        else:
+            imza["sha256"] = _ozet(dosya_yolu)
+            if derlenmis and derlenmis["imza"].get("sha256") == imza["sha256"]:
+                # Dosyaya dokunulmuş ama içerik aynı: ayrıştırmaya gerek yok
+                konular = derlenmis["konular"]
+            else:
+                konular = excelden_derle(dosya_yolu)
+            # Boş katalog diske yazılmaz; çalışma kitabı düzeltilince tekrar ayrıştırılır
+            if konular:
+                _derlenmisi_yaz(dosya_yolu, imza, konular)
+
+        _kataloglar[dosya_yolu] = (imza, konular)
+        return konular
@@ -1,14 +1,28 @@
 import streamlit as st
 import os
-import json
-import pandas as pd
-from datetime import datetime
-import google.generativeai as genai
+import gemini_istemcisi as genai
+import tablo_istemcisi
+from tembel_yukleme import tembel_modul
+import konu_katalogu
+import olcum
+import sonuc_indeksi
+import sonuc_kuyrugu
+import puanlama_isleri
+import gemini_siniri
+import puanlama_hatti
+import ortak_durum
+import disa_aktarim
+import functools
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import io
-import openpyxl 
+import uuid
+
+# Tam sayfa çalıştırmasının süresi Performans sayfasında parça çalıştırmalarıyla karşılaştırılır
+_calistirma_baslangic = time.perf_counter()
+
+# pandas sadece tablo gösteren sayfalarda yüklenir; giriş ekranı beklemez
+pd = tembel_modul("pandas")
+# numpy ilk kayıt gönderildiğinde yüklenir
+ses_analizi = tembel_modul("ses_analizi")
 
 # --- 1. AYARLAR ---
 st.set_page_config(page_title="Konuşma Sınavı Sistemi", layout="wide", page_icon="🎓")
@@ -18,6 +32,7 @@ ADMIN_SIFRESI = "ts527001"
 try:
     if "GOOGLE_API_KEY" in st.secrets:
         os.environ["GOOGLE_API_KEY"] = st.secrets["GOOGLE_API_KEY"]
+        # Anahtar saklanır; SDK ilk puanlamada yüklenip yapılandırılır
         genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
 except Exception as e:
     st.error("API Key bulunamadı.")
@@ -26,44 +41,32 @@ except Exception as e:
 
 @st.cache_resource
 def get_gcp_creds():
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    info = dict(st.secrets["gcp_service_account"])
-    info["private_key"] = info["private_key"].replace("\\n", "\n")
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(info, scope)
-    return creds
+    return tablo_istemcisi.kimlik_bilgisi(st.secrets["gcp_service_account"])
+
+def get_sheet():
+    return tablo_istemcisi.sayfa_ac(get_gcp_creds())
 
 def save_to_sheet(data_list):
     """
-    Sonuçları Google Sheets'e kaydeder.
+    Sonucu yerel günlüğe yazar; tabloya aktarım arka planda toplu olarak yapılır.
+    Öğrenci Google Sheets'i beklemez, tablo geçici olarak erişilemezse kayıt kaybolmaz.
     """
     try:
-        creds = get_gcp_creds()
-        client = gspread.authorize(creds)
-        
-        try:
-            sheet = client.open("Sinav_Sonuclari").sheet1
-        except:
-            st.error("HATA: Google Drive'da 'Sinav_Sonuclari' adında bir tablo bulunamadı.")
-            return
-
-        if not sheet.row_values(1):
-            sheet.append_row(["Tarih", "Ad Soyad", "Sınıf", "Okul No", "Konu", "Puan", "Puan Detayları", "Transkript", "Öğretmen Yorumu"])
-            
-        sheet.append_row(data_list)
-        
+        sonuc_kuyrugu.baslat(get_sheet)
+        with olcum.asama("kayit"):
+            sonuc_kuyrugu.ekle(data_list)
     except Exception as e:
         st.error(f"Veritabanı Kayıt Hatası: {str(e)}")
 
 def get_all_results():
     try:
-        creds = get_gcp_creds()
-        client = gspread.authorize(creds)
-        sheet = client.open("Sinav_Sonuclari").sheet1
-        data = sheet.get_all_records()
-        df = pd.DataFrame(data)
-        if "Sınıf" in df.columns and "Okul No" in df.columns:
-             df = df.sort_values(by=["Sınıf", "Okul No"])
-        return df
+        with olcum.asama("tum_sonuclar"):
+            sheet = get_sheet()
+            data = sheet.get_all_records()
+            df = pd.DataFrame(data)
+            if "Sınıf" in df.columns and "Okul No" in df.columns:
+                 df = df.sort_values(by=["Sınıf", "Okul No"])
+            return df
     except:
         return pd.DataFrame()
 
@@ -81,94 +84,240 @@ def konulari_getir():
         except: pass
 
     try:
-        df = pd.read_excel(dosya_yolu, engine='openpyxl')
-        konular_sozlugu = {}
-        for index, row in df.iterrows():
-            konular_sozlugu[row['Konu']] = {
-                'Giriş': row['Giriş'], 'Gelişme': row['Gelişme'], 'Sonuç': row['Sonuç']
-            }
-        return konular_sozlugu
+        # Çalışma kitabı sadece değiştiğinde yeniden ayrıştırılır
+        with olcum.asama("konu_katalogu"):
+            return konu_katalogu.katalog_yukle(dosya_yolu)
     except:
         return {'Teknoloji Bağımlılığı (Yedek)': {'Giriş': 'Tanım', 'Gelişme': 'Zararlar', 'Sonuç': 'Çözüm'}}
 
-def sesi_analiz_et(audio_bytes, konu, detaylar, status_container):
-    """
-    GÜNCELLENMİŞ FONKSİYON: 
-    - JSON hatalarını önler.
-    - Hata durumunda programın çökmesini engeller.
-    """
-    try:
-        model = genai.GenerativeModel('gemini-flash-latest')
-        status_container.update(label="Sinan Hoca Analiz Ediyor... 🤖", state="running")
-        
-        import tempfile
-        tfile = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        tfile.write(audio_bytes)
-        tfile.close()
-        
-        audio_file = genai.upload_file(tfile.name)
-        
-        # Dosya işlenene kadar bekle
-        while audio_file.state.name == "PROCESSING":
-            time.sleep(1)
-            audio_file = genai.get_file(audio_file.name)
-            
-        prompt = f"""
-        Sen bir Türkçe Öğretmenisin.
-        Konu: {konu}. 
-        Beklenen Plan: {detaylar}.
-        
-        GÖREVLER:
-        1. Ses kaydının transkriptini çıkar.
-        2. Şu kriterlere göre 1-3 arası puan ver: İçerik, Düzen, Dil, Akıcılık.
-        3. Toplam puanı 100'lük sisteme çevir.
-        4. Öğrenciye motive edici kısa bir yorum yaz.
-        
-        ÇOK ÖNEMLİ KURAL:
-        Cevabı SADECE aşağıdaki JSON formatında ver. Başka hiçbir metin veya markdown (```json gibi) ekleme.
-        Anahtarlar (key) mutlaka çift tırnak (") içinde olmalı.
-        
-        {{
-            "transkript": "...",
-            "kriter_puanlari": {{
-                "konu_icerik": 0,
-                "duzen": 0,
-                "dil": 0,
-                "akicilik": 0
-            }},
-            "yuzluk_sistem_puani": 0,
-            "ogretmen_yorumu": "..."
-        }}
-        """
-        
-        # JSON formatını garantiye almak için generation_config kullanıyoruz
-        response = model.generate_content(
-            [audio_file, prompt],
-            generation_config={"response_mime_type": "application/json"}
-        )
+def sonuc_goster(sonuc):
+    kp = sonuc.get("kriter_puanlari", {})
+    st.markdown(f"""
+    <div style="background-color: #dcfce7; border: 2px solid #22c55e; border-radius: 12px; padding: 15px; text-align: center; margin-bottom: 20px;">
+        <h2 style="margin:0; color:#166534;">PUAN: {sonuc.get('yuzluk_sistem_puani')}</h2>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.container(border=True):
+        st.info(f"**Yorum:** {sonuc.get('ogretmen_yorumu')}")
+        st.text_area("Metin", sonuc.get("transkript"), height=150)
         
-        os.remove(tfile.name)
+        st.table(pd.DataFrame({
+            "Kriter": ["İçerik", "Düzen", "Dil", "Akıcılık"],
+            "Puan": [kp.get("konu_icerik"), kp.get("duzen"), kp.get("dil"), kp.get("akicilik")]
+        }).set_index("Kriter"))
         
-        text = response.text.strip()
+        so = sonuc.get("ses_olcumleri")
+        if so:
+            st.caption(
+                f"🎧 Süre: {so['sure']:.0f} sn · Duraklama: {so['duraklama_sayisi']} · "
+                f"Sessizlik: %{so['sessizlik_orani'] * 100:.0f} · Konuşma hızı: {so['konusma_hizi']:.1f} hece/sn"
+            )
+
+def kismi_sonuc_goster(kismi):
+    """Akışlı puanlamada cevap tamamlanmadan gelen alanlar: önce transkript, ardından puanlar ve yorum."""
+    with st.container(border=True):
+        if kismi.get("transkript"):
+            st.caption("Metin (yazılıyor...)" if "kriter_puanlari" not in kismi else "Metin")
+            st.write(kismi["transkript"])
+        kp = kismi.get("kriter_puanlari")
+        if isinstance(kp, dict):
+            sutunlar = st.columns(4)
+            for sutun, (etiket, anahtar) in zip(sutunlar, [("İçerik", "konu_icerik"), ("Düzen", "duzen"), ("Dil", "dil"), ("Akıcılık", "akicilik")]):
+                sutun.metric(etiket, kp.get(anahtar, "-"))
+        if "yuzluk_sistem_puani" in kismi:
+            st.markdown(f"**PUAN: {kismi['yuzluk_sistem_puani']}**")
+        if kismi.get("ogretmen_yorumu"):
+            st.info(f"**Yorum:** {kismi['ogretmen_yorumu']}")
+
+def is_sonucunu_goster(is_):
+    if is_["durum"] == puanlama_isleri.TAMAMLANDI:
+        if st.session_state.get("kutlanan_is") != is_["id"]:
+            st.session_state["kutlanan_is"] = is_["id"]
+            st.balloons()
+        sonuc_goster(is_["sonuc"])
+    else:
+        st.error(is_["asama"])
+
+# --- PARÇALAR ---
+# Sınav ekranı ayrı ayrı yeniden çalışan parçalardan oluşur; bir alandaki değişiklik sadece kendi
+# parçasını çalıştırır. Parçalar birbirinin değerlerini st.session_state'ten okur. Başka parçaların
+# görünümünü değiştiren alanlar (sınıf, numara) on_change=sayfayi_yenile ile tüm sayfayı çalıştırır.
+def sayfayi_yenile():
+    st.session_state["sayfa_yenilenecek"] = True
+
+def olculu_parca(ad, **secenekler):
+    """
+    st.fragment ile aynı; ayrıca parçanın süresini olcum'a "parca_<ad>" olarak yazar ve tam sayfa
+    çalışmadan tek başına çalıştığı durumları "parca_<ad>_tek_basina" sayacında sayar.
+    """
+    def sar(fonksiyon):
+        @st.fragment(**secenekler)
+        @functools.wraps(fonksiyon)
+        def parca(*args, **kwargs):
+            if st.session_state.pop("sayfa_yenilenecek", False):
+                st.rerun()
+            # Sayfa numarası sadece tam çalıştırmada artar; aynı numarada ikinci kez çalışan parça tek başına çalışmıştır
+            calistirmalar = st.session_state.setdefault("parca_calistirmalari", {})
+            sayfa_no = st.session_state.get("sayfa_calistirma_no", 0)
+            if calistirmalar.get(ad) == sayfa_no:
+                olcum.say(f"parca_{ad}_tek_basina")
+            calistirmalar[ad] = sayfa_no
+            # st.rerun/st.stop (BaseException) hata sayılmaz
+            baslangic, hata = time.perf_counter(), None
+            try:
+                return fonksiyon(*args, **kwargs)
+            except Exception as e:
+                hata = e
+                raise
+            finally:
+                olcum.kaydet(f"parca_{ad}", time.perf_counter() - baslangic, hata=hata)
+        return parca
+    return sar
+
+@olculu_parca("is_takibi", run_every=1)
+def is_takibi(is_id):
+    """Sadece bu bölüm saniyede bir yenilenir; iş bitince tüm sayfa sonuçla birlikte çizilir."""
+    is_ = puanlama_isleri.is_getir(is_id)
+    if is_["durum"] in (puanlama_isleri.KUYRUKTA, puanlama_isleri.CALISIYOR):
+        with st.status(is_["asama"] or "İşlemler Yapılıyor...", expanded=False, state="running"):
+            if is_["durum"] == puanlama_isleri.KUYRUKTA:
+                st.write(f"Sıradaki iş sayısı: {puanlama_isleri.sira_no(is_id)}")
+        if is_["kismi"]:
+            kismi_sonuc_goster(is_["kismi"])
+    else:
+        st.rerun()
+
+RUBRIK_HTML = """
+<style>
+    .rubric-table {width: 100%; border-collapse: collapse; font-size: 0.9em; margin-bottom: 20px;}
+    .rubric-table th {background-color: #f8f9fa; border: 1px solid #dee2e6; padding: 8px; text-align: left;}
+    .rubric-table td {border: 1px solid #dee2e6; padding: 8px;}
+</style>
+<h4>⚖️ Puanlama Kriterleri</h4>
+<table class="rubric-table">
+    <tr><th>Kriter</th><th>Açıklama</th><th>Puan (1-3)</th></tr>
+    <tr><td><b>İçerik</b></td><td>Konuya hakimiyet ve plana uyum</td><td>1 - 3</td></tr>
+    <tr><td><b>Düzen</b></td><td>Giriş, gelişme ve sonuç bütünlüğü</td><td>1 - 3</td></tr>
+    <tr><td><b>Dil</b></td><td>Kelime zenginliği ve gramer</td><td>1 - 3</td></tr>
+    <tr><td><b>Akıcılık</b></td><td>Telaffuz ve tonlama</td><td>1 - 3</td></tr>
+</table>
+"""
+
+def ogrenci_bilgileri():
+    return (st.session_state.get("ogrenci_adi"), st.session_state.get("ogrenci_sinifi"), st.session_state.get("ogrenci_no"))
+
+def aktif_isi_getir(oturum):
+    _, sinif, numara = ogrenci_bilgileri()
+    return puanlama_isleri.son_is(oturum, sinif, numara) if sinif and numara else puanlama_isleri.son_is(oturum)
+
+@olculu_parca("kimlik")
+def kimlik_ve_hak():
+    """Öğrenci bilgileri ve sınav hakkı kontrolü. Ad yazmak sadece bu parçayı çalıştırır."""
+    c1, c2, c3 = st.columns([3, 1.5, 1.5])
+    with c1: st.text_input("Öğrenci Adı Soyadı", key="ogrenci_adi")
+    with c2: 
+        sinif_listesi = ["5/C", "5/D", "5/E", "6/D", "8/D", "Diğer"]
+        sinif = st.selectbox("Sınıf / Şube", sinif_listesi, index=None, key="ogrenci_sinifi", on_change=sayfayi_yenile)
+    with c3: numara = st.text_input("Okul No", key="ogrenci_no", on_change=sayfayi_yenile)
+    
+    # ------------------ 1. SINAV HAKKI KONTROLÜ (YENİ) ------------------
+    sinav_hakki_var = True 
+    tablodaki_hak = 0
+    
+    if sinif and numara:
+        # 1. Yerel indeksi tablodaki yeni satırlarla güncelle (tüm tablo indirilmez)
+        try:
+            sonuc_indeksi.senkronize_et(get_sheet)
+        except Exception:
+            pass
         
-        # Markdown temizliği
-        if text.startswith("```json"): text = text[7:]
-        if text.startswith("```"): text = text[3:]
-        if text.endswith("```"): text = text[:-3]
-            
-        return json.loads(text)
+        # 2. Sınıf ve Numaraya göre indeksten say (tabloya henüz aktarılmamış kayıtlar dahil).
+        #    Ortak sayaç, başka sekme veya sunucu süreçlerinde başlamış sınavları da içerir.
+        bekleyenler = sonuc_kuyrugu.bekleyen_kayitlar(sinif, numara)
+        tablodaki_hak = sonuc_indeksi.kullanilan_hak(sinif, numara) + len(bekleyenler)
+        kullanilan_hak = max(tablodaki_hak, ortak_durum.hak_sayisi(puanlama_isleri.ogrenci_anahtari(sinif, numara)))
         
-    except Exception as e:
-        return {
-            "yuzluk_sistem_puani": 0, 
-            "transkript": f"Sistem Hatası oluştu: {str(e)}. Lütfen tekrar deneyin.", 
-            "ogretmen_yorumu": "Analiz sırasında teknik bir aksaklık oldu.",
-            "kriter_puanlari": {"konu_icerik":0,"duzen":0,"dil":0,"akicilik":0}
-        }
+        # 3. Kontrol Et
+        if kullanilan_hak >= sonuc_indeksi.SINAV_HAKKI:
+            st.error(f"🛑 DİKKAT: Bu öğrenci ({sinif} - {numara}) {sonuc_indeksi.SINAV_HAKKI} sınav hakkını da kullanmıştır.")
+            st.dataframe(pd.DataFrame(sonuc_indeksi.ogrenci_kayitlari(sinif, numara) + bekleyenler), hide_index=True)
+            sinav_hakki_var = False
+        else:
+            kalan = sonuc_indeksi.SINAV_HAKKI - kullanilan_hak
+            st.info(f"ℹ️ Öğrencinin şu ana kadar {kullanilan_hak} sınavı var. (Kalan Hak: {kalan})")
+    
+    # Sayfanın geri kalanı ve kayıt parçası bu değerleri okur
+    st.session_state["sinav_hakki_var"] = sinav_hakki_var
+    st.session_state["tablodaki_hak"] = tablodaki_hak
+
+@olculu_parca("konu")
+def konu_ve_plan():
+    """Konu seçimi ve konuşma planı. Konu değiştirmek sadece bu parçayı çalıştırır."""
+    konular = konulari_getir()
+    secilen_konu = st.selectbox("Konu Seçiniz:", list(konular.keys()), index=None, key="secilen_konu")
+    
+    if secilen_konu:
+        detay = konular.get(secilen_konu, {})
+        st.markdown(f"### 📋 {secilen_konu} - Konuşma Planı")
+        k1, k2, k3 = st.columns(3)
+        with k1: st.info(f"**1. GİRİŞ**\n\n{detay.get('Giriş','')}")
+        with k2: st.warning(f"**2. GELİŞME**\n\n{detay.get('Gelişme','')}")
+        with k3: st.success(f"**3. SONUÇ**\n\n{detay.get('Sonuç','')}")
+
+@olculu_parca("kayit")
+def kayit_ve_puanlama(oturum):
+    """Ses kaydı ve puanlamaya gönderme. Kayıt almak sadece bu parçayı çalıştırır; gönderim sonrası tüm sayfa yenilenir."""
+    st.markdown("### 🎙️ Kaydı Başlat")
+    ses = st.audio_input("Mikrofona Tıklayın")
+    
+    aktif_is = aktif_isi_getir(oturum)
+    is_devam_ediyor = bool(aktif_is) and aktif_is["durum"] in (puanlama_isleri.KUYRUKTA, puanlama_isleri.CALISIYOR)
+    
+    if ses and st.button("Bitir ve Puanla", type="primary", use_container_width=True, disabled=is_devam_ediyor):
+        # Diğer parçaların değerleri gönderim anında okunur
+        ad, sinif, numara = ogrenci_bilgileri()
+        secilen_konu = st.session_state.get("secilen_konu")
+        if not ad: st.warning("Lütfen isim giriniz.")
+        elif not sinif: st.warning("Lütfen sınıf seçiniz.")
+        elif not numara: st.warning("Lütfen numara giriniz.")
+        elif not secilen_konu: st.warning("Lütfen konu seçiniz.")
+        else:
+            # Boş, sessiz, kırpılmış veya çok kısa kayıt kuyruğa girmeden reddedilir (kota ve hak harcanmaz)
+            with olcum.asama("ses_analizi"):
+                on_analiz = ses_analizi.analiz_et(ses.getvalue())
+            if on_analiz and on_analiz["sorun"]:
+                olcum.say("reddedilen_kayit")
+                st.error(f"🎙️ {on_analiz['sorun']}")
+            # Kontrol ve ayırma tek atomik işlem: iki sekme aynı anda gönderse de hak sınırı aşılmaz
+            elif not ortak_durum.hak_ayir(puanlama_isleri.ogrenci_anahtari(sinif, numara), sonuc_indeksi.SINAV_HAKKI, st.session_state.get("tablodaki_hak", 0)):
+                st.error(f"🛑 Bu öğrenci ({sinif} - {numara}) için başka bir oturumda sınav başlatılmış; sınav hakkı kalmadı.")
+            else:
+                # Puanlama arka planda yapılır; kalan hak ve iş durumu için tüm sayfa yenilenir
+                sonuc_kuyrugu.baslat(get_sheet)
+                puanlama_isleri.gonder(
+                    oturum, ad, sinif, numara, secilen_konu, konulari_getir().get(secilen_konu, {}), ses.getvalue(),
+                    kaydet=save_to_sheet, hak_ayrildi=True
+                )
+                st.rerun()
+
+@olculu_parca("sonuc")
+def sonuc_karti(oturum):
+    """Son işin durumu veya sonucu; iş sürerken içindeki is_takibi saniyede bir yenilenir."""
+    aktif_is = aktif_isi_getir(oturum)
+    if aktif_is:
+        if aktif_is["durum"] in (puanlama_isleri.KUYRUKTA, puanlama_isleri.CALISIYOR):
+            is_takibi(aktif_is["id"])
+        else:
+            is_sonucunu_goster(aktif_is)
 
 # --- 4. ARAYÜZ ---
 if 'admin_logged_in' not in st.session_state: st.session_state['admin_logged_in'] = False
 
+# Oturum kimliği adreste tutulur; sayfa yenilense de puanlama işlerine ulaşılabilir
+if "oturum" not in st.query_params: st.query_params["oturum"] = uuid.uuid4().hex
+oturum = st.query_params["oturum"]
+
 with st.sidebar:
     st.title("🔐 Yönetici Paneli")
     if not st.session_state['admin_logged_in']:
@@ -181,13 +330,33 @@ with st.sidebar:
                 st.error("Hatalı Şifre!")
     else:
         st.success("Giriş Başarılı")
-        secim = st.radio("Sayfa Seçiniz:", ["📝 Sınav Ekranı", "📂 Sonuç Arşivi"])
+        secim = st.radio("Sayfa Seçiniz:", ["📝 Sınav Ekranı", "📂 Sonuç Arşivi", "📊 Sınıf Analizi", "📈 Performans"])
+        
+        # Tabloya aktarım durumu
+        sonuc_kuyrugu.baslat(get_sheet)
+        ozet = sonuc_kuyrugu.durum_ozeti()
+        st.markdown("#### 📤 Kayıt Aktarımı")
+        a1, a2, a3 = st.columns(3)
+        a1.metric("Bekleyen", ozet["bekliyor"] + ozet["yaziliyor"] + ozet["belirsiz"])
+        a2.metric("Aktarılan", ozet["yazildi"])
+        a3.metric("Hatalı", ozet["hatali"])
+        if ozet["hatali"] and st.button("Hatalıları Tekrar Dene"):
+            sonuc_kuyrugu.hatalilari_yeniden_dene()
+            st.rerun()
+        if st.button("🔄 Konuları Yeniden Yükle"):
+            try:
+                konu_katalogu.katalog_yukle("konusma_konulari.xlsx", zorla=True)
+                st.toast("Konu listesi güncellendi.")
+            except Exception as e:
+                st.error(f"Konular yüklenemedi: {e}")
         if st.button("Çıkış Yap"):
             st.session_state['admin_logged_in'] = False
             st.rerun()
 
 # --- MOD SEÇİMİ ---
 if not st.session_state['admin_logged_in'] or (st.session_state['admin_logged_in'] and secim == "📝 Sınav Ekranı"):
+    # Parçalar bu numarayla tam çalıştırmayı tek başına çalışmadan ayırır
+    st.session_state["sayfa_calistirma_no"] = st.session_state.get("sayfa_calistirma_no", 0) + 1
     
     col_left, col_center, col_right = st.columns([1, 2, 1])
     
@@ -195,140 +364,193 @@ if not st.session_state['admin_logged_in'] or (st.session_state['admin_logged_in
         st.title("🎤 Dijital Konuşma Sınavı")
         st.markdown("---")
         
-        c1, c2, c3 = st.columns([3, 1.5, 1.5])
-        with c1: ad = st.text_input("Öğrenci Adı Soyadı")
-        with c2: 
-            sinif_listesi = ["5/C", "5/D", "5/E", "6/D", "8/D", "Diğer"]
-            sinif = st.selectbox("Sınıf / Şube", sinif_listesi, index=None)
-        with c3: numara = st.text_input("Okul No")
-        
-        # ------------------ 1. SINAV HAKKI KONTROLÜ (YENİ) ------------------
-        sinav_hakki_var = True 
-        
-        if sinif and numara:
-            # 1. Veritabanındaki tüm kayıtları çek
-            df_kontrol = get_all_results()
-            
-            if not df_kontrol.empty:
-                # Veri tiplerini string'e çevir
-                df_kontrol["Okul No"] = df_kontrol["Okul No"].astype(str)
-                
-                # 2. Sınıf ve Numaraya göre filtrele
-                ogrenci_kayitlari = df_kontrol[
-                    (df_kontrol["Sınıf"] == sinif) & 
-                    (df_kontrol["Okul No"] == str(numara))
-                ]
-                
-                kullanilan_hak = len(ogrenci_kayitlari)
-                
-                # 3. Kontrol Et
-                if kullanilan_hak >= 2:
-                    st.error(f"🛑 DİKKAT: Bu öğrenci ({sinif} - {numara}) 2 sınav hakkını da kullanmıştır.")
-                    st.dataframe(ogrenci_kayitlari[["Tarih", "Konu", "Puan"]], hide_index=True)
-                    sinav_hakki_var = False
-                else:
-                    kalan = 2 - kullanilan_hak
-                    st.info(f"ℹ️ Öğrencinin şu ana kadar {kullanilan_hak} sınavı var. (Kalan Hak: {kalan})")
+        kimlik_ve_hak()
 
         # Eğer hak yoksa kodu durdur
-        if not sinav_hakki_var:
+        if not st.session_state["sinav_hakki_var"]:
             st.warning("Sınav hakkı dolduğu için yeni sınav başlatılamaz.")
+            # Son hakkı bu oturumda kullanıldıysa sonucu yine de göster
+            _, sinif, numara = ogrenci_bilgileri()
+            son = puanlama_isleri.son_is(oturum, sinif, numara)
+            if son and son["durum"] == puanlama_isleri.TAMAMLANDI:
+                is_sonucunu_goster(son)
+            olcum.kaydet("sayfa_sinav_ekrani", time.perf_counter() - _calistirma_baslangic)
             st.stop()
         # --------------------------------------------------------------------
         
-        konular = konulari_getir()
-        secilen_konu = st.selectbox("Konu Seçiniz:", list(konular.keys()), index=None)
-        
-        if secilen_konu:
-            detay = konular.get(secilen_konu, {})
-            st.markdown(f"### 📋 {secilen_konu} - Konuşma Planı")
-            k1, k2, k3 = st.columns(3)
-            with k1: st.info(f"**1. GİRİŞ**\n\n{detay.get('Giriş','')}")
-            with k2: st.warning(f"**2. GELİŞME**\n\n{detay.get('Gelişme','')}")
-            with k3: st.success(f"**3. SONUÇ**\n\n{detay.get('Sonuç','')}")
+        konu_ve_plan()
 
         st.markdown("<br>", unsafe_allow_html=True)
-
-        rubric_html = """
-        <style>
-            .rubric-table {width: 100%; border-collapse: collapse; font-size: 0.9em; margin-bottom: 20px;}
-            .rubric-table th {background-color: #f8f9fa; border: 1px solid #dee2e6; padding: 8px; text-align: left;}
-            .rubric-table td {border: 1px solid #dee2e6; padding: 8px;}
-        </style>
-        <h4>⚖️ Puanlama Kriterleri</h4>
-        <table class="rubric-table">
-            <tr><th>Kriter</th><th>Açıklama</th><th>Puan (1-3)</th></tr>
-            <tr><td><b>İçerik</b></td><td>Konuya hakimiyet ve plana uyum</td><td>1 - 3</td></tr>
-            <tr><td><b>Düzen</b></td><td>Giriş, gelişme ve sonuç bütünlüğü</td><td>1 - 3</td></tr>
-            <tr><td><b>Dil</b></td><td>Kelime zenginliği ve gramer</td><td>1 - 3</td></tr>
-            <tr><td><b>Akıcılık</b></td><td>Telaffuz ve tonlama</td><td>1 - 3</td></tr>
-        </table>
-        """
-        st.markdown(rubric_html, unsafe_allow_html=True)
+        st.markdown(RUBRIK_HTML, unsafe_allow_html=True)
         
-        st.markdown("### 🎙️ Kaydı Başlat")
-        ses = st.audio_input("Mikrofona Tıklayın")
-        
-        if ses and secilen_konu and st.button("Bitir ve Puanla", type="primary", use_container_width=True):
-            if not ad: st.warning("Lütfen isim giriniz.")
-            elif not sinif: st.warning("Lütfen sınıf seçiniz.")
-            elif not numara: st.warning("Lütfen numara giriniz.")
-            else:
-                with st.status("İşlemler Yapılıyor...", expanded=True) as status:
-                    ses_data = ses.getvalue()
-                    
-                    # 1. Analiz
-                    sonuc = sesi_analiz_et(ses_data, secilen_konu, konular.get(secilen_konu,{}), status)
-                    
-                    # 2. DETAYLARI HAZIRLA
-                    kp = sonuc.get("kriter_puanlari", {})
-                    detay_metni = f"İçerik: {kp.get('konu_icerik')} | Düzen: {kp.get('duzen')} | Dil: {kp.get('dil')} | Akıcılık: {kp.get('akicilik')}"
-                    
-                    # 3. KAYIT
-                    status.write("📝 Sonuçlar kaydediliyor...")
-                    save_to_sheet([
-                        datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        ad, sinif, numara, secilen_konu,
-                        sonuc.get("yuzluk_sistem_puani"),
-                        detay_metni,
-                        sonuc.get("transkript"),
-                        sonuc.get("ogretmen_yorumu")
-                    ])
-                    
-                    status.update(label="Tamamlandı", state="complete")
-                    st.balloons()
-                    
-                    # SONUÇ GÖSTERİMİ
-                    st.markdown(f"""
-                    <div style="background-color: #dcfce7; border: 2px solid #22c55e; border-radius: 12px; padding: 15px; text-align: center; margin-bottom: 20px;">
-                        <h2 style="margin:0; color:#166534;">PUAN: {sonuc.get('yuzluk_sistem_puani')}</h2>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    with st.container(border=True):
-                        st.info(f"**Yorum:** {sonuc.get('ogretmen_yorumu')}")
-                        st.text_area("Metin", sonuc.get("transkript"), height=150)
-                        
-                        st.table(pd.DataFrame({
-                            "Kriter": ["İçerik", "Düzen", "Dil", "Akıcılık"],
-                            "Puan": [kp.get("konu_icerik"), kp.get("duzen"), kp.get("dil"), kp.get("akicilik")]
-                        }).set_index("Kriter"))
+        kayit_ve_puanlama(oturum)
+        sonuc_karti(oturum)
+    
+    olcum.kaydet("sayfa_sinav_ekrani", time.perf_counter() - _calistirma_baslangic)
 
 elif st.session_state['admin_logged_in'] and secim == "📂 Sonuç Arşivi":
     st.title("📂 Arşiv ve Detaylar")
-    df = get_all_results()
+    try:
+        sonuc_indeksi.senkronize_et(get_sheet)
+    except Exception:
+        pass
     
-    if not df.empty:
+    # Filtreler yerel indekste uygulanır; tablodan sadece seçilen sayfa okunur
+    f1, f2, f3, f4 = st.columns([1, 2, 2, 2])
+    with f1: f_sinif = st.selectbox("Sınıf", sonuc_indeksi.secenekler("sinif"), index=None, placeholder="Tümü")
+    with f2: f_konu = st.selectbox("Konu", sonuc_indeksi.secenekler("konu"), index=None, placeholder="Tümü")
+    with f3: f_tarih = st.date_input("Tarih Aralığı", value=[], format="DD.MM.YYYY")
+    with f4: f_puan = st.slider("Puan Aralığı", 0, 100, (0, 100))
+    
+    filtreler = {
+        "sinif": f_sinif,
+        "konu": f_konu,
+        "baslangic": f_tarih[0] if len(f_tarih) > 0 else None,
+        "bitis": f_tarih[1] if len(f_tarih) > 1 else None,
+        "puan_araligi": f_puan if f_puan != (0, 100) else None,
+    }
+    SAYFA_BOYUTU = 50
+    toplam = sonuc_indeksi.kayit_sayisi(**filtreler)
+    
+    # Dosya yalnızca indirme düğmesine basıldığında, satırlar parça parça okunarak oluşturulur
+    with st.expander("📥 Dışa Aktar (her sınıf ayrı sayfa)"):
+        d1, d2, d3 = st.columns([1, 1, 2])
+        with d1: aktarim_bicimi = st.radio("Biçim", ["Excel", "CSV"], horizontal=True)
+        with d2: transkriptli = st.checkbox("Transkriptleri ekle")
+        with d3: filtreli = st.checkbox("Sadece filtrelenen kayıtlar", value=True)
+        aktarim_filtreleri = filtreler if filtreli else {}
+        if aktarim_bicimi == "Excel":
+            st.download_button(
+                "Excel Dosyasını İndir",
+                data=lambda: disa_aktarim.xlsx_verisi(transkriptli, **aktarim_filtreleri),
+                file_name=disa_aktarim.dosya_adi("xlsx"),
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                disabled=toplam == 0 and filtreli
+            )
+        else:
+            st.download_button(
+                "CSV Dosyasını İndir",
+                data=lambda: disa_aktarim.csv_verisi(transkriptli, **aktarim_filtreleri),
+                file_name=disa_aktarim.dosya_adi("csv"),
+                mime="text/csv",
+                disabled=toplam == 0 and filtreli
+            )
+    
+    sayfa_sayisi = max(1, -(-toplam // SAYFA_BOYUTU))
+    sayfa = st.number_input(f"Sayfa (toplam {toplam} kayıt, {sayfa_sayisi} sayfa)", min_value=1, max_value=sayfa_sayisi, value=1)
+    kayitlar = sonuc_indeksi.arsiv_sayfasi(sayfa=sayfa, sayfa_boyutu=SAYFA_BOYUTU, **filtreler)
+    
+    if kayitlar:
+        df = pd.DataFrame(kayitlar)
+        df["Puan"] = pd.to_numeric(df["Puan"], errors="coerce")
         event = st.dataframe(
             df,
+            column_config={"Satır": None},
             selection_mode="single-row",
             on_select="rerun",
             use_container_width=True,
             hide_index=True
         )
+        
+        # Uzun metinler sadece satır seçildiğinde okunur
+        if event.selection.rows:
+            secilen = df.iloc[event.selection.rows[0]]
+            detay = sonuc_indeksi.kayit_detayi(int(secilen["Satır"]))
+            if detay:
+                with st.container(border=True):
+                    st.markdown(f"#### {secilen['Ad Soyad']} ({secilen['Sınıf']} - {secilen['Okul No']}) · {secilen['Konu']}")
+                    st.caption(detay["Puan Detayları"])
+                    st.info(f"**Yorum:** {detay['Öğretmen Yorumu']}")
+                    st.text_area("Transkript", detay["Transkript"], height=200, disabled=True)
     else:
         st.info("Henüz kayıt bulunmamaktadır.")
 
+elif st.session_state['admin_logged_in'] and secim == "📊 Sınıf Analizi":
+    st.title("📊 Sınıf ve Kriter Analizi")
+    try:
+        sonuc_indeksi.senkronize_et(get_sheet)
+    except Exception:
+        pass
+    st.caption("Özetler her kayıtta güncellenir; bu sayfa geçmiş sonuçları yeniden taramaz. Puanlama hatası nedeniyle sıfır alan kayıtlar dahil edilmez.")
+    
+    KRITER_ADLARI = sonuc_indeksi.KRITERLER
+    genel = sonuc_indeksi.analiz_ozeti("genel")
+    if not genel:
+        st.info("Henüz analiz edilecek kayıt bulunmamaktadır.")
+    else:
+        g = genel[0]
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Sınav Sayısı", g["adet"])
+        m2.metric("Genel Ortalama", g["ortalama"])
+        m3.metric("Standart Sapma", g["std"])
+        
+        st.subheader("🏫 Sınıf Ortalamaları")
+        df_sinif = pd.DataFrame(sonuc_indeksi.analiz_ozeti("sinif")).rename(columns={"deger": "Sınıf", "adet": "Sınav", "ortalama": "Ortalama", "std": "Std. Sapma", **KRITER_ADLARI})
+        st.dataframe(df_sinif, hide_index=True, use_container_width=True)
+        
+        st.subheader("📚 Konu Zorluğu")
+        st.caption("Ortalaması en düşük konular en üstte.")
+        df_konu = pd.DataFrame(sonuc_indeksi.analiz_ozeti("konu")).rename(columns={"deger": "Konu", "adet": "Sınav", "ortalama": "Ortalama", "std": "Std. Sapma", **KRITER_ADLARI})
+        st.dataframe(df_konu.sort_values("Ortalama"), hide_index=True, use_container_width=True)
+        
+        st.subheader("📐 Kriter Dağılımları")
+        d_sinif = st.selectbox("Sınıf", [s for s in df_sinif["Sınıf"] if s], index=None, placeholder="Tüm sınıflar")
+        dagilim = sonuc_indeksi.kriter_dagilimi("sinif", d_sinif) if d_sinif else sonuc_indeksi.kriter_dagilimi()
+        df_kriter = pd.DataFrame(
+            {ad: [dagilim.get(k, {}).get(p, 0) for p in (1, 2, 3)] for k, ad in KRITER_ADLARI.items()},
+            index=pd.Index(["1", "2", "3"], name="Puan")
+        )
+        st.bar_chart(df_kriter, stack=False)
+        dilimler = dagilim.get("puan_dilimi", {})
+        df_dilim = pd.DataFrame(
+            {"Öğrenci": [dilimler.get(i, 0) for i in range(10)]},
+            index=pd.Index([f"{i * 10}-{i * 10 + 9}" if i < 9 else "90-100" for i in range(10)], name="Puan Aralığı")
+        )
+        st.bar_chart(df_dilim)
+
+elif st.session_state['admin_logged_in'] and secim == "📈 Performans":
+    st.title("📈 Performans")
+    st.caption("Bu sunucu sürecindeki son ölçümler. Ayrıntılı kayıtlar olcum.log, Prometheus metinleri olcum.prom dosyasındadır.")
+    veri = olcum.ozet()
+    
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Puanlama", veri["asamalar"].get("puanlama", {}).get("adet", 0))
+    m2.metric("Sıfır Puanlı Yedek Sonuç", veri["sayaclar"].get("yedek_sonuc", 0))
+    m3.metric("Önbellekten Dönen", veri["sayaclar"].get("onbellek_isabet", 0))
+    m4, m5, m6 = st.columns(3)
+    m4.metric("Kota Sırasında Bekleyen", gemini_siniri.bekleyen_sayisi())
+    m5.metric("Tekrar Denenen Çağrı", veri["sayaclar"].get("gemini_tekrar", 0))
+    m6.metric("Kota Hatası (429)", veri["sayaclar"].get("gemini_kota_hatasi", 0))
+    hat = puanlama_hatti.ozet()
+    m7, m8, m9 = st.columns(3)
+    m7.metric("Yarıda Kalan Puanlama", sum(a for s, a in hat["asamalar"].items() if s != puanlama_hatti.KAYDEDILDI))
+    m8.metric("Silinmeyi Bekleyen Uzak Dosya", hat["uzak_dosya"])
+    m9.metric("Yeniden Kullanılan Yükleme", veri["sayaclar"].get("uzak_dosya_yeniden_kullanim", 0))
+    st.metric("Ön Analizde Reddedilen Kayıt", veri["sayaclar"].get("reddedilen_kayit", 0))
+
+    # Sınav ekranında tam sayfa yerine sadece değişen parçanın çalıştığı durumlar
+    st.markdown("#### 🧩 Sınav Ekranı Yeniden Çalıştırmaları")
+    sayfa = veri["asamalar"].get("sayfa_sinav_ekrani", {})
+    parca_adlari = ["kimlik", "konu", "kayit", "sonuc", "is_takibi"]
+    tek_basina = {p: veri["sayaclar"].get(f"parca_{p}_tek_basina", 0) for p in parca_adlari}
+    p1, p2, p3 = st.columns(3)
+    p1.metric("Tam Sayfa Çalıştırma", sayfa.get("adet", 0), help=f"p50: {sayfa.get('p50_ms', 0)} ms")
+    p2.metric("Tek Başına Parça Çalıştırma", sum(tek_basina.values()))
+    toplam = sayfa.get("adet", 0) + sum(tek_basina.values())
+    p3.metric("Önlenen Tam Çalıştırma", f"%{sum(tek_basina.values()) / toplam * 100:.0f}" if toplam else "-")
+    st.dataframe(pd.DataFrame([
+        {"Parça": p, "Tek Başına": tek_basina[p], **{k: veri["asamalar"].get(f"parca_{p}", {}).get(k, 0) for k in ("adet", "p50_ms", "p95_ms")}}
+        for p in parca_adlari
+    ] + [{"Parça": "(tam sayfa)", "Tek Başına": 0, **{k: sayfa.get(k, 0) for k in ("adet", "p50_ms", "p95_ms")}}]).set_index("Parça"), use_container_width=True)
+
+    if veri["asamalar"]:
+        df_olcum = pd.DataFrame.from_dict(veri["asamalar"], orient="index")
+        df_olcum.index.name = "Aşama"
+        st.dataframe(df_olcum, use_container_width=True)
+    else:
+        st.info("Henüz ölçüm yok.")
+    st.button("🔄 Yenile")
+
 st.markdown("---")
 st.markdown(
     """
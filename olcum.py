@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from yerel_depo import veri_yolu
+
+# --- ÖLÇÜM ---
+# Puanlama ve kayıt aşamalarının sürelerini tutar.
+# Her aşama: dönen günlük dosyasına (olcum.log) bir JSON satırı, bellekte son PENCERE ölçüm
+# ve Prometheus metin biçiminde bir dosya (olcum.prom). Yönetici paneli ozet() ile okur.
+
+PENCERE = 1000                 # aşama başına tutulan son ölçüm sayısı
+PROM_YAZMA_ARALIGI = 5         # saniye
+GUNLUK_BOYUTU = 5 * 1024 ** 2  # bayt
+GUNLUK_YEDEK_SAYISI = 3
+
+_kilit = threading.Lock()
+_sureler = {}   # aşama -> deque[(zaman, süre)]
+_toplamlar = {}  # aşama -> {"adet", "toplam", "hata"}
+_sayaclar = {}
+_son_prom_yazma = 0.0
+_gunluk = None
+
+
+def _gunlukcu():
+    global _gunluk
+    if _gunluk is None:
+        gunluk = logging.getLogger("konusma.olcum")
+        gunluk.setLevel(logging.INFO)
+        gunluk.propagate = False
+        if not gunluk.handlers:
+            try:
+                isleyici = RotatingFileHandler(veri_yolu("olcum.log"), maxBytes=GUNLUK_BOYUTU, backupCount=GUNLUK_YEDEK_SAYISI, encoding="utf-8")
+                isleyici.setFormatter(logging.Formatter("%(message)s"))
+                gunluk.addHandler(isleyici)
+            except OSError:
+                gunluk.addHandler(logging.NullHandler())
+        _gunluk = gunluk
+    return _gunluk
+
+
+def kaydet(ad, sure, hata=None, **etiketler):
+    simdi = time.time()
+    with _kilit:
+        _sureler.setdefault(ad, deque(maxlen=PENCERE)).append((simdi, sure))
+        toplam = _toplamlar.setdefault(ad, {"adet": 0, "toplam": 0.0, "hata": 0})
+        toplam["adet"] += 1
+        toplam["toplam"] += sure
+        if hata is not None:
+            toplam["hata"] += 1
+    kayit = {"zaman": round(simdi, 3), "asama": ad, "sure_ms": round(sure * 1000, 2)}
+    if hata is not None:
+        kayit["hata"] = str(hata)[:200]
+    kayit.update(etiketler)
+    _gunlukcu().info(json.dumps(kayit, ensure_ascii=False, default=str))
+    _prom_yaz()
+
+
+@contextmanager
+def asama(ad, **etiketler):
+    """
+    with olcum.asama("model"):
+        ...
+    Blok içinde hata olursa süre yine kaydedilir ve hata sayılır; hata yukarı iletilir.
+    """
+    baslangic = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        kaydet(ad, time.perf_counter() - baslangic, hata=e, **etiketler)
+        raise
+    kaydet(ad, time.perf_counter() - baslangic, **etiketler)
+
+
+def say(ad, miktar=1):
+    with _kilit:
+        _sayaclar[ad] = _sayaclar.get(ad, 0) + miktar
+    _gunlukcu().info(json.dumps({"zaman": round(time.time(), 3), "sayac": ad, "miktar": miktar}, ensure_ascii=False))
+
+
+def _yuzdelik(sirali, oran):
+    """numpy.percentile ile aynı (doğrusal ara değerli) yüzdelik; numpy'yi ilk çizimde yüklememek için."""
+    if not sirali:
+        return 0.0
+    konum = (len(sirali) - 1) * oran
+    alt = int(konum)
+    ust = min(alt + 1, len(sirali) - 1)
+    return sirali[alt] + (sirali[ust] - sirali[alt]) * (konum - alt)
+
+
+def ozet():
+    """Aşama başına son PENCERE ölçümün p50/p95/p99 değerleri (ms) ve sayaçlar."""
+    with _kilit:
+        pencereler = {ad: sorted(s * 1000 for _, s in d) for ad, d in _sureler.items()}
+        toplamlar = {ad: dict(t) for ad, t in _toplamlar.items()}
+        sayaclar = dict(_sayaclar)
+    asamalar = {}
+    for ad, sureler in sorted(pencereler.items()):
+        p50, p95, p99 = (_yuzdelik(sureler, q) for q in (0.50, 0.95, 0.99))
+        asamalar[ad] = {
+            "adet": toplamlar[ad]["adet"],
+            "hata": toplamlar[ad]["hata"],
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+        }
+    return {"asamalar": asamalar, "sayaclar": sayaclar}
+
+
+def prometheus_metni():
+    veri = ozet()
+    with _kilit:
+        toplamlar = {ad: dict(t) for ad, t in _toplamlar.items()}
+    satirlar = [
+        "# HELP konusma_asama_suresi_saniye Aşama süreleri (son ölçümler üzerinden yüzdelikler)",
+        "# TYPE konusma_asama_suresi_saniye summary",
+    ]
+    for ad, a in veri["asamalar"].items():
+        for q, anahtar in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            satirlar.append(f'konusma_asama_suresi_saniye{{asama="{ad}",quantile="{q}"}} {a[anahtar] / 1000:.4f}')
+        satirlar.append(f'konusma_asama_suresi_saniye_sum{{asama="{ad}"}} {toplamlar[ad]["toplam"]:.4f}')
+        satirlar.append(f'konusma_asama_suresi_saniye_count{{asama="{ad}"}} {a["adet"]}')
+    satirlar.append("# TYPE konusma_asama_hata_toplam counter")
+    for ad, a in veri["asamalar"].items():
+        satirlar.append(f'konusma_asama_hata_toplam{{asama="{ad}"}} {a["hata"]}')
+    satirlar.append("# TYPE konusma_sayac_toplam counter")
+    for ad, deger in sorted(veri["sayaclar"].items()):
+        satirlar.append(f'konusma_sayac_toplam{{ad="{ad}"}} {deger}')
+    return "\n".join(satirlar) + "\n"
+
+
+def _prom_yaz(zorla=False):
+    global _son_prom_yazma
+    simdi = time.time()
+    # Aynı anda biten aşamalardan sadece biri yazar
+    with _kilit:
+        if not zorla and simdi - _son_prom_yazma < PROM_YAZMA_ARALIGI:
+            return
+        _son_prom_yazma = simdi
+    try:
+        hedef = veri_yolu("olcum.prom")
+        # zorla=True ile yine de eşzamanlı yazılabilir; her iş parçacığının kendi geçici dosyası olur
+        gecici = f"{hedef}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(gecici, "w", encoding="utf-8") as f:
+            f.write(prometheus_metni())
+        os.replace(gecici, hedef)
+    except OSError:
+        pass
@@ -0,0 +1,382 @@
+import abc
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from yerel_depo import baglan
+
+# --- ORTAK DURUM ---
+# Birden çok Streamlit sunucu süreci (ör. sınav günü yük dengeleyici arkasında) şu durumları paylaşır:
+# sınav hakkı sayaçları, sonuç önbelleği ve Gemini kota kovaları. Depo ORTAK_DEPO ile seçilir:
+#   - "sqlite" (varsayılan) veya "sqlite:////yol/ortak.db": tek SQLite dosyası; aynı makinedeki süreçler için
+#     ("sqlite:///ortak.db" gibi göreli yollar çalışma klasörüne göredir)
+#   - "redis://sunucu:6379/0": Redis; farklı makinelerdeki süreçler için ('redis' paketi gerekir)
+# Kontrol edip yazan işlemler (hak ayırma, kovadan jeton alma) her iki depoda da atomiktir:
+# SQLite'ta BEGIN IMMEDIATE işlemi, Redis'te Lua betiği.
+#
+# Ses verisi ve puanlama işleri süreç içinde kalır (Streamlit oturumları zaten tek sürece bağlıdır).
+# Aynı makinede birden çok süreç çalışıyorsa her biri kendi KONUSMA_VERI_KLASORU'nu kullanmalı,
+# ORTAK_DEPO ise hepsinde aynı olmalıdır.
+
+ORTAK_DEPO = os.environ.get("ORTAK_DEPO", "sqlite")
+ANAHTAR_ONEKI = os.environ.get("ORTAK_DEPO_ONEKI", "konusma:")
+DOSYA_ADI = "ortak_durum.db"
+# Sayaç bu kadar süre değişmezse silinir; sonraki kontrol tablodaki sayıdan yeniden başlar
+# (yönetici tablodan satır silerek hak verdiğinde sayaç sonsuza kadar engellemesin)
+HAK_OMRU = 12 * 3600  # saniye
+
+
+class Depo(abc.ABC):
+    """
+    Ortak durum arayüzü. Süreler saniyedir; zaman deponun saatine göre ölçülür.
+    uzak: depo bu sürecin veri klasörü dışındaysa (başka süreçlerle paylaşılıyorsa) True;
+    o zaman yerel SQLite dosyalarındaki önbellekler de depoya yazılır.
+    """
+
+    uzak = False
+
+    @abc.abstractmethod
+    def hak_ayir(self, ogrenci, sinir, kullanilan):
+        """
+        Öğrenci için bir sınav hakkı ayırır. kullanilan: tablodan bilinen hak sayısı.
+        Sayaç max(sayaç, kullanilan) üzerinden ilerler; sınıra ulaşılmışsa False.
+        """
+
+    @abc.abstractmethod
+    def hak_iade(self, ogrenci):
+        """Sonucu kaydedilmeden biten sınavın ayrılan hakkını geri verir."""
+
+    @abc.abstractmethod
+    def hak_sayisi(self, ogrenci):
+        """Sayaçtaki (devam edenler dahil) hak sayısı; sayaç yoksa 0."""
+
+    @abc.abstractmethod
+    def getir(self, anahtar):
+        """Metin değer veya None."""
+
+    @abc.abstractmethod
+    def koy(self, anahtar, deger, omur=None):
+        """deger metnini saklar; omur verilirse o kadar saniye sonra silinir."""
+
+    @abc.abstractmethod
+    def koy_yoksa(self, anahtar, deger, omur=None):
+        """koy gibi, ancak yalnızca anahtar yoksa (veya süresi dolmuşsa) yazar; atomiktir. Yazdıysa True."""
+
+    @abc.abstractmethod
+    def sil(self, anahtar):
+        """anahtarı siler (yoksa bir şey yapmaz)."""
+
+    @abc.abstractmethod
+    def kova_al(self, ad, kovalar):
+        """
+        kovalar: [(kova, miktar, kapasite, saniyelik_hiz)]. Tüm kovalarda yer varsa ve ad için
+        duraklama yoksa hepsinden birlikte düşer ve 0 döner;
+        yoksa hiçbirine dokunmadan gereken bekleme süresini döndürür.
+        """
+
+    @abc.abstractmethod
+    def kova_tahmin(self, ad, kovalar):
+        """
+        kova_al'ın o an döndüreceği bekleme süresi; hiçbir şey yazmaz ve yazma kilidi almaz
+        (sırada bekleyen her istek her turda tahmin ister). Miktar kapasiteye yuvarlanmaz:
+        sıradaki yer için öndeki isteklerin toplamı verilir.
+        """
+
+    @abc.abstractmethod
+    def duraklat(self, ad, sure):
+        """ad için sure saniye boyunca kova_al'ın izin vermemesini sağlar."""
+
+
+# --- SQLITE ---
+class SqliteDepo(Depo):
+    def __init__(self, yol=None):
+        self._yol = yol
+        self.uzak = yol is not None
+        self._kilit = threading.Lock()
+        self._conn = None
+
+    def _baglanti(self):
+        if self._conn is None:
+            self._conn = baglan(self._yol or DOSYA_ADI)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sayaclar (
+                    anahtar TEXT PRIMARY KEY,
+                    deger INTEGER,
+                    bitis REAL
+                );
+                CREATE TABLE IF NOT EXISTS degerler (
+                    anahtar TEXT PRIMARY KEY,
+                    deger TEXT,
+                    bitis REAL
+                );
+                CREATE TABLE IF NOT EXISTS kovalar (
+                    anahtar TEXT PRIMARY KEY,
+                    miktar REAL,
+                    son REAL
+                );
+            """)
+            simdi = time.time()
+            self._conn.execute("DELETE FROM sayaclar WHERE bitis < ?", (simdi,))
+            self._conn.execute("DELETE FROM degerler WHERE bitis < ?", (simdi,))
+            self._conn.commit()
+        return self._conn
+
+    @contextmanager
+    def _islem(self):
+        """Diğer süreçleri de bekleten yazma işlemi (BEGIN IMMEDIATE)."""
+        with self._kilit:
+            conn = self._baglanti()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @staticmethod
+    def _sayac(conn, anahtar, simdi):
+        row = conn.execute("SELECT deger FROM sayaclar WHERE anahtar = ? AND bitis > ?", (anahtar, simdi)).fetchone()
+        return row["deger"] if row else 0
+
+    def hak_ayir(self, ogrenci, sinir, kullanilan):
+        simdi = time.time()
+        with self._islem() as conn:
+            n = max(self._sayac(conn, ogrenci, simdi), kullanilan)
+            if n >= sinir:
+                return False
+            conn.execute("INSERT OR REPLACE INTO sayaclar VALUES (?, ?, ?)", (ogrenci, n + 1, simdi + HAK_OMRU))
+            return True
+
+    def hak_iade(self, ogrenci):
+        with self._islem() as conn:
+            conn.execute("UPDATE sayaclar SET deger = deger - 1 WHERE anahtar = ? AND deger > 0", (ogrenci,))
+
+    def hak_sayisi(self, ogrenci):
+        with self._kilit:
+            return self._sayac(self._baglanti(), ogrenci, time.time())
+
+    def getir(self, anahtar):
+        with self._kilit:
+            row = self._baglanti().execute(
+                "SELECT deger FROM degerler WHERE anahtar = ? AND (bitis IS NULL OR bitis > ?)", (anahtar, time.time())
+            ).fetchone()
+        return row["deger"] if row else None
+
+    def koy(self, anahtar, deger, omur=None):
+        with self._kilit:
+            conn = self._baglanti()
+            conn.execute("INSERT OR REPLACE INTO degerler VALUES (?, ?, ?)", (anahtar, deger, time.time() + omur if omur else None))
+            conn.commit()
+
+    def koy_yoksa(self, anahtar, deger, omur=None):
+        simdi = time.time()
+        with self._islem() as conn:
+            conn.execute("DELETE FROM degerler WHERE anahtar = ? AND bitis <= ?", (anahtar, simdi))
+            cur = conn.execute("INSERT OR IGNORE INTO degerler VALUES (?, ?, ?)", (anahtar, deger, simdi + omur if omur else None))
+            return cur.rowcount == 1
+
+    def sil(self, anahtar):
+        with self._kilit:
+            conn = self._baglanti()
+            conn.execute("DELETE FROM degerler WHERE anahtar = ?", (anahtar,))
+            conn.commit()
+
+    @staticmethod
+    def _kova_durumu(conn, ad, kovalar, simdi, sinirla=True):
+        """
+        Gereken bekleme ve harcanırsa kovaların yeni miktarları [(anahtar, miktar)].
+        sinirla=False (tahmin): miktar öndeki isteklerin toplamıdır, kapasiteye yuvarlanmaz.
+        """
+        row = conn.execute("SELECT deger FROM degerler WHERE anahtar = ?", (f"{ad}:duraklama",)).fetchone()
+        bekleme = (float(row["deger"]) if row else 0.0) - simdi
+        durumlar = []
+        for kova, miktar, kapasite, hiz in kovalar:
+            anahtar = f"{ad}:{kova}"
+            row = conn.execute("SELECT miktar, son FROM kovalar WHERE anahtar = ?", (anahtar,)).fetchone()
+            mevcut = kapasite if row is None else min(kapasite, row["miktar"] + (simdi - row["son"]) * hiz)
+            # Kapasiteyi aşan istekler kapasiteye yuvarlanır (yoksa hiç geçemezler)
+            gereken = min(miktar, kapasite) if sinirla else miktar
+            bekleme = max(bekleme, (gereken - mevcut) / hiz)
+            durumlar.append((anahtar, mevcut - gereken))
+        return bekleme, durumlar
+
+    def kova_al(self, ad, kovalar):
+        simdi = time.time()
+        with self._islem() as conn:
+            bekleme, durumlar = self._kova_durumu(conn, ad, kovalar, simdi)
+            if bekleme <= 0:
+                conn.executemany("INSERT OR REPLACE INTO kovalar VALUES (?, ?, ?)", [(a, m, simdi) for a, m in durumlar])
+        return max(0.0, bekleme)
+
+    def kova_tahmin(self, ad, kovalar):
+        # BEGIN IMMEDIATE yerine düz okuma: WAL'da yazanları beklemez, onları da bekletmez
+        with self._kilit:
+            conn = self._baglanti()
+            bekleme, _ = self._kova_durumu(conn, ad, kovalar, time.time(), sinirla=False)
+        return max(0.0, bekleme)
+
+    def duraklat(self, ad, sure):
+        simdi = time.time()
+        with self._islem() as conn:
+            anahtar = f"{ad}:duraklama"
+            row = conn.execute("SELECT deger FROM degerler WHERE anahtar = ?", (anahtar,)).fetchone()
+            bitis = max(float(row["deger"]) if row else 0.0, simdi + sure)
+            conn.execute("INSERT OR REPLACE INTO degerler VALUES (?, ?, ?)", (anahtar, str(bitis), bitis))
+
+
+# --- REDIS ---
+_HAK_AYIR = """
+local n = tonumber(redis.call('GET', KEYS[1]) or '0')
+local kullanilan = tonumber(ARGV[1])
+if kullanilan > n then n = kullanilan end
+if n >= tonumber(ARGV[2]) then return 0 end
+redis.call('SET', KEYS[1], n + 1, 'EX', tonumber(ARGV[3]))
+return 1
+"""
+
+_HAK_IADE = """
+local n = tonumber(redis.call('GET', KEYS[1]) or '0')
+if n > 0 then redis.call('DECR', KEYS[1]) end
+return n
+"""
+
+# KEYS[1]: duraklama, KEYS[2..]: kovalar; ARGV[1]: harca ('1'/'0'), sonra her kova için miktar, kapasite, hız
+_KOVA_AL = """
+local t = redis.call('TIME')
+local simdi = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bekleme = tonumber(redis.call('GET', KEYS[1]) or '0') - simdi
+local kalan = {}
+for i = 2, #KEYS do
+    local j = (i - 2) * 3 + 2
+    local miktar, kapasite, hiz = tonumber(ARGV[j]), tonumber(ARGV[j + 1]), tonumber(ARGV[j + 2])
+    local k = redis.call('HMGET', KEYS[i], 'miktar', 'son')
+    local mevcut = kapasite
+    if k[1] then mevcut = math.min(kapasite, tonumber(k[1]) + (simdi - tonumber(k[2])) * hiz) end
+    -- Sadece harcanırken kapasiteye yuvarlanır; tahminde miktar öndeki isteklerin toplamıdır
+    local gereken = miktar
+    if ARGV[1] == '1' then gereken = math.min(miktar, kapasite) end
+    bekleme = math.max(bekleme, (gereken - mevcut) / hiz)
+    kalan[i] = {mevcut - gereken, math.ceil(kapasite / hiz) + 60}
+end
+if bekleme <= 0 and ARGV[1] == '1' then
+    for i = 2, #KEYS do
+        redis.call('HSET', KEYS[i], 'miktar', tostring(kalan[i][1]), 'son', tostring(simdi))
+        -- Dolana kadar kullanılmayan kova silinir; olmayan kova dolu sayılır
+        redis.call('EXPIRE', KEYS[i], kalan[i][2])
+    end
+end
+return tostring(math.max(0, bekleme))
+"""
+
+_DURAKLAT = """
+local t = redis.call('TIME')
+local bitis = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+if bitis > tonumber(redis.call('GET', KEYS[1]) or '0') then
+    redis.call('SET', KEYS[1], tostring(bitis), 'EX', math.ceil(tonumber(ARGV[1])) + 1)
+end
+return 1
+"""
+
+
+class RedisDepo(Depo):
+    uzak = True
+
+    def __init__(self, adres, onek=ANAHTAR_ONEKI):
+        self._adres = adres
+        self._onek = onek
+        self._kilit = threading.Lock()
+        self._istemci = None
+        self._betikler = {}
+
+    def _r(self):
+        # 'redis' paketi sadece bu depo seçildiğinde ve ilk kullanımda yüklenir
+        with self._kilit:
+            if self._istemci is None:
+                try:
+                    import redis
+                except ImportError:
+                    raise RuntimeError("ORTAK_DEPO bir Redis adresi, ancak 'redis' paketi kurulu değil (pip install redis).")
+                self._istemci = redis.Redis.from_url(self._adres, decode_responses=True)
+                for ad, betik in (("hak_ayir", _HAK_AYIR), ("hak_iade", _HAK_IADE), ("kova_al", _KOVA_AL), ("duraklat", _DURAKLAT)):
+                    self._betikler[ad] = self._istemci.register_script(betik)
+        return self._istemci
+
+    def _betik(self, ad, keys, args):
+        self._r()
+        return self._betikler[ad](keys=[self._onek + k for k in keys], args=args)
+
+    def hak_ayir(self, ogrenci, sinir, kullanilan):
+        return bool(self._betik("hak_ayir", [f"hak:{ogrenci}"], [kullanilan, sinir, HAK_OMRU]))
+
+    def hak_iade(self, ogrenci):
+        self._betik("hak_iade", [f"hak:{ogrenci}"], [])
+
+    def hak_sayisi(self, ogrenci):
+        return int(self._r().get(f"{self._onek}hak:{ogrenci}") or 0)
+
+    def getir(self, anahtar):
+        return self._r().get(f"{self._onek}deger:{anahtar}")
+
+    def koy(self, anahtar, deger, omur=None):
+        self._r().set(f"{self._onek}deger:{anahtar}", deger, ex=int(omur) if omur else None)
+
+    def koy_yoksa(self, anahtar, deger, omur=None):
+        return bool(self._r().set(f"{self._onek}deger:{anahtar}", deger, ex=int(omur) if omur else None, nx=True))
+
+    def sil(self, anahtar):
+        self._r().delete(f"{self._onek}deger:{anahtar}")
+
+    def _kova(self, ad, kovalar, harca):
+        anahtarlar = [f"{ad}:duraklama"] + [f"{ad}:{kova}" for kova, *_ in kovalar]
+        args = ["1" if harca else "0"]
+        for _, miktar, kapasite, hiz in kovalar:
+            args += [miktar, kapasite, hiz]
+        return float(self._betik("kova_al", anahtarlar, args))
+
+    def kova_al(self, ad, kovalar):
+        return self._kova(ad, kovalar, harca=True)
+
+    def kova_tahmin(self, ad, kovalar):
+        # harca='0' iken betik hiçbir anahtara yazmaz
+        return self._kova(ad, kovalar, harca=False)
+
+    def duraklat(self, ad, sure):
+        self._betik("duraklat", [f"{ad}:duraklama"], [sure])
+
+
+# --- SEÇİLİ DEPO ---
+_depo = None
+_depo_kilidi = threading.Lock()
+
+
+def depo_olustur(adres):
+    if adres.startswith(("redis://", "rediss://", "unix://")):
+        return RedisDepo(adres)
+    if adres.startswith("sqlite:///"):
+        # Göreli yol veri klasörüne değil çalışma klasörüne göre çözülür; her süreç aynı dosyayı görmeli
+        return SqliteDepo(os.path.abspath(adres[len("sqlite:///"):]))
+    if adres == "sqlite":
+        return SqliteDepo()
+    raise ValueError(f"Tanınmayan ORTAK_DEPO değeri: {adres}")
+
+
+def depo():
+    global _depo
+    with _depo_kilidi:
+        if _depo is None:
+            _depo = depo_olustur(ORTAK_DEPO)
+        return _depo
+
+
+def hak_ayir(ogrenci, sinir, kullanilan):
+    return depo().hak_ayir(ogrenci, sinir, kullanilan)
+
+
+def hak_iade(ogrenci):
+    depo().hak_iade(ogrenci)
+
+
+def hak_sayisi(ogrenci):
+    return depo().hak_sayisi(ogrenci)
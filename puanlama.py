@@ -0,0 +1,437 @@
+import io
+import json
+import os
+import time
+import gemini_istemcisi as genai
+
+import akis_ayristirici
+import gemini_siniri
+import olcum
+import puanlama_hatti
+import sonuc_onbellegi
+import transkript_deposu
+from tembel_yukleme import tembel_modul
+
+# numpy/soundfile ilk puanlamada yüklenir
+ses_hazirlama = tembel_modul("ses_hazirlama")
+ses_analizi = tembel_modul("ses_analizi")
+
+# --- PUANLAMA ---
+# Ses kaydını Gemini ile değerlendiren ortak mantık.
+# Hem Streamlit arayüzü hem de arka plandaki puanlama işleri bu modülü kullanır.
+
+MODEL = 'gemini-flash-latest'
+# İstem (prompt) veya kriterler değiştiğinde artırılır; eski önbellek kayıtları geçersiz olur.
+# Sürüm etiketi her sonuca "istem_surumu" olarak da işlenir.
+ISTEM_SURUMU = "v2"         # tek çağrıda transkript + puan
+TRANSKRIPT_SURUMU = "t1"    # iki aşamalı mod: sesten transkript
+PUANLAMA_SURUMU = "p2"      # iki aşamalı mod ve toplu yeniden puanlama: transkriptten puan
+# "iki_asamali": önce transkript çıkarılıp saklanır, puan ayrı bir metin isteğiyle verilir.
+# İstem değişince saklanan transkriptler ses olmadan yeniden puanlanabilir (bkz. yeniden_puanla.py).
+PUANLAMA_MODU = os.environ.get("PUANLAMA_MODU", "tek")
+# Akışlı modda model cevabı parça parça okunur; transkript ve puanlar geldikçe kismi_bildir'e iletilir
+AKISLI_PUANLAMA = os.environ.get("PUANLAMA_AKISI", "1") != "0"
+# Geçersiz (ayrıştırılamayan/eksik alanlı) model cevabında aynı dosyayla kaç kez üretileceği
+AYRISTIRMA_DENEMESI = 2
+
+def _durum_bildir(status_container, label):
+    if status_container is not None:
+        status_container.update(label=label, state="running")
+
+def _akisla_uret(model, icerik, generation_config, kismi_bildir):
+    """Cevabı stream=True ile okur, her parçada o ana kadar çıkan alanları bildirir ve tüm metni döndürür."""
+    baslangic = time.perf_counter()
+    okuyucu = akis_ayristirici.ArtimliJson()
+    parcalar = []
+    for parca in model.generate_content(icerik, generation_config=generation_config, stream=True):
+        if not parcalar:
+            olcum.kaydet("model_ilk_parca", time.perf_counter() - baslangic)
+        parcalar.append(parca.text)
+        okuyucu.besle(parca.text)
+        kismi_bildir(okuyucu.durum())
+    return "".join(parcalar)
+
+def _kota_bildirici(status_container):
+    def bildir(sira, bekleme):
+        if sira is None:
+            _durum_bildir(status_container, f"Servis yoğun, {bekleme:.0f} sn sonra tekrar denenecek... ⏳")
+        else:
+            _durum_bildir(status_container, f"Kota sırası: {sira}. sıradasınız (tahmini bekleme ~{bekleme:.0f} sn) ⏳")
+    return bildir
+
+def istem_surumu():
+    """Geçerli moddaki sonuçların istem sürümü etiketi (önbellek anahtarına da girer)."""
+    if PUANLAMA_MODU == "iki_asamali":
+        return f"{TRANSKRIPT_SURUMU}+{PUANLAMA_SURUMU}"
+    return ISTEM_SURUMU
+
+def _olcum_satiri(ozellikler):
+    if not ozellikler:
+        return ""
+    return f"Ses Ölçümleri (kayıttan yerel olarak hesaplandı): {ses_analizi.istem_metni(ozellikler)}."
+
+def _istem(konu, detaylar, ozellikler=None):
+    # Metin değişirse ISTEM_SURUMU artırılmalı
+    prompt = f"""
+        Sen bir Türkçe Öğretmenisin.
+        Konu: {konu}. 
+        Beklenen Plan: {detaylar}.
+        {_olcum_satiri(ozellikler)}
+        
+        GÖREVLER:
+        1. Ses kaydının transkriptini çıkar.
+        2. Şu kriterlere göre 1-3 arası puan ver: İçerik, Düzen, Dil, Akıcılık.
+           Akıcılığı puanlarken ses ölçümlerini (verildiyse) nesnel veri olarak kullan.
+        3. Toplam puanı 100'lük sisteme çevir.
+        4. Öğrenciye motive edici kısa bir yorum yaz.
+        
+        ÇOK ÖNEMLİ KURAL:
+        Cevabı SADECE aşağıdaki JSON formatında ver. Başka hiçbir metin veya markdown (```json gibi) ekleme.
+        Anahtarlar (key) mutlaka çift tırnak (") içinde olmalı.
+        
+        {{
+            "transkript": "...",
+            "kriter_puanlari": {{
+                "konu_icerik": 0,
+                "duzen": 0,
+                "dil": 0,
+                "akicilik": 0
+            }},
+            "yuzluk_sistem_puani": 0,
+            "ogretmen_yorumu": "..."
+        }}
+        """
+    return prompt
+
+def _transkript_istemi():
+    # Metin değişirse TRANSKRIPT_SURUMU artırılmalı
+    prompt = """
+        Ses kaydındaki Türkçe konuşmanın transkriptini çıkar.
+        Konuşmayı düzeltme veya özetleme; tekrarları, dolgu sözcüklerini ve yarım kalan cümleleri olduğu gibi yaz.
+        
+        ÇOK ÖNEMLİ KURAL:
+        Cevabı SADECE aşağıdaki JSON formatında ver. Başka hiçbir metin veya markdown (```json gibi) ekleme.
+        
+        {
+            "transkript": "..."
+        }
+        """
+    return prompt
+
+def _puanlama_istemi(konu, detaylar, ogeler, ses_ozellikleri=None):
+    # Metin değişirse PUANLAMA_SURUMU artırılmalı
+    ses_ozellikleri = ses_ozellikleri or {}
+    metinler = "\n\n".join(
+        "\n".join(filter(None, [f"### ogrenci_id: {kimlik}", _olcum_satiri(ses_ozellikleri.get(kimlik)), transkript]))
+        for kimlik, transkript in ogeler
+    )
+    prompt = f"""
+        Sen bir Türkçe Öğretmenisin.
+        Konu: {konu}. 
+        Beklenen Plan: {detaylar}.
+        
+        Aşağıda bu konuda konuşma yapan {len(ogeler)} öğrencinin konuşma transkriptleri var.
+        Her "### ogrenci_id: ..." satırından sonraki metin o öğrencinin konuşmasıdır. Her öğrenciyi ayrı değerlendir.
+        Bazı öğrencilerin transkriptinden önce kayıttan hesaplanmış "Ses Ölçümleri" satırı bulunur.
+        
+        GÖREVLER (her öğrenci için):
+        1. Şu kriterlere göre 1-3 arası puan ver: İçerik, Düzen, Dil, Akıcılık.
+           Akıcılığı transkriptteki tekrarlara, dolgu sözcüklerine ve yarım kalan cümlelere bakarak değerlendir;
+           ses ölçümleri verildiyse onları nesnel veri olarak kullan.
+        2. Toplam puanı 100'lük sisteme çevir.
+        3. Öğrenciye motive edici kısa bir yorum yaz.
+        
+        ÇOK ÖNEMLİ KURAL:
+        Cevabı SADECE aşağıdaki JSON formatında ver. Başka hiçbir metin veya markdown (```json gibi) ekleme.
+        "sonuclar" listesinde her öğrenci için bir nesne olmalı; "ogrenci_id" transkriptin başındaki değerle aynı olmalı.
+        
+        {{
+            "sonuclar": [
+                {{
+                    "ogrenci_id": "...",
+                    "kriter_puanlari": {{
+                        "konu_icerik": 0,
+                        "duzen": 0,
+                        "dil": 0,
+                        "akicilik": 0
+                    }},
+                    "yuzluk_sistem_puani": 0,
+                    "ogretmen_yorumu": "..."
+                }}
+            ]
+        }}
+        
+        TRANSKRİPTLER:
+        
+        {metinler}
+        """
+    return prompt
+
+def _json_oku(text):
+    text = text.strip()
+    
+    # Markdown temizliği
+    if text.startswith("```json"): text = text[7:]
+    if text.startswith("```"): text = text[3:]
+    if text.endswith("```"): text = text[:-3]
+        
+    sonuc = json.loads(text)
+    if not isinstance(sonuc, dict):
+        raise ValueError("Model cevabı bir JSON nesnesi değil.")
+    return sonuc
+
+def _puanlari_dogrula(sonuc):
+    if not isinstance(sonuc, dict):
+        raise ValueError("Öğrenci sonucu bir JSON nesnesi değil.")
+    kp = sonuc.get("kriter_puanlari")
+    if not isinstance(kp, dict) or any(not isinstance(kp.get(k), (int, float)) for k in ("konu_icerik", "duzen", "dil", "akicilik")):
+        raise ValueError("Model cevabında kriter puanları eksik.")
+    if not isinstance(sonuc.get("yuzluk_sistem_puani"), (int, float)) or not 0 <= sonuc["yuzluk_sistem_puani"] <= 100:
+        raise ValueError("Model cevabında 100'lük puan eksik veya geçersiz.")
+    if not isinstance(sonuc.get("ogretmen_yorumu"), str):
+        raise ValueError("Model cevabında yorum eksik.")
+
+def cevabi_ayristir(text):
+    """Model cevabını JSON olarak ayrıştırır ve beklenen alanları doğrular; uygun değilse ValueError."""
+    sonuc = _json_oku(text)
+    _puanlari_dogrula(sonuc)
+    if not isinstance(sonuc.get("transkript"), str):
+        raise ValueError("Model cevabında transkript eksik.")
+    return sonuc
+
+def transkripti_ayristir(text):
+    """İki aşamalı modun ilk aşaması: {"transkript": ...} cevabını doğrular."""
+    sonuc = _json_oku(text)
+    if not isinstance(sonuc.get("transkript"), str) or not sonuc["transkript"].strip():
+        raise ValueError("Model cevabında transkript eksik.")
+    return sonuc
+
+def toplu_cevabi_ayristir(text, kimlikler):
+    """
+    Toplu puanlama cevabından {kimlik: sonuç} çıkarır.
+    Beklenmeyen kimlikler ve alanları eksik öğrenci sonuçları atlanır; cevabın tamamı bozuksa ValueError.
+    """
+    liste = _json_oku(text).get("sonuclar")
+    if not isinstance(liste, list):
+        raise ValueError("Model cevabında 'sonuclar' listesi yok.")
+    sonuclar = {}
+    for oge in liste:
+        kimlik = str(oge.get("ogrenci_id", "")).strip() if isinstance(oge, dict) else ""
+        if kimlik not in kimlikler:
+            continue
+        try:
+            _puanlari_dogrula(oge)
+        except ValueError:
+            olcum.say("gecersiz_model_cevabi")
+            continue
+        sonuclar[kimlik] = {
+            "kriter_puanlari": oge["kriter_puanlari"],
+            "yuzluk_sistem_puani": oge["yuzluk_sistem_puani"],
+            "ogretmen_yorumu": oge["ogretmen_yorumu"],
+        }
+    return sonuclar
+
+def transkriptleri_puanla(ogeler, konu, detaylar, oturum=None, bildir=None, ses_ozellikleri=None):
+    """
+    Transkriptleri ses olmadan puanlar; tek istekte birden çok öğrenci gönderilir.
+    ogeler: [(kimlik, transkript)]; ses_ozellikleri: {kimlik: ses_analizi ölçümleri} (olanlar için).
+    Dönüş: {kimlik: sonuç}; her sonuç PUANLAMA_SURUMU ile etiketlenir.
+    Cevapta eksik veya geçersiz kalan öğrenciler için AYRISTIRMA_DENEMESI kadar tekrar istenir;
+    yine de alınamayanlar dönüşte yer almaz.
+    """
+    model = genai.GenerativeModel(MODEL)
+    kalan = [(str(k), t) for k, t in ogeler]
+    ses_ozellikleri = {str(k): v for k, v in (ses_ozellikleri or {}).items()}
+    sonuclar = {}
+    for _ in range(AYRISTIRMA_DENEMESI):
+        if not kalan:
+            break
+        prompt = _puanlama_istemi(konu, detaylar, kalan, ses_ozellikleri)
+        with olcum.asama("model_metin_puanlama", adet=len(kalan)):
+            text = gemini_siniri.cagir(
+                lambda: model.generate_content(prompt, generation_config={"response_mime_type": "application/json"}).text,
+                oturum, len(prompt) // 3 + gemini_siniri.ISTEM_JETONU, bildir
+            )
+        try:
+            with olcum.asama("json_ayristirma"):
+                gelen = toplu_cevabi_ayristir(text, {k for k, _ in kalan})
+        except ValueError:
+            olcum.say("gecersiz_model_cevabi")
+            gelen = {}
+        for kimlik, sonuc in gelen.items():
+            sonuc["istem_surumu"] = PUANLAMA_SURUMU
+            sonuclar[kimlik] = sonuc
+        kalan = [(k, t) for k, t in kalan if k not in sonuclar]
+    return sonuclar
+
+def sesi_analiz_et(audio_bytes, konu, detaylar, status_container=None, kismi_bildir=None, oturum=None):
+    """
+    GÜNCELLENMİŞ FONKSİYON: 
+    - JSON hatalarını önler.
+    - Hata durumunda programın çökmesini engeller.
+    - kismi_bildir verilirse (ve akışlı mod açıksa) yarım sonuç sözlükleri cevap geldikçe ona iletilir;
+      dönen nihai sonuç akışsız modla aynıdır.
+    - Gemini çağrıları gemini_siniri üzerinden gider; oturum, adil sıradaki kuyruğu belirler.
+    - Aşamalar puanlama_hatti'na işlenir; aynı kayıt tekrar gönderilirse başarısız olan aşamadan devam edilir.
+    - PUANLAMA_MODU "iki_asamali" ise transkript ayrı çıkarılıp saklanır ve metin olarak puanlanır.
+    - Kayıt önce yerelde ölçülür (ses_analizi); ölçümler Akıcılık için isteme eklenir.
+      Kullanılamayan (boş, sessiz, kırpılmış, çok kısa) kayıtta yedek sonuç dönmez, ValueError fırlatılır;
+      böylece tabloya satır yazılmaz ve öğrencinin sınav hakkı harcanmaz.
+    """
+    baslangic = time.perf_counter()
+    with olcum.asama("ses_analizi"):
+        ozellikler = ses_analizi.analiz_et(audio_bytes)
+    if ozellikler and ozellikler["sorun"]:
+        olcum.say("reddedilen_kayit")
+        raise ValueError(ozellikler["sorun"])
+    surum = istem_surumu()
+    anahtar = sonuc_onbellegi.anahtar_uret(audio_bytes, konu, detaylar, surum)
+    try:
+        hat = puanlama_hatti.durum(anahtar)
+        if hat["asama"] in (puanlama_hatti.AYRISTIRILDI, puanlama_hatti.KAYDEDILDI) and hat["sonuc"]:
+            # Sonuç alınmış ama kaydedilememişti
+            return _kaydet(anahtar, hat["sonuc"], baslangic)
+        model = genai.GenerativeModel(MODEL)
+        _durum_bildir(status_container, "Sinan Hoca Analiz Ediyor... 🤖")
+        bildir = _kota_bildirici(status_container)
+        
+        def dosyayi_hazirla():
+            """1-3. Hazırla, yükle ve etkinleşmesini bekle; önceki denemede yüklenen dosya duruyorsa o kullanılır."""
+            audio_file, sure = None, None
+            if puanlama_hatti.dosya_gecerli_mi(hat):
+                try:
+                    audio_file = gemini_siniri.cagir(lambda: genai.get_file(hat["dosya_adi"]), bildir=bildir, sinirla=False)
+                    olcum.say("uzak_dosya_yeniden_kullanim")
+                except Exception:
+                    audio_file = None
+            if audio_file is None:
+                # Kayıt bellekte küçültülüp doğrudan yüklenir (geçici dosya yok)
+                with olcum.asama("ses_hazirlama"):
+                    hazir = ses_hazirlama.sesi_hazirla(audio_bytes)
+                sure = hazir["sure"]
+                _durum_bildir(status_container, f"Ses yükleniyor: {ses_hazirlama.boyut_ozeti(hazir)} ⬆️")
+                with olcum.asama("yukleme", bayt=hazir["yeni_boyut"]):
+                    audio_file = gemini_siniri.cagir(
+                        lambda: genai.upload_file(io.BytesIO(hazir["veri"]), mime_type=hazir["mime_type"]),
+                        bildir=bildir, sinirla=False
+                    )
+                puanlama_hatti.isaretle(anahtar, puanlama_hatti.YUKLENDI, dosya_adi=audio_file.name, dosya_zamani=time.time())
+            
+            _durum_bildir(status_container, "Ses kaydı işleniyor... 🎧")
+            # Dosya işlenene kadar bekle
+            with olcum.asama("isleme_bekleme"):
+                while audio_file.state.name == "PROCESSING":
+                    time.sleep(1)
+                    audio_file = gemini_siniri.cagir(lambda: genai.get_file(audio_file.name), bildir=bildir, sinirla=False)
+            if audio_file.state.name != "ACTIVE":
+                # İşlenemeyen dosya tekrar kullanılmaz ve silinir; sonraki deneme yeniden yükler
+                puanlama_hatti.dosyayi_birak(anahtar, audio_file.name)
+                raise RuntimeError(f"Ses dosyası işlenemedi ({audio_file.state.name}).")
+            puanlama_hatti.isaretle(anahtar, puanlama_hatti.ETKIN)
+            return audio_file, sure
+            
+        # JSON formatını garantiye almak için generation_config kullanıyoruz
+        def uret(audio_file, prompt, etiket):
+            # Kota sırası bildirimi durumu değiştirmiş olabilir
+            _durum_bildir(status_container, etiket)
+            if AKISLI_PUANLAMA and kismi_bildir is not None:
+                return _akisla_uret(model, [audio_file, prompt], {"response_mime_type": "application/json"}, kismi_bildir)
+            response = model.generate_content(
+                [audio_file, prompt],
+                generation_config={"response_mime_type": "application/json"}
+            )
+            return response.text
+
+        def sesten_uret(prompt, ayristir, etiket):
+            """
+            4-5. Üret, ayrıştır ve doğrula. Önceki denemede alınmış cevap varsa dosyaya hiç gerek kalmaz;
+            geçersiz cevapta aynı dosyayla bir kez daha üretilir.
+            """
+            text = hat["ham_cevap"] if hat["asama"] == puanlama_hatti.URETILDI else None
+            audio_file, sure = None, None
+            for deneme in range(AYRISTIRMA_DENEMESI):
+                if text is None:
+                    if audio_file is None:
+                        audio_file, sure = dosyayi_hazirla()
+                    with olcum.asama("model"):
+                        text = gemini_siniri.cagir(lambda: uret(audio_file, prompt, etiket), oturum, gemini_siniri.tahmini_jeton(sure), bildir)
+                    puanlama_hatti.isaretle(anahtar, puanlama_hatti.URETILDI, ham_cevap=text)
+                try:
+                    with olcum.asama("json_ayristirma"):
+                        return ayristir(text)
+                except ValueError:
+                    olcum.say("gecersiz_model_cevabi")
+                    puanlama_hatti.isaretle(anahtar, puanlama_hatti.ETKIN, ham_cevap=None)
+                    text = None
+                    if deneme == AYRISTIRMA_DENEMESI - 1:
+                        raise
+
+        if PUANLAMA_MODU == "iki_asamali":
+            # 1. aşama: transkript (saklanmışsa ses hiç yüklenmez)
+            ses_anahtari = transkript_deposu.anahtar_uret(audio_bytes, TRANSKRIPT_SURUMU)
+            transkript = transkript_deposu.getir(ses_anahtari)
+            if transkript is None:
+                transkript = sesten_uret(_transkript_istemi(), transkripti_ayristir, "Transkript çıkarılıyor... 📝")["transkript"]
+                transkript_deposu.koy(ses_anahtari, transkript)
+            # 2. aşama: transkriptten puan
+            _durum_bildir(status_container, "Puanlama yapılıyor... 📝")
+            puanlar = transkriptleri_puanla([("1", transkript)], konu, detaylar, oturum, bildir, {"1": ozellikler} if ozellikler else None)
+            if "1" not in puanlar:
+                raise ValueError("Model transkript için geçerli bir puan döndürmedi.")
+            sonuc = {"transkript": transkript, **puanlar["1"]}
+        else:
+            sonuc = sesten_uret(_istem(konu, detaylar, ozellikler), cevabi_ayristir, "Puanlama yapılıyor... 📝")
+        sonuc["istem_surumu"] = surum
+        if ozellikler:
+            sonuc["ses_olcumleri"] = ozellikler
+        puanlama_hatti.isaretle(anahtar, puanlama_hatti.AYRISTIRILDI, ham_cevap=None, sonuc=sonuc)
+        
+        # 6. Kaydet
+        return _kaydet(anahtar, sonuc, baslangic)
+        
+    except Exception as e:
+        puanlama_hatti.hata_kaydet(anahtar, e)
+        # Sıfır puanlı yedek sonuç: yönetici panelinde ayrıca sayılır
+        olcum.kaydet("puanlama", time.perf_counter() - baslangic, hata=e)
+        olcum.say("yedek_sonuc")
+        return {
+            "yuzluk_sistem_puani": 0, 
+            "transkript": f"Sistem Hatası oluştu: {str(e)}. Lütfen tekrar deneyin.", 
+            "ogretmen_yorumu": "Analiz sırasında teknik bir aksaklık oldu.",
+            "kriter_puanlari": {"konu_icerik":0,"duzen":0,"dil":0,"akicilik":0},
+            "hata": str(e)
+        }
+
+def _kaydet(anahtar, sonuc, baslangic):
+    """Sonucu kalıcı önbelleğe yazar; hat kaydı kapanır ve uzak dosya silinmek üzere sıraya alınır."""
+    sonuc_onbellegi.koy(anahtar, sonuc)
+    puanlama_hatti.kaydedildi(anahtar, sonuc)
+    olcum.kaydet("puanlama", time.perf_counter() - baslangic)
+    return sonuc
+
+def onbellekli_analiz_et(audio_bytes, konu, detaylar, status_container=None, kismi_bildir=None, oturum=None):
+    """
+    Aynı kayıt daha önce puanlandıysa önbellekteki sonucu döndürür.
+    Dönüş: (sonuc, anahtar, onbellekten_mi). Hatalı (sıfır puanlı yedek) sonuçlar önbelleğe alınmaz.
+    """
+    anahtar = sonuc_onbellegi.anahtar_uret(audio_bytes, konu, detaylar, istem_surumu())
+    sonuc = sonuc_onbellegi.getir(anahtar)
+    if sonuc is not None:
+        olcum.say("onbellek_isabet")
+        return sonuc, anahtar, True
+    # Başarılı sonuç sesi_analiz_et içinde (kaydet aşamasında) önbelleğe yazılır
+    sonuc = sesi_analiz_et(audio_bytes, konu, detaylar, status_container, kismi_bildir, oturum)
+    return sonuc, anahtar, False
+
+
+def sonuc_satiri(ad, sinif, numara, konu, sonuc, tarih):
+    """Puanlama sonucunu 'Sinav_Sonuclari' tablosunun satır düzenine çevirir."""
+    kp = sonuc.get("kriter_puanlari", {})
+    detay_metni = f"İçerik: {kp.get('konu_icerik')} | Düzen: {kp.get('duzen')} | Dil: {kp.get('dil')} | Akıcılık: {kp.get('akicilik')}"
+    return [
+        tarih, ad, sinif, numara, konu,
+        sonuc.get("yuzluk_sistem_puani"),
+        detay_metni,
+        sonuc.get("transkript"),
+        sonuc.get("ogretmen_yorumu")
+    ]
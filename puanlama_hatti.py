@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gemini_istemcisi as genai
+import gemini_siniri
+import olcum
+from yerel_depo import baglan
+
+# --- PUANLAMA HATTI ---
+# Puanlama aşamaları: hazırla → yükle → etkinleşmeyi bekle → üret → ayrıştır/doğrula → kaydet.
+# Her kaydın (sonuc_onbellegi anahtarı) tamamladığı son aşama ve ara çıktıları burada tutulur.
+# Bir deneme yarıda kalırsa sonraki deneme kaldığı aşamadan devam eder: yüklenmiş uzak dosya
+# (Gemini Files) tekrar yüklenmez, modelden alınmış cevap tekrar istenmez.
+# Sonuç kalıcı olarak kaydedildiğinde uzak dosya genai.delete_file ile silinir. İşlenemeyen dosyalar
+# kayıttan ayrılıp "silinecek" tablosuna alınır. Silinemeyen dosyalar TEMIZLIK_ARALIGI'nda bir tekrar denenir.
+
+DOSYA_ADI = "puanlama_hatti.db"
+DOSYA_OMRU = 47 * 3600        # saniye; Gemini yüklenen dosyaları 48 saat tutar
+KAYIT_OMRU = 2 * 24 * 3600    # saniye; bu kadar güncellenmeyen hat kayıtları temizlenir
+TEMIZLIK_ARALIGI = 600        # saniye; silinemeyen uzak dosyalar en fazla bu sıklıkla tekrar denenir
+
+YUKLENDI, ETKIN, URETILDI, AYRISTIRILDI, KAYDEDILDI = "yuklendi", "etkin", "uretildi", "ayristirildi", "kaydedildi"
+
+_kilit = threading.Lock()
+_conn = None
+_son_temizlik = 0.0
+# Uzak dosya silme işleri puanlamayı bekletmez
+_temizleyici = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dosya_temizlik")
+
+
+def _baglanti():
+    global _conn, _son_temizlik
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS hat (
+                anahtar TEXT PRIMARY KEY,
+                asama TEXT,
+                dosya_adi TEXT,
+                dosya_zamani REAL,
+                ham_cevap TEXT,
+                sonuc TEXT,
+                deneme INTEGER DEFAULT 0,
+                hata TEXT,
+                guncelleme REAL
+            );
+            CREATE INDEX IF NOT EXISTS ix_hat_asama ON hat (asama, guncelleme);
+            CREATE TABLE IF NOT EXISTS silinecek (
+                dosya_adi TEXT PRIMARY KEY,
+                zaman REAL
+            );
+        """)
+        _conn.commit()
+        # Önceki süreçten kalan silinmemiş dosyalar (kilit bırakıldıktan sonra)
+        _son_temizlik = time.time()
+        _temizleyici.submit(temizle)
+    return _conn
+
+
+def _sozluk(row):
+    if row is None:
+        return None
+    d = dict(row)
+    d["sonuc"] = json.loads(d["sonuc"]) if d["sonuc"] else None
+    return d
+
+
+def durum(anahtar):
+    """Kaydın hat durumunu döndürür; daha önce hiç başlanmadıysa boş bir başlangıç durumu."""
+    with _kilit:
+        row = _baglanti().execute("SELECT * FROM hat WHERE anahtar = ?", (anahtar,)).fetchone()
+    return _sozluk(row) or {"anahtar": anahtar, "asama": None, "dosya_adi": None, "dosya_zamani": None,
+                            "ham_cevap": None, "sonuc": None, "deneme": 0, "hata": None}
+
+
+def isaretle(anahtar, asama, **alanlar):
+    """Aşamanın tamamlandığını ve ara çıktılarını (dosya_adi, ham_cevap, sonuc, ...) kaydeder."""
+    if "sonuc" in alanlar and alanlar["sonuc"] is not None:
+        alanlar["sonuc"] = json.dumps(alanlar["sonuc"], ensure_ascii=False)
+    alanlar.update(asama=asama, hata=None, guncelleme=time.time())
+    with _kilit:
+        conn = _baglanti()
+        conn.execute("INSERT OR IGNORE INTO hat (anahtar) VALUES (?)", (anahtar,))
+        conn.execute(
+            f"UPDATE hat SET {', '.join(f'{k} = ?' for k in alanlar)} WHERE anahtar = ?",
+            (*alanlar.values(), anahtar)
+        )
+        conn.commit()
+    _temizligi_planla()
+
+
+def hata_kaydet(anahtar, hata):
+    """Başarısız denemeyi sayar; tamamlanan aşamalar korunur."""
+    with _kilit:
+        conn = _baglanti()
+        conn.execute("INSERT OR IGNORE INTO hat (anahtar) VALUES (?)", (anahtar,))
+        conn.execute(
+            "UPDATE hat SET deneme = deneme + 1, hata = ?, guncelleme = ? WHERE anahtar = ?",
+            (str(hata)[:500], time.time(), anahtar)
+        )
+        conn.commit()
+
+
+def dosya_gecerli_mi(d):
+    return bool(d["dosya_adi"]) and time.time() - (d["dosya_zamani"] or 0) < DOSYA_OMRU
+
+
+# --- UZAK DOSYA YAŞAM DÖNGÜSÜ ---
+def _temizligi_planla():
+    """Son temizlikten bu yana TEMIZLIK_ARALIGI geçtiyse temizle'yi arka planda çalıştırır."""
+    global _son_temizlik
+    with _kilit:
+        if time.time() - _son_temizlik < TEMIZLIK_ARALIGI:
+            return
+        _son_temizlik = time.time()
+    _temizleyici.submit(temizle)
+
+
+def _dosyayi_sil(anahtar, dosya_adi):
+    """anahtar None ise dosya bir hat kaydına bağlı değildir ("silinecek" tablosunda)."""
+    try:
+        gemini_siniri.cagir(lambda: genai.delete_file(dosya_adi), sinirla=False)
+        olcum.say("uzak_dosya_silindi")
+    except Exception as e:
+        # Dosya zaten silinmiş veya süresi dolmuş olabilir; diğer hatalarda sonraki temizlikte tekrar denenir
+        if getattr(e, "code", None) != 404 and type(e).__name__ != "NotFound":
+            return
+    with _kilit:
+        conn = _baglanti()
+        if anahtar is None:
+            conn.execute("DELETE FROM silinecek WHERE dosya_adi = ?", (dosya_adi,))
+        else:
+            conn.execute("UPDATE hat SET dosya_adi = NULL WHERE anahtar = ? AND dosya_adi = ?", (anahtar, dosya_adi))
+        conn.commit()
+
+
+def dosyayi_birak(anahtar, dosya_adi):
+    """
+    Kullanılamayan (işlenemeyen) uzak dosyayı kayıttan ayırır; sonraki deneme yeniden yükler.
+    Dosya arka planda silinir, silinemezse sonraki temizlikte tekrar denenir.
+    """
+    with _kilit:
+        conn = _baglanti()
+        conn.execute("INSERT OR IGNORE INTO silinecek VALUES (?, ?)", (dosya_adi, time.time()))
+        conn.execute("INSERT OR IGNORE INTO hat (anahtar) VALUES (?)", (anahtar,))
+        conn.execute(
+            "UPDATE hat SET asama = NULL, dosya_adi = NULL, dosya_zamani = NULL, hata = NULL, guncelleme = ? WHERE anahtar = ?",
+            (time.time(), anahtar)
+        )
+        conn.commit()
+    _temizleyici.submit(_dosyayi_sil, None, dosya_adi)
+
+
+def kaydedildi(anahtar, sonuc):
+    """Kaydet aşaması tamamlandı: ara çıktılar bırakılır ve uzak dosya arka planda silinir."""
+    d = durum(anahtar)
+    isaretle(anahtar, KAYDEDILDI, ham_cevap=None, sonuc=sonuc)
+    if d["dosya_adi"]:
+        _temizleyici.submit(_dosyayi_sil, anahtar, d["dosya_adi"])
+
+
+def temizle():
+    """
+    Silinemeyen uzak dosyaları tekrar siler ve eski hat kayıtlarını atar.
+    Süreç başında, sonra isaretle çağrıldıkça en fazla TEMIZLIK_ARALIGI'nda bir çalışır;
+    dönüş: silinmek üzere sıraya alınan dosya sayısı.
+    """
+    global _son_temizlik
+    simdi = time.time()
+    sinir = simdi - KAYIT_OMRU
+    with _kilit:
+        _son_temizlik = simdi
+        conn = _baglanti()
+        silinecek = conn.execute(
+            "SELECT anahtar, dosya_adi FROM hat WHERE dosya_adi IS NOT NULL AND (asama = ? OR guncelleme < ?)",
+            (KAYDEDILDI, sinir)
+        ).fetchall()
+        # Gemini dosyaları 48 saatte kendisi siler; o kadar eski bağımsız dosyalar için denemeye gerek yok
+        conn.execute("DELETE FROM silinecek WHERE zaman < ?", (simdi - DOSYA_OMRU,))
+        silinecek += conn.execute("SELECT NULL AS anahtar, dosya_adi FROM silinecek").fetchall()
+        conn.execute("DELETE FROM hat WHERE guncelleme < ? AND dosya_adi IS NULL", (sinir,))
+        conn.commit()
+    for row in silinecek:
+        _temizleyici.submit(_dosyayi_sil, row["anahtar"], row["dosya_adi"])
+    return len(silinecek)
+
+
+def ozet():
+    """Aşama başına hat kaydı sayısı ve uzakta bekleyen dosya sayısı."""
+    with _kilit:
+        conn = _baglanti()
+        asamalar = {r["asama"]: r["adet"] for r in conn.execute("SELECT asama, COUNT(*) AS adet FROM hat GROUP BY asama")}
+        dosyalar = conn.execute("SELECT COUNT(*) FROM hat WHERE dosya_adi IS NOT NULL").fetchone()[0]
+        dosyalar += conn.execute("SELECT COUNT(*) FROM silinecek").fetchone()[0]
+    return {"asamalar": asamalar, "uzak_dosya": dosyalar}
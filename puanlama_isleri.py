@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import ortak_durum
+import puanlama
+import sonuc_kuyrugu
+import sonuc_onbellegi
+from yerel_depo import baglan
+
+# --- PUANLAMA İŞLERİ ---
+# "Bitir ve Puanla" artık Streamlit betiğini bloklamaz: her gönderim bir iş olur,
+# sınırlı bir iş parçacığı havuzunda çalışır ve arayüz işin durumunu sorgular.
+# İşler oturum ve öğrenci ile birlikte SQLite'a yazıldığı için sayfa yenilense de sonuç kaybolmaz.
+
+DOSYA_ADI = "puanlama_isleri.db"
+HAVUZ_BOYUTU = int(os.environ.get("PUANLAMA_HAVUZ_BOYUTU", "4"))
+KISMI_YAZMA_ARALIGI = 0.3  # saniye; akışlı puanlamada yarım sonucun veritabanına yazılma sıklığı
+
+KUYRUKTA, CALISIYOR, TAMAMLANDI, HATA = "kuyrukta", "calisiyor", "tamamlandi", "hata"
+
+_kilit = threading.Lock()
+_conn = None
+_havuz = ThreadPoolExecutor(max_workers=HAVUZ_BOYUTU, thread_name_prefix="puanlama")
+
+
+def _baglanti():
+    global _conn
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS isler (
+                id TEXT PRIMARY KEY,
+                oturum TEXT,
+                ogrenci TEXT,
+                durum TEXT,
+                asama TEXT,
+                bilgi TEXT,
+                sonuc TEXT,
+                olusturma REAL,
+                bitis REAL
+            );
+            CREATE INDEX IF NOT EXISTS ix_isler_oturum ON isler (oturum, ogrenci, olusturma);
+        """)
+        # Akışlı puanlamanın yarım sonucu (eski veritabanlarında sütun yok)
+        if "kismi" not in {r["name"] for r in _conn.execute("PRAGMA table_info(isler)")}:
+            _conn.execute("ALTER TABLE isler ADD COLUMN kismi TEXT")
+        # Ses verisi bellekte tutulduğu için süreç yeniden başladığında yarım kalan işler devam edemez;
+        # onlar için ayrılan sınav hakları geri verilir
+        for row in _conn.execute("SELECT ogrenci, bilgi FROM isler WHERE durum IN (?, ?)", (KUYRUKTA, CALISIYOR)).fetchall():
+            if json.loads(row["bilgi"] or "{}").get("hak_ayrildi"):
+                ortak_durum.hak_iade(row["ogrenci"])
+        _conn.execute(
+            "UPDATE isler SET durum = ?, asama = ?, bitis = ? WHERE durum IN (?, ?)",
+            (HATA, "Sunucu yeniden başladı, lütfen tekrar gönderin.", time.time(), KUYRUKTA, CALISIYOR)
+        )
+        _conn.commit()
+    return _conn
+
+
+def ogrenci_anahtari(sinif, numara):
+    return f"{str(sinif).strip()}|{str(numara).strip()}"
+
+
+def _guncelle(is_id, **alanlar):
+    with _kilit:
+        conn = _baglanti()
+        conn.execute(
+            f"UPDATE isler SET {', '.join(f'{k} = ?' for k in alanlar)} WHERE id = ?",
+            (*alanlar.values(), is_id)
+        )
+        conn.commit()
+
+
+class _IsDurumu:
+    """sesi_analiz_et'in beklediği status_container arayüzünü işin aşamasına yansıtır."""
+
+    def __init__(self, is_id):
+        self.is_id = is_id
+        self._son_kismi = 0.0
+        self._kismi_alanlar = set()
+
+    def update(self, label=None, state=None, **kwargs):
+        if label:
+            _guncelle(self.is_id, asama=label)
+
+    def kismi(self, sonuc):
+        """
+        Akışlı puanlamada o ana kadar gelen alanları işe yazar.
+        Yalnızca transkript uzadıysa yazma seyreltilir; yeni bir alan tamamlandığında hemen yazılır.
+        """
+        simdi = time.monotonic()
+        if set(sonuc) == self._kismi_alanlar and simdi - self._son_kismi < KISMI_YAZMA_ARALIGI:
+            return
+        self._son_kismi = simdi
+        self._kismi_alanlar = set(sonuc)
+        _guncelle(self.is_id, kismi=json.dumps(sonuc, ensure_ascii=False))
+
+
+def _calistir(is_id, oturum, audio_bytes, bilgi, detaylar, kaydet):
+    _guncelle(is_id, durum=CALISIYOR, asama="Başladı")
+    try:
+        durum = _IsDurumu(is_id)
+        sonuc, anahtar, _ = puanlama.onbellekli_analiz_et(audio_bytes, bilgi["konu"], detaylar, durum, durum.kismi, oturum)
+        ogrenci = ogrenci_anahtari(bilgi["sinif"], bilgi["numara"])
+        hatali = "hata" in sonuc
+        # Aynı kayıt bu öğrenci için zaten kaydedildiyse (veya başka bir iş kaydediyorsa) tabloya ikinci satır
+        # yazılmaz; işaret yazmadan önce atomik olarak alınır, yazma başarısız olursa bırakılır
+        if hatali or sonuc_onbellegi.kaydi_ayir(anahtar, ogrenci):
+            _guncelle(is_id, asama="📝 Sonuçlar kaydediliyor...")
+            try:
+                kaydet(puanlama.sonuc_satiri(
+                    bilgi["ad"], bilgi["sinif"], bilgi["numara"], bilgi["konu"], sonuc,
+                    datetime.now().strftime("%Y-%m-%d %H:%M")
+                ))
+            except Exception:
+                if not hatali:
+                    sonuc_onbellegi.kaydi_birak(anahtar, ogrenci)
+                raise
+        elif bilgi.get("hak_ayrildi"):
+            # Satır yazılmadı; bu gönderim için ayrılan sınav hakkı geri verilir
+            ortak_durum.hak_iade(ogrenci)
+        _guncelle(is_id, durum=TAMAMLANDI, asama="Tamamlandı", sonuc=json.dumps(sonuc, ensure_ascii=False), bitis=time.time())
+    except Exception as e:
+        _guncelle(is_id, durum=HATA, asama=f"Hata: {e}", bitis=time.time())
+        # Tabloya satır yazılmadı; ayrılan sınav hakkı geri verilir
+        if bilgi.get("hak_ayrildi"):
+            ortak_durum.hak_iade(ogrenci_anahtari(bilgi["sinif"], bilgi["numara"]))
+
+
+def gonder(oturum, ad, sinif, numara, konu, detaylar, audio_bytes, kaydet=sonuc_kuyrugu.ekle, hak_ayrildi=False):
+    """
+    Puanlama işini kuyruğa ekler ve iş kimliğini döndürür. Sonuç satırı kaydet ile yazılır.
+    hak_ayrildi: gönderen ortak_durum.hak_ayir ile hak ayırdıysa True; iş satır yazamadan biterse hak iade edilir.
+    """
+    is_id = uuid.uuid4().hex
+    bilgi = {"ad": ad, "sinif": sinif, "numara": numara, "konu": konu, "hak_ayrildi": hak_ayrildi}
+    with _kilit:
+        conn = _baglanti()
+        conn.execute(
+            "INSERT INTO isler (id, oturum, ogrenci, durum, asama, bilgi, olusturma) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (is_id, oturum, ogrenci_anahtari(sinif, numara), KUYRUKTA, "Sırada bekliyor...", json.dumps(bilgi, ensure_ascii=False), time.time())
+        )
+        conn.commit()
+    _havuz.submit(_calistir, is_id, oturum, audio_bytes, bilgi, detaylar, kaydet)
+    return is_id
+
+
+def _is_sozlugu(row):
+    if row is None:
+        return None
+    d = dict(row)
+    d["bilgi"] = json.loads(d["bilgi"]) if d["bilgi"] else {}
+    d["sonuc"] = json.loads(d["sonuc"]) if d["sonuc"] else None
+    d["kismi"] = json.loads(d["kismi"]) if d.get("kismi") else None
+    return d
+
+
+def is_getir(is_id):
+    with _kilit:
+        row = _baglanti().execute("SELECT * FROM isler WHERE id = ?", (is_id,)).fetchone()
+    return _is_sozlugu(row)
+
+
+def son_is(oturum, sinif=None, numara=None):
+    """Oturumun (öğrenci verilirse o öğrencinin) en son işini döndürür."""
+    sorgu = "SELECT * FROM isler WHERE oturum = ?"
+    parametreler = [oturum]
+    if sinif and numara:
+        sorgu += " AND ogrenci = ?"
+        parametreler.append(ogrenci_anahtari(sinif, numara))
+    sorgu += " ORDER BY olusturma DESC LIMIT 1"
+    with _kilit:
+        row = _baglanti().execute(sorgu, parametreler).fetchone()
+    return _is_sozlugu(row)
+
+
+def sira_no(is_id):
+    """Kuyrukta bekleyen işin önünde kaç iş olduğunu döndürür."""
+    with _kilit:
+        row = _baglanti().execute(
+            "SELECT COUNT(*) AS adet FROM isler WHERE durum = ? AND olusturma < (SELECT olusturma FROM isler WHERE id = ?)",
+            (KUYRUKTA, is_id)
+        ).fetchone()
+    return row["adet"]
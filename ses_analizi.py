@@ -0,0 +1,106 @@
+import wave
+
+import numpy as np
+
+import ses_bolutleme
+import ses_hazirlama
+
+# --- SES ÖN ANALİZİ ---
+# Kayıt yüklenmeden ve modele gitmeden önce yerelde (NumPy ile) ölçülür.
+# Boş, sessiz, kırpılmış veya çok kısa kayıtlar kota harcanmadan hemen reddedilir;
+# geçen kayıtların süre, duraklama ve konuşma hızı ölçümleri Akıcılık için puanlayıcıya verilir.
+
+EN_KISA_SURE = 5.0           # saniye; daha kısa kayıtlar reddedilir
+EN_AZ_KONUSMA = 3.0          # saniye; konuşma sayılan çerçevelerin toplamı
+SESSIZ_ESIK_DB = -45.0       # en yüksek çerçevelerin (95. yüzdelik) bile altında kaldığı kayıt sessizdir
+KIRPILMA_SINIRI = 0.999      # tam ölçeğe bu kadar yakın örnekler kırpılmış sayılır
+KIRPILMA_ORANI = 0.01        # örneklerin bu kadarından fazlası kırpılmışsa kayıt reddedilir
+EN_KISA_DURAKLAMA = 0.5      # saniye; konuşma arasındaki bundan uzun sessizlikler duraklama sayılır
+HECE_PENCERESI = 0.02        # saniye; hece çekirdekleri bu çözünürlükte aranır
+HECE_BELIRGINLIGI_DB = 4.0   # tepe, çevresindeki en düşük enerjiden bu kadar yüksek olmalı
+HECE_ARALIGI = 0.1           # saniye; tepe bu kadarlık komşuluğun en yükseği olmalı
+
+
+def _kosular(maske):
+    """Maskedeki True koşularının [(başlangıç, bitiş)] çerçeve aralıkları."""
+    degisim = np.flatnonzero(np.diff(np.concatenate(([0], maske.astype(np.int8), [0]))))
+    return list(zip(degisim[::2], degisim[1::2]))
+
+
+def hece_sayisi(ornekler, hiz):
+    """Enerji zarfındaki belirgin tepelerden (hece çekirdekleri) tahmini hece sayısı."""
+    enerji = ses_bolutleme.cerceve_enerjisi(ornekler, hiz, HECE_PENCERESI)
+    if len(enerji) < 3:
+        return 0
+    # Kısa dalgalanmaları bastırmak için üç çerçevelik hareketli ortalama
+    enerji = np.convolve(enerji, np.ones(3) / 3, mode="same")
+    yaricap = max(1, int(HECE_ARALIGI / HECE_PENCERESI))
+    dolgulu = np.pad(enerji, yaricap, mode="edge")
+    pencereler = np.lib.stride_tricks.sliding_window_view(dolgulu, 2 * yaricap + 1)
+    tepe = (enerji >= pencereler.max(axis=1)) & (enerji - pencereler.min(axis=1) >= HECE_BELIRGINLIGI_DB)
+    # Düz bölgelerde aynı tepe birden çok çerçevede görünebilir; ardışık olanlar tek sayılır
+    tepe &= np.concatenate(([True], ~tepe[:-1]))
+    return int((tepe & ses_bolutleme.konusma_maskesi(enerji)).sum())
+
+
+def analiz_et(audio_bytes):
+    """
+    Kaydın ölçümlerini ve varsa reddetme sebebini döndürür:
+    {"sure", "konusma_suresi", "rms_db", "sessizlik_orani", "kirpilma_orani", "duraklama_sayisi",
+     "ortalama_duraklama", "konusma_hizi", "sorun"}
+    WAV olarak çözülemeyen kayıtlar (toplu puanlamadaki mp3 vb.) ölçülmez; None döner.
+    """
+    try:
+        ornekler, hiz = ses_hazirlama.wav_oku(audio_bytes)
+    except (wave.Error, EOFError, ValueError):
+        return None
+    tek = ses_hazirlama.tek_kanala_indir(ornekler)
+    sure = len(tek) / hiz if hiz else 0.0
+    if len(tek) == 0:
+        return {"sure": 0.0, "sorun": "Kayıt boş. Lütfen mikrofona izin verip tekrar kaydedin."}
+
+    kirpilma = float(np.mean(np.abs(ornekler) >= KIRPILMA_SINIRI))
+    rms = float(np.sqrt(np.mean(tek.astype(np.float64) ** 2)))
+    enerji = ses_bolutleme.cerceve_enerjisi(tek, hiz)
+    konusma = ses_bolutleme.konusma_maskesi(enerji)
+    if np.percentile(enerji, 95) < SESSIZ_ESIK_DB:
+        konusma[:] = False
+    konusma_suresi = float(konusma.sum() * ses_bolutleme.PENCERE)
+
+    # Baştaki ve sondaki sessizlik duraklama sayılmaz
+    sessizlikler = [(a, b) for a, b in _kosular(~konusma) if a > 0 and b < len(konusma)]
+    duraklamalar = [(b - a) * ses_bolutleme.PENCERE for a, b in sessizlikler]
+    duraklamalar = [d for d in duraklamalar if d >= EN_KISA_DURAKLAMA]
+
+    ozellikler = {
+        "sure": round(sure, 2),
+        "konusma_suresi": round(konusma_suresi, 2),
+        "rms_db": round(float(20 * np.log10(max(rms, 1e-6))), 1),
+        "sessizlik_orani": round(1 - float(konusma.mean()), 3),
+        "kirpilma_orani": round(kirpilma, 4),
+        "duraklama_sayisi": len(duraklamalar),
+        "ortalama_duraklama": round(float(np.mean(duraklamalar)), 2) if duraklamalar else 0.0,
+        "konusma_hizi": round(hece_sayisi(tek, hiz) / konusma_suresi, 2) if konusma_suresi else 0.0,
+        "sorun": None,
+    }
+
+    if sure < EN_KISA_SURE:
+        ozellikler["sorun"] = f"Kayıt çok kısa ({sure:.1f} sn). Lütfen en az {EN_KISA_SURE:.0f} saniye konuşun."
+    elif not konusma.any():
+        ozellikler["sorun"] = "Kayıtta ses algılanmadı. Mikrofonun açık olduğundan emin olup tekrar kaydedin."
+    elif kirpilma > KIRPILMA_ORANI:
+        ozellikler["sorun"] = "Ses çok yüksek ve bozuk (kırpılmış) kaydedilmiş. Mikrofondan biraz uzaklaşıp tekrar kaydedin."
+    elif konusma_suresi < EN_AZ_KONUSMA:
+        ozellikler["sorun"] = "Kayıtta yeterli konuşma bulunamadı. Lütfen tekrar kaydedin."
+    return ozellikler
+
+
+def istem_metni(ozellikler):
+    """Ölçümlerin puanlayıcı istemine eklenen Türkçe özeti."""
+    return (
+        f"Kayıt süresi {ozellikler['sure']:.0f} sn, konuşma süresi {ozellikler['konusma_suresi']:.0f} sn, "
+        f"sessizlik oranı %{ozellikler['sessizlik_orani'] * 100:.0f}, "
+        f"{EN_KISA_DURAKLAMA} sn'den uzun duraklama sayısı {ozellikler['duraklama_sayisi']} "
+        f"(ortalama {ozellikler['ortalama_duraklama']:.1f} sn), "
+        f"tahmini konuşma hızı {ozellikler['konusma_hizi']:.1f} hece/sn"
+    )
@@ -0,0 +1,146 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import ses_hazirlama
+
+# --- SES BÖLÜTLEME ---
+# Uzun konuşmalar tek istekte tanınmak yerine sessizliklerden bölünür ve parçalar aynı anda tanınır.
+# Gecikme tüm kaydın değil en uzun parçanın süresine bağlı olur; başarısız bir parça tek başına tekrar denenir.
+#
+# Tanıyıcı, (pcm_bytes, hiz) alıp metin döndüren herhangi bir çağrılabilirdir (16 bit, tek kanal PCM).
+# Anlaşılamayan parça için "" döndürmeli, geçici hatalarda istisna fırlatmalıdır.
+
+ORNEKLEME = 16000
+PENCERE = 0.03             # saniye; enerji bu uzunlukta çerçevelerle ölçülür
+EN_KISA_SESSIZLIK = 0.35   # saniye; bundan kısa duraklamalardan bölünmez
+HEDEF_UZUNLUK = 12.0       # saniye; bölüt bu süreyi geçince ilk uygun sessizlikte kesilir
+AZAMI_UZUNLUK = 25.0       # saniye; sessizlik bulunamazsa en sessiz çerçeveden zorla kesilir
+EN_KISA_BOLUT = 1.0        # saniye; daha kısa bölütler komşusuyla birleştirilir
+ESIK_PAYI_DB = 10          # gürültü tabanının bu kadar üstü konuşma sayılır
+DENEME_SAYISI = 3
+
+
+def cerceve_enerjisi(ornekler, hiz=ORNEKLEME, pencere=PENCERE):
+    """Her çerçevenin RMS enerjisini dBFS olarak döndürür."""
+    n = max(1, int(pencere * hiz))
+    adet = len(ornekler) // n
+    if adet == 0:
+        return np.array([-120.0])
+    cerceveler = ornekler[:adet * n].reshape(adet, n)
+    rms = np.sqrt(np.mean(cerceveler.astype(np.float64) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-6))
+
+
+def konusma_maskesi(enerji):
+    """Gürültü tabanına göre uyarlanan eşikle çerçeve başına konuşma/sessizlik."""
+    taban, tepe = np.percentile(enerji, [5, 95])
+    # Duraklamasız kayıtlarda taban konuşma seviyesine yakındır; eşik tepenin de altında kalmalı
+    esik = max(min(taban + ESIK_PAYI_DB, tepe - ESIK_PAYI_DB), -50.0)
+    return enerji > esik
+
+
+def bolutle(ornekler, hiz=ORNEKLEME):
+    """Kaydı [(başlangıç, bitiş)] örnek aralıklarına böler."""
+    toplam = len(ornekler)
+    if toplam == 0:
+        return []
+    n = max(1, int(PENCERE * hiz))
+    enerji = cerceve_enerjisi(ornekler, hiz)
+    konusma = konusma_maskesi(enerji)
+
+    # Yeterince uzun sessizliklerin orta noktaları aday kesim yerleridir
+    adaylar = []
+    en_kisa = int(EN_KISA_SESSIZLIK / PENCERE)
+    degisim = np.flatnonzero(np.diff(np.concatenate(([1], konusma.astype(np.int8), [1]))))
+    for bas, son in zip(degisim[::2], degisim[1::2]):
+        if son - bas >= en_kisa:
+            adaylar.append((bas + son) // 2)
+
+    hedef = int(HEDEF_UZUNLUK / PENCERE)
+    azami = int(AZAMI_UZUNLUK / PENCERE)
+    kesimler, onceki = [], 0
+    adaylar = np.array(adaylar, dtype=int)
+    while len(enerji) - onceki > hedef:
+        uygun = adaylar[(adaylar > onceki + hedef) & (adaylar <= onceki + azami)]
+        if len(uygun):
+            kesim = int(uygun[0])
+        elif len(enerji) - onceki > azami:
+            aralik = enerji[onceki + hedef:onceki + azami]
+            kesim = onceki + hedef + int(np.argmin(aralik))
+        else:
+            break
+        kesimler.append(kesim)
+        onceki = kesim
+
+    sinirlar = [0] + [k * n for k in kesimler] + [toplam]
+    araliklar = [(a, b) for a, b in zip(sinirlar[:-1], sinirlar[1:]) if b > a]
+
+    # Çok kısa bölütleri bir öncekiyle birleştir
+    birlesik = []
+    for a, b in araliklar:
+        if birlesik and (b - a) < EN_KISA_BOLUT * hiz:
+            birlesik[-1] = (birlesik[-1][0], b)
+        else:
+            birlesik.append((a, b))
+
+    # Tamamen sessiz bölütler tanımaya gönderilmez
+    return [(a, b) for a, b in birlesik if konusma[a // n:max(a // n + 1, b // n)].any()]
+
+
+def _pcm(ornekler):
+    return (np.clip(ornekler, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def _tani(taniyici, pcm, hiz, deneme_sayisi):
+    for deneme in range(deneme_sayisi):
+        try:
+            return taniyici(pcm, hiz)
+        except Exception:
+            if deneme == deneme_sayisi - 1:
+                raise
+            time.sleep(0.5 * 2 ** deneme)
+
+
+def metne_cevir(audio_bytes, taniyici, is_sayisi=4, deneme_sayisi=DENEME_SAYISI):
+    """
+    Kaydı bölütleyip parçaları eş zamanlı tanır ve sırayla birleştirir.
+    Dönüş: (metin, rapor). Tekrar denemelere rağmen tanınamayan bölütler metne "[...]" olarak girer.
+    """
+    ornekler, hiz = ses_hazirlama.wav_oku(audio_bytes)
+    tek = ses_hazirlama.yeniden_ornekle(ses_hazirlama.tek_kanala_indir(ornekler), hiz, ORNEKLEME)
+    bolutler = bolutle(tek, ORNEKLEME)
+    rapor = {"bolut_sayisi": len(bolutler), "hatali_bolut": 0, "sure": len(tek) / ORNEKLEME}
+    if not bolutler:
+        return "", rapor
+
+    def isle(aralik):
+        a, b = aralik
+        try:
+            return _tani(taniyici, _pcm(tek[a:b]), ORNEKLEME, deneme_sayisi)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(is_sayisi, len(bolutler))) as havuz:
+        parcalar = list(havuz.map(isle, bolutler))
+
+    rapor["hatali_bolut"] = sum(1 for p in parcalar if p is None)
+    if rapor["hatali_bolut"] == len(parcalar):
+        raise RuntimeError("Hiçbir ses bölütü tanınamadı.")
+    metin = " ".join("[...]" if p is None else p.strip() for p in parcalar if p is None or p.strip())
+    return metin, rapor
+
+
+class GoogleTaniyici:
+    """speech_recognition.recognize_google üzerinden tanıma yapan varsayılan tanıyıcı."""
+
+    def __init__(self, language="tr-TR"):
+        self.language = language
+
+    def __call__(self, pcm, hiz):
+        import speech_recognition as sr
+        try:
+            return sr.Recognizer().recognize_google(sr.AudioData(pcm, hiz, 2), language=self.language)
+        except sr.UnknownValueError:
+            return ""
@@ -0,0 +1,132 @@
+import io
+import os
+import wave
+
+import numpy as np
+
+# --- SES HAZIRLAMA ---
+# Tarayıcıdan gelen WAV kaydı yüklenmeden önce bellekte küçültülür:
+# kanallar tek kanala indirilir, 16 kHz'e örneklenir ve mümkünse FLAC (kayıpsız) olarak kodlanır.
+# Diske geçici dosya yazılmaz.
+
+HEDEF_ORNEKLEME = 16000
+# "flac" için soundfile kütüphanesi gerekir; yoksa 16 bit PCM WAV kullanılır
+KODEK = os.environ.get("SES_KODEGI", "flac")
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+
+def wav_oku(audio_bytes):
+    """WAV baytlarını [-1, 1] aralığında float32 örneklere ve örnekleme hızına çevirir."""
+    with wave.open(io.BytesIO(audio_bytes), "rb") as w:
+        kanal = w.getnchannels()
+        genislik = w.getsampwidth()
+        hiz = w.getframerate()
+        ham = w.readframes(w.getnframes())
+
+    if genislik == 1:
+        ornekler = (np.frombuffer(ham, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif genislik == 2:
+        ornekler = np.frombuffer(ham, dtype="<i2").astype(np.float32) / 32768
+    elif genislik == 3:
+        b = np.frombuffer(ham, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        tam = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        tam = np.where(tam & 0x800000, tam - 0x1000000, tam)
+        ornekler = tam.astype(np.float32) / 8388608
+    elif genislik == 4:
+        ornekler = np.frombuffer(ham, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise wave.Error(f"Desteklenmeyen örnek genişliği: {genislik}")
+
+    return ornekler.reshape(-1, kanal), hiz
+
+
+def tek_kanala_indir(ornekler):
+    return ornekler.mean(axis=1) if ornekler.ndim == 2 else ornekler
+
+
+def yeniden_ornekle(ornekler, kaynak_hiz, hedef_hiz=HEDEF_ORNEKLEME):
+    if kaynak_hiz == hedef_hiz or len(ornekler) == 0:
+        return ornekler.astype(np.float32)
+
+    if hedef_hiz < kaynak_hiz:
+        # Örtüşmeyi (aliasing) önlemek için pencereli sinc alçak geçiren süzgeç
+        kesim = 0.5 * hedef_hiz / kaynak_hiz
+        n = np.arange(-32, 33)
+        cekirdek = 2 * kesim * np.sinc(2 * kesim * n) * np.hamming(len(n))
+        ornekler = np.convolve(ornekler, cekirdek / cekirdek.sum(), mode="same")
+
+    sure = len(ornekler) / kaynak_hiz
+    yeni_uzunluk = int(round(sure * hedef_hiz))
+    eski_zaman = np.arange(len(ornekler)) / kaynak_hiz
+    yeni_zaman = np.arange(yeni_uzunluk) / hedef_hiz
+    return np.interp(yeni_zaman, eski_zaman, ornekler).astype(np.float32)
+
+
+def wav_yaz(ornekler, hiz):
+    pcm = (np.clip(ornekler, -1, 1) * 32767).astype("<i2")
+    tampon = io.BytesIO()
+    with wave.open(tampon, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(hiz)
+        w.writeframes(pcm.tobytes())
+    return tampon.getvalue()
+
+
+def _kodla(ornekler, hiz, kodek):
+    if kodek == "flac" and sf is not None:
+        tampon = io.BytesIO()
+        sf.write(tampon, ornekler, hiz, format="FLAC", subtype="PCM_16")
+        return tampon.getvalue(), "audio/flac"
+    return wav_yaz(ornekler, hiz), "audio/wav"
+
+
+def mime_tahmin(audio_bytes):
+    """WAV dışındaki kayıtlar (toplu puanlamada yüklenen dosyalar) için dosya başlığından MIME türü."""
+    bas = audio_bytes[:12]
+    if bas.startswith(b"fLaC"):
+        return "audio/flac"
+    if bas.startswith(b"OggS"):
+        return "audio/ogg"
+    if bas.startswith(b"ID3") or bas[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    if bas[4:8] == b"ftyp":
+        return "audio/mp4"
+    if bas.startswith(b"\x1aE\xdf\xa3"):
+        return "audio/webm"
+    return "audio/wav"
+
+
+def sesi_hazirla(audio_bytes, hedef_hiz=HEDEF_ORNEKLEME, kodek=KODEK):
+    """
+    Yüklemeye hazır ses verisini döndürür:
+    {"veri", "mime_type", "ham_boyut", "yeni_boyut", "sure"}
+    WAV olarak çözülemeyen kayıtlar olduğu gibi bırakılır.
+    """
+    try:
+        ornekler, hiz = wav_oku(audio_bytes)
+    except (wave.Error, EOFError, ValueError):
+        return {"veri": audio_bytes, "mime_type": mime_tahmin(audio_bytes), "ham_boyut": len(audio_bytes), "yeni_boyut": len(audio_bytes), "sure": None}
+
+    tek = yeniden_ornekle(tek_kanala_indir(ornekler), hiz, hedef_hiz)
+    veri, mime_type = _kodla(tek, hedef_hiz, kodek)
+    if len(veri) >= len(audio_bytes):
+        # Zaten küçük bir kayıtsa yeniden kodlamanın faydası yok
+        veri, mime_type = audio_bytes, "audio/wav"
+    return {
+        "veri": veri,
+        "mime_type": mime_type,
+        "ham_boyut": len(audio_bytes),
+        "yeni_boyut": len(veri),
+        "sure": len(tek) / hedef_hiz,
+    }
+
+
+def boyut_ozeti(hazir):
+    ham, yeni = hazir["ham_boyut"], hazir["yeni_boyut"]
+    azalma = 100 * (1 - yeni / ham) if ham else 0
+    return f"{ham / 1024:.0f} KB → {yeni / 1024:.0f} KB (%{azalma:.0f} küçüldü)"
@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# --- SINAV VERİTABANI ---
+# Sinav.py'nin SQLite deposu. Süreç başına tek bağlantı paylaşılır (kilit ile),
+# WAL modu sayesinde okumalar yazmaları beklemez. Şema değişiklikleri user_version ile sürümlenir.
+
+DB_YOLU = 'okul_sinav.db'
+
+# Her eleman bir şema sürümüdür; yeni değişiklik listenin sonuna eklenir, eskiler değiştirilmez.
+GOCLER = [
+    # 1: ilk tablo (init_db'deki orijinal şema)
+    """
+    CREATE TABLE IF NOT EXISTS sonuclar (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ad_soyad TEXT,
+        sinif_no TEXT,
+        konu TEXT,
+        konusma_metni TEXT,
+        puan_100luk INTEGER,
+        detaylar TEXT,
+        tarih DATETIME
+    );
+    """,
+    # 2: öğrenci, sınıf, konu ve tarih sorguları için indeksler
+    """
+    CREATE INDEX IF NOT EXISTS ix_sonuclar_sinif_no ON sonuclar (sinif_no, tarih);
+    CREATE INDEX IF NOT EXISTS ix_sonuclar_ad_soyad ON sonuclar (ad_soyad, tarih);
+    CREATE INDEX IF NOT EXISTS ix_sonuclar_konu ON sonuclar (konu);
+    CREATE INDEX IF NOT EXISTS ix_sonuclar_tarih ON sonuclar (tarih);
+    """,
+]
+
+_kilit = threading.RLock()
+_conn = None
+
+
+def _baglanti():
+    global _conn
+    with _kilit:
+        if _conn is None:
+            conn = sqlite3.connect(DB_YOLU, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-16000")  # ~16 MB
+            _goc_uygula(conn)
+            _conn = conn
+        return _conn
+
+
+def _goc_uygula(conn):
+    surum = conn.execute("PRAGMA user_version").fetchone()[0]
+    for i, sql in enumerate(GOCLER[surum:], start=surum + 1):
+        # Göç ve sürüm numarası aynı işlemde yazılır; yarım kalan göç tekrar denenir
+        conn.executescript(f"BEGIN; {sql} PRAGMA user_version = {i}; COMMIT;")
+
+
+def init_db():
+    """Bağlantıyı açar ve bekleyen şema göçlerini uygular."""
+    _baglanti()
+
+
+def sonuc_kaydet(ad, no, konu, metin, puan, detaylar):
+    with _kilit:
+        conn = _baglanti()
+        with conn:
+            conn.execute(
+                "INSERT INTO sonuclar (ad_soyad, sinif_no, konu, konusma_metni, puan_100luk, detaylar, tarih) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ad, no, konu, metin, puan, json.dumps(detaylar, ensure_ascii=False), datetime.now().isoformat(" "))
+            )
+
+
+# --- SORGULAR ---
+def ogrenci_gecmisi(ad_soyad=None, sinif_no=None, limit=20):
+    """Öğrencinin son sınavlarını (yeniden eskiye) döndürür."""
+    kosullar, parametreler = [], []
+    if ad_soyad:
+        kosullar.append("ad_soyad = ?")
+        parametreler.append(ad_soyad)
+    if sinif_no:
+        kosullar.append("sinif_no = ?")
+        parametreler.append(sinif_no)
+    if not kosullar:
+        return []
+    with _kilit:
+        rows = _baglanti().execute(
+            f"SELECT id, tarih, konu, puan_100luk FROM sonuclar WHERE {' AND '.join(kosullar)} ORDER BY tarih DESC LIMIT ?",
+            (*parametreler, limit)
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def sinif_ozeti(sinif_no_oneki):
+    """
+    'Sınıf / Numara' alanı belirtilen önekle başlayan kayıtların konu bazında özeti.
+    Örn. '5/C' → 5/C şubesindeki tüm öğrenciler.
+    """
+    # LIKE yerine aralık karşılaştırması: sinif_no indeksi kullanılabilsin
+    with _kilit:
+        rows = _baglanti().execute(
+            """
+            SELECT konu, COUNT(*) AS sinav_sayisi, AVG(puan_100luk) AS ortalama,
+                   MIN(puan_100luk) AS en_dusuk, MAX(puan_100luk) AS en_yuksek, MAX(tarih) AS son_tarih
+            FROM sonuclar
+            WHERE sinif_no >= ? AND sinif_no < ?
+            GROUP BY konu ORDER BY konu
+            """,
+            (sinif_no_oneki, sinif_no_oneki + "\U0010ffff")
+        ).fetchall()
+    return [dict(r) for r in rows]
@@ -0,0 +1,430 @@
+import re
+import threading
+import time
+
+import olcum
+from yerel_depo import baglan
+
+# --- SONUÇ İNDEKSİ ---
+# "Sinav_Sonuclari" tablosundaki satırların yerel kopyası.
+# Sınav hakkı kontrolü her seferinde tüm tabloyu indirmek yerine buradan (Sınıf, Okul No) ile okunur,
+# arşiv sayfası da filtreleme ve sayfalamayı burada yapar.
+# Tablodan sadece en son senkronize edilen satırdan sonrası çekilir. Son bilinen satır da birlikte
+# okunur; yerinde başka bir kayıt varsa (yönetici satır silmiş veya sıralamış) indeks baştan kurulur.
+#
+# Analiz katmanı: kriter puanları "Puan Detayları" metninden ayrıştırılıp sayısal sütunlarda tutulur;
+# sınıf/konu/genel ortalamaları ve kriter dağılımları her kayıt eklenirken "ozetler" ve "dagilim"
+# tablolarında güncellenir. Analiz sayfası geçmişi yeniden taramadan bu özetlerden okur.
+
+DOSYA_ADI = "sonuc_indeksi.db"
+SENKRON_ARALIGI = 15  # saniye; bu süre dolmadan tabloya tekrar gidilmez
+SINAV_HAKKI = 2
+SEMA_SURUMU = 4
+ALANLAR = ["tarih", "ad_soyad", "sinif", "okul_no", "konu", "puan", "detay", "transkript", "yorum"]
+KIMLIK_SIRASI = len(ALANLAR)  # J sütunu: sonuc_kuyrugu'nun yazdığı "Kayıt Kimliği"
+KRITERLER = {"icerik": "İçerik", "duzen": "Düzen", "dil": "Dil", "akicilik": "Akıcılık"}
+SAYISAL_ALANLAR = ["puan_sayi", *KRITERLER]
+
+_kilit = threading.Lock()
+_conn = None
+
+
+def _baglanti():
+    global _conn
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS kayitlar (
+                satir INTEGER PRIMARY KEY,
+                tarih TEXT,
+                ad_soyad TEXT,
+                sinif TEXT,
+                okul_no TEXT,
+                konu TEXT,
+                puan TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_kayitlar_ogrenci ON kayitlar (sinif, okul_no);
+            CREATE TABLE IF NOT EXISTS durum (
+                anahtar TEXT PRIMARY KEY,
+                deger REAL
+            );
+        """)
+        _sema_guncelle(_conn)
+        _conn.commit()
+    return _conn
+
+
+def _sema_guncelle(conn):
+    surum = _durum_oku(conn, "sema_surumu", 1)
+    if surum < 2:
+        # Arşiv için uzun metin sütunları eklendi; mevcut satırların tamamı bir kez yeniden çekilir
+        mevcut = {r["name"] for r in conn.execute("PRAGMA table_info(kayitlar)")}
+        for sutun in ("detay", "transkript", "yorum"):
+            if sutun not in mevcut:
+                conn.execute(f"ALTER TABLE kayitlar ADD COLUMN {sutun} TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_kayitlar_tarih ON kayitlar (tarih)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_kayitlar_konu ON kayitlar (konu)")
+        _durum_yaz(conn, "son_satir", 1)
+        _durum_yaz(conn, "son_senkron_zamani", 0)
+    if surum < 3:
+        # Sayısal puan sütunları ve önceden hesaplanan özetler; mevcut satırlar için bir kez doldurulur
+        mevcut = {r["name"] for r in conn.execute("PRAGMA table_info(kayitlar)")}
+        for sutun in SAYISAL_ALANLAR:
+            if sutun not in mevcut:
+                conn.execute(f"ALTER TABLE kayitlar ADD COLUMN {sutun} REAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ozetler (
+                boyut TEXT,
+                deger TEXT,
+                adet INTEGER,
+                puan_toplam REAL,
+                puan_kare_toplam REAL,
+                PRIMARY KEY (boyut, deger)
+            );
+            CREATE TABLE IF NOT EXISTS dagilim (
+                boyut TEXT,
+                deger TEXT,
+                kriter TEXT,
+                puan INTEGER,
+                adet INTEGER,
+                PRIMARY KEY (boyut, deger, kriter, puan)
+            );
+        """)
+        for row in conn.execute("SELECT satir, puan, detay FROM kayitlar").fetchall():
+            conn.execute(
+                f"UPDATE kayitlar SET {', '.join(f'{s} = ?' for s in SAYISAL_ALANLAR)} WHERE satir = ?",
+                (*_sayisal_degerler(row["puan"], row["detay"]), row["satir"])
+            )
+        _ozetleri_yeniden_olustur(conn)
+    if surum < 4:
+        # Satır kimliği eklendi; mevcut satırların kimliği yok, indeks bir kez baştan kurulur
+        if "kimlik" not in {r["name"] for r in conn.execute("PRAGMA table_info(kayitlar)")}:
+            conn.execute("ALTER TABLE kayitlar ADD COLUMN kimlik TEXT")
+        _durum_yaz(conn, "yeniden_olustur", 1)
+        _durum_yaz(conn, "son_senkron_zamani", 0)
+    _durum_yaz(conn, "sema_surumu", SEMA_SURUMU)
+
+
+def _durum_oku(conn, anahtar, varsayilan=0):
+    row = conn.execute("SELECT deger FROM durum WHERE anahtar = ?", (anahtar,)).fetchone()
+    return row["deger"] if row else varsayilan
+
+
+def _durum_yaz(conn, anahtar, deger):
+    conn.execute("INSERT OR REPLACE INTO durum (anahtar, deger) VALUES (?, ?)", (anahtar, deger))
+
+
+def _kayit_degerleri(satir, data_list):
+    hucreler = [str(h).strip() if h is not None else "" for h in list(data_list)[:len(ALANLAR)]]
+    hucreler += [""] * (len(ALANLAR) - len(hucreler))
+    return (satir, *hucreler)
+
+
+def _kimlik(data_list):
+    data_list = list(data_list)
+    return str(data_list[KIMLIK_SIRASI]).strip() if len(data_list) > KIMLIK_SIRASI else ""
+
+
+def _ayni_kayit(eski, data_list):
+    """
+    İndeksteki satır (yoksa None) ile tablodaki satır aynı kayıt mı.
+    İkisinde de kimlik varsa kimlikler, yoksa (eski satırlar) ilk beş hücre karşılaştırılır.
+    """
+    if eski is None:
+        return not any(str(h).strip() for h in data_list)
+    kimlik = _kimlik(data_list)
+    if kimlik and eski["kimlik"]:
+        return kimlik == eski["kimlik"]
+    return tuple(eski[a] for a in ALANLAR[:5]) == _kayit_degerleri(0, data_list)[1:6]
+
+
+def _sayi(deger):
+    try:
+        return float(str(deger).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _sayisal_degerler(puan, detay):
+    """(puan_sayi, icerik, duzen, dil, akicilik). 1-3 dışındaki kriter puanları (ör. hata satırlarındaki 0) boş sayılır."""
+    bulunan = dict(re.findall(r"(İçerik|Düzen|Dil|Akıcılık):\s*(\d+(?:[.,]\d+)?)", detay or ""))
+    kriterler = []
+    for etiket in KRITERLER.values():
+        deger = _sayi(bulunan.get(etiket))
+        kriterler.append(deger if deger is not None and 1 <= deger <= 3 else None)
+    return (_sayi(puan), *kriterler)
+
+
+_TUM_ALANLAR = ALANLAR + SAYISAL_ALANLAR + ["kimlik"]
+_EKLE = f"INSERT OR REPLACE INTO kayitlar (satir, {', '.join(_TUM_ALANLAR)}) VALUES ({', '.join('?' * (len(_TUM_ALANLAR) + 1))})"
+
+
+# --- ANALİZ ÖZETLERİ ---
+def _ozet_boyutlari(sinif, konu):
+    return [("genel", ""), ("sinif", sinif or ""), ("konu", konu or "")]
+
+
+def _ozete_isle(conn, sinif, konu, sayisal, isaret):
+    """Bir kaydın katkısını özetlere ekler (isaret=1) veya çıkarır (isaret=-1)."""
+    puan, *kriterler = sayisal
+    # Kriterleri hiç okunamayan sıfır puanlı satırlar (puanlama hatası yedeği) istatistiği bozmasın
+    if puan is None or (puan == 0 and all(k is None for k in kriterler)):
+        return
+    for boyut, deger in _ozet_boyutlari(sinif, konu):
+        conn.execute(
+            "INSERT INTO ozetler (boyut, deger, adet, puan_toplam, puan_kare_toplam) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (boyut, deger) DO UPDATE SET adet = adet + excluded.adet, "
+            "puan_toplam = puan_toplam + excluded.puan_toplam, puan_kare_toplam = puan_kare_toplam + excluded.puan_kare_toplam",
+            (boyut, deger, isaret, isaret * puan, isaret * puan * puan)
+        )
+        dilimler = [("puan_dilimi", min(int(puan // 10), 9))]
+        dilimler += [(k, int(round(v))) for k, v in zip(KRITERLER, kriterler) if v is not None]
+        for kriter, deger_puan in dilimler:
+            conn.execute(
+                "INSERT INTO dagilim (boyut, deger, kriter, puan, adet) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (boyut, deger, kriter, puan) DO UPDATE SET adet = adet + excluded.adet",
+                (boyut, deger, kriter, deger_puan, isaret)
+            )
+
+
+def _ozetleri_yeniden_olustur(conn):
+    conn.execute("DELETE FROM ozetler")
+    conn.execute("DELETE FROM dagilim")
+    for row in conn.execute(f"SELECT sinif, konu, {', '.join(SAYISAL_ALANLAR)} FROM kayitlar").fetchall():
+        _ozete_isle(conn, row["sinif"], row["konu"], tuple(row[s] for s in SAYISAL_ALANLAR), 1)
+
+
+def _kaydi_yaz(conn, satir, data_list):
+    """Satırı yazar ve özetleri günceller; aynı satır tekrar gelirse eski katkısı önce geri alınır."""
+    eski = conn.execute(f"SELECT sinif, konu, {', '.join(SAYISAL_ALANLAR)} FROM kayitlar WHERE satir = ?", (satir,)).fetchone()
+    if eski is not None:
+        _ozete_isle(conn, eski["sinif"], eski["konu"], tuple(eski[s] for s in SAYISAL_ALANLAR), -1)
+    degerler = _kayit_degerleri(satir, data_list)
+    kayit = dict(zip(ALANLAR, degerler[1:]))
+    sayisal = _sayisal_degerler(kayit["puan"], kayit["detay"])
+    conn.execute(_EKLE, (*degerler, *sayisal, _kimlik(data_list) or None))
+    _ozete_isle(conn, kayit["sinif"], kayit["konu"], sayisal, 1)
+
+
+def kayit_ekle(satir, data_list):
+    """
+    Tabloya yazılan bir satırı indekse ekler. Aynı kayıt tekrar gelirse üzerine yazılır.
+    Satır numarasında indekste başka bir kayıt varsa tablo kaymıştır: satır yazılmaz,
+    sonraki senkronda (beklemeden) indeks baştan kurulur.
+    """
+    with _kilit:
+        conn = _baglanti()
+        eski = conn.execute("SELECT * FROM kayitlar WHERE satir = ?", (satir,)).fetchone()
+        if eski is not None and not _ayni_kayit(eski, data_list):
+            _durum_yaz(conn, "yeniden_olustur", 1)
+            _durum_yaz(conn, "son_senkron_zamani", 0)
+        else:
+            _kaydi_yaz(conn, satir, data_list)
+        conn.commit()
+
+
+def senkron_iste():
+    """Satır numarası bilinmeden yazılan kayıtlar için sonraki senkronun beklemeden tabloya gitmesini sağlar."""
+    with _kilit:
+        conn = _baglanti()
+        _durum_yaz(conn, "son_senkron_zamani", 0)
+        conn.commit()
+
+
+def satir_numarasi(append_cevabi):
+    """append_row cevabındaki 'Sayfa1!A12:I12' aralığından satır numarasını çıkarır."""
+    try:
+        aralik = append_cevabi["updates"]["updatedRange"]
+        return int(re.search(r"![A-Z]+(\d+)", aralik).group(1))
+    except Exception:
+        return None
+
+
+def senkronize_et(sheet_getir, zorla=False):
+    """
+    Tablonun sadece yeni satırlarını indirip indekse ekler.
+    Son senkrondan bu yana SENKRON_ARALIGI geçmediyse tabloya hiç gidilmez (sheet_getir çağrılmaz).
+    Son bilinen satır değişmişse (satır silinmiş, tablo kısalmış veya sıralanmış) tüm tablo yeniden okunur.
+    """
+    with _kilit:
+        conn = _baglanti()
+        simdi = time.time()
+        if not zorla and simdi - _durum_oku(conn, "son_senkron_zamani") < SENKRON_ARALIGI:
+            return 0
+
+        # 1. satır başlık; veri 2. satırdan başlar
+        son_satir = int(_durum_oku(conn, "son_satir", 1))
+        yeniden = bool(_durum_oku(conn, "yeniden_olustur", 0))
+        with olcum.asama("indeks_senkron"):
+            sheet = sheet_getir()
+            if not yeniden and son_satir > 1:
+                satirlar = sheet.get_values(f"A{son_satir}:J")
+                capa = conn.execute("SELECT * FROM kayitlar WHERE satir = ?", (son_satir,)).fetchone()
+                if satirlar and _ayni_kayit(capa, satirlar[0]):
+                    baslangic, yeni_satirlar = son_satir + 1, satirlar[1:]
+                else:
+                    yeniden = True
+            elif not yeniden:
+                baslangic, yeni_satirlar = 2, sheet.get_values("A2:J")
+            if yeniden:
+                olcum.say("indeks_yeniden_olusturma")
+                baslangic, yeni_satirlar = 2, sheet.get_values("A2:J")
+                conn.execute("DELETE FROM kayitlar")
+                conn.execute("DELETE FROM ozetler")
+                conn.execute("DELETE FROM dagilim")
+
+        eklenen = 0
+        for i, data_list in enumerate(yeni_satirlar):
+            if not any(str(h).strip() for h in data_list):
+                continue
+            _kaydi_yaz(conn, baslangic + i, data_list)
+            eklenen += 1
+
+        _durum_yaz(conn, "son_satir", baslangic + len(yeni_satirlar) - 1)
+        _durum_yaz(conn, "son_senkron_zamani", simdi)
+        _durum_yaz(conn, "yeniden_olustur", 0)
+        conn.commit()
+        return eklenen
+
+
+def kullanilan_hak(sinif, okul_no):
+    with _kilit:
+        row = _baglanti().execute(
+            "SELECT COUNT(*) AS adet FROM kayitlar WHERE sinif = ? AND okul_no = ?",
+            (str(sinif).strip(), str(okul_no).strip())
+        ).fetchone()
+    return row["adet"]
+
+
+def ogrenci_kayitlari(sinif, okul_no):
+    with _kilit:
+        rows = _baglanti().execute(
+            "SELECT tarih, konu, puan FROM kayitlar WHERE sinif = ? AND okul_no = ? ORDER BY satir",
+            (str(sinif).strip(), str(okul_no).strip())
+        ).fetchall()
+    return [{"Tarih": r["tarih"], "Konu": r["konu"], "Puan": r["puan"]} for r in rows]
+
+
+# --- ARŞİV SORGULARI ---
+def _filtre(sinif=None, konu=None, baslangic=None, bitis=None, puan_araligi=None):
+    kosullar, parametreler = [], []
+    if sinif:
+        kosullar.append("sinif = ?")
+        parametreler.append(sinif)
+    if konu:
+        kosullar.append("konu = ?")
+        parametreler.append(konu)
+    if baslangic:
+        # Tarih "YYYY-MM-DD HH:MM" biçiminde olduğu için metin karşılaştırması yeterli
+        kosullar.append("tarih >= ?")
+        parametreler.append(str(baslangic))
+    if bitis:
+        kosullar.append("tarih < date(?, '+1 day')")
+        parametreler.append(str(bitis))
+    if puan_araligi:
+        kosullar.append("CAST(puan AS REAL) BETWEEN ? AND ?")
+        parametreler.extend(puan_araligi)
+    return (" WHERE " + " AND ".join(kosullar)) if kosullar else "", parametreler
+
+
+def kayit_sayisi(**filtreler):
+    where, parametreler = _filtre(**filtreler)
+    with _kilit:
+        return _baglanti().execute(f"SELECT COUNT(*) FROM kayitlar{where}", parametreler).fetchone()[0]
+
+
+def arsiv_sayfasi(sayfa=1, sayfa_boyutu=50, **filtreler):
+    """
+    Filtrelere uyan kayıtların tek bir sayfasını özet sütunlarla döndürür.
+    Transkript ve yorum burada okunmaz; seçilen satır için kayit_detayi kullanılır.
+    """
+    where, parametreler = _filtre(**filtreler)
+    with _kilit:
+        rows = _baglanti().execute(
+            f"SELECT satir, tarih, ad_soyad, sinif, okul_no, konu, puan FROM kayitlar{where} "
+            f"ORDER BY sinif, CAST(okul_no AS INTEGER), okul_no, satir LIMIT ? OFFSET ?",
+            (*parametreler, sayfa_boyutu, (sayfa - 1) * sayfa_boyutu)
+        ).fetchall()
+    kayitlar = [{
+        "Satır": r["satir"], "Tarih": r["tarih"], "Ad Soyad": r["ad_soyad"], "Sınıf": r["sinif"],
+        "Okul No": r["okul_no"], "Konu": r["konu"], "Puan": r["puan"]
+    } for r in rows]
+    return kayitlar
+
+
+def kayit_detayi(satir):
+    with _kilit:
+        row = _baglanti().execute("SELECT detay, transkript, yorum FROM kayitlar WHERE satir = ?", (satir,)).fetchone()
+    if row is None:
+        return None
+    return {"Puan Detayları": row["detay"], "Transkript": row["transkript"], "Öğretmen Yorumu": row["yorum"]}
+
+
+def secenekler(alan):
+    """Filtre kutuları için sınıf veya konu listesini döndürür."""
+    if alan not in ("sinif", "konu"):
+        raise ValueError(alan)
+    with _kilit:
+        rows = _baglanti().execute(f"SELECT DISTINCT {alan} FROM kayitlar WHERE {alan} != '' ORDER BY {alan}").fetchall()
+    return [r[0] for r in rows]
+
+
+def analiz_ozeti(boyut="sinif"):
+    """
+    Önceden hesaplanmış özetlerden boyut ("genel", "sinif", "konu") başına
+    kayıt sayısı, ortalama, standart sapma ve kriter ortalamaları.
+    """
+    with _kilit:
+        conn = _baglanti()
+        ozetler = conn.execute("SELECT * FROM ozetler WHERE boyut = ? AND adet > 0 ORDER BY deger", (boyut,)).fetchall()
+        kriterler = conn.execute(
+            "SELECT deger, kriter, SUM(puan * adet) * 1.0 / SUM(adet) AS ortalama FROM dagilim "
+            "WHERE boyut = ? AND kriter != 'puan_dilimi' AND adet > 0 GROUP BY deger, kriter",
+            (boyut,)
+        ).fetchall()
+    kriter_ortalamalari = {(r["deger"], r["kriter"]): r["ortalama"] for r in kriterler}
+    sonuc = []
+    for r in ozetler:
+        ortalama = r["puan_toplam"] / r["adet"]
+        varyans = max(0.0, r["puan_kare_toplam"] / r["adet"] - ortalama ** 2)
+        satir = {"deger": r["deger"], "adet": r["adet"], "ortalama": round(ortalama, 1), "std": round(varyans ** 0.5, 1)}
+        for kriter in KRITERLER:
+            deger = kriter_ortalamalari.get((r["deger"], kriter))
+            satir[kriter] = round(deger, 2) if deger is not None else None
+        sonuc.append(satir)
+    return sonuc
+
+
+def kriter_dagilimi(boyut="genel", deger=""):
+    """{kriter: {puan: adet}}; kriterlerin 1-3 dağılımı ve "puan_dilimi" (0-9: 0-9, 10-19, ..., 90-100)."""
+    with _kilit:
+        rows = _baglanti().execute(
+            "SELECT kriter, puan, adet FROM dagilim WHERE boyut = ? AND deger = ? AND adet > 0 ORDER BY kriter, puan",
+            (boyut, deger or "")
+        ).fetchall()
+    dagilim = {}
+    for r in rows:
+        dagilim.setdefault(r["kriter"], {})[r["puan"]] = r["adet"]
+    return dagilim
+
+
+def disa_aktarim_satirlari(transkript=False, parca_boyutu=500, **filtreler):
+    """
+    Filtrelere uyan kayıtları sınıf ve okul numarası sırasıyla, parça parça okuyarak üretir.
+    Tamamı belleğe alınmaz; kilit yalnızca her parçanın sorgusu süresince tutulur.
+    """
+    where, parametreler = _filtre(**filtreler)
+    sutunlar = ["satir", *ALANLAR[:5], *SAYISAL_ALANLAR, "yorum"] + (["transkript"] if transkript else [])
+    kayma = 0
+    while True:
+        with _kilit:
+            rows = _baglanti().execute(
+                f"SELECT {', '.join(sutunlar)} FROM kayitlar{where} "
+                f"ORDER BY sinif, CAST(okul_no AS INTEGER), okul_no, satir LIMIT ? OFFSET ?",
+                (*parametreler, parca_boyutu, kayma)
+            ).fetchall()
+        if not rows:
+            return
+        for r in rows:
+            yield dict(r)
+        kayma += len(rows)
@@ -0,0 +1,294 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+import olcum
+import sonuc_indeksi
+from yerel_depo import baglan
+
+# --- SONUÇ KUYRUĞU (WRITE-BEHIND) ---
+# Sınav sonucu önce yerel günlüğe (SQLite, WAL) yazılır ve öğrenci beklemez.
+# Arka plandaki aktarıcı bekleyen satırları toplu halde append_rows ile tabloya taşır.
+# Her satırın son sütununda bir "Kayıt Kimliği" bulunur; yazma sonucu belirsiz kaldığında
+# (zaman aşımı, çökme) tablodaki kimliklere bakılarak aynı satırın iki kez yazılması önlenir.
+# Tablo o an okunamıyorsa satır 'belirsiz' kalır; kimliği tabloda aranmadan tekrar yazılmaz.
+# Aynı günlüğü birden çok süreç kullanabilir: satırlar koşullu UPDATE ile alınır ve alan sürecin
+# kimliği (SAHIP) ile alınma zamanı yazılır; yarım kalan satırlar sadece sahibi öldüyse veya
+# alınmanın üzerinden SAHIPLIK_ZAMANASIMI geçtiyse kurtarılır.
+
+DOSYA_ADI = "sonuc_kuyrugu.db"
+BASLIK = ["Tarih", "Ad Soyad", "Sınıf", "Okul No", "Konu", "Puan", "Puan Detayları", "Transkript", "Öğretmen Yorumu", "Kayıt Kimliği"]
+KIMLIK_SUTUNU = len(BASLIK)
+PAKET_BOYUTU = 50
+BEKLEME_ARALIGI = 2  # saniye; yeni kayıt gelmese de kuyruk bu aralıkla kontrol edilir
+AZAMI_DENEME = 8
+AZAMI_GECIKME = 300
+SAHIPLIK_ZAMANASIMI = 600  # saniye; bundan uzun süredir yazılan satırın sahibi takılmış sayılır
+SAHIP = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+BEKLIYOR, YAZILIYOR, YAZILDI, HATALI, BELIRSIZ = "bekliyor", "yaziliyor", "yazildi", "hatali", "belirsiz"
+
+_kilit = threading.Lock()
+_uyandir = threading.Event()
+_conn = None
+_aktarici = None
+
+
+def _baglanti():
+    global _conn
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS gunluk (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kimlik TEXT UNIQUE,
+                sinif TEXT,
+                okul_no TEXT,
+                veri TEXT,
+                durum TEXT,
+                deneme INTEGER DEFAULT 0,
+                sonraki_deneme REAL DEFAULT 0,
+                hata TEXT,
+                satir INTEGER,
+                eklenme REAL
+            );
+            CREATE INDEX IF NOT EXISTS ix_gunluk_durum ON gunluk (durum, sonraki_deneme);
+            CREATE INDEX IF NOT EXISTS ix_gunluk_ogrenci ON gunluk (sinif, okul_no);
+        """)
+        # Satırı yazmak üzere alan süreç ve alınma zamanı (eski günlüklerde sütun yok)
+        sutunlar = {r["name"] for r in _conn.execute("PRAGMA table_info(gunluk)")}
+        if "sahip" not in sutunlar:
+            _conn.execute("ALTER TABLE gunluk ADD COLUMN sahip TEXT")
+        if "alinma" not in sutunlar:
+            _conn.execute("ALTER TABLE gunluk ADD COLUMN alinma REAL")
+        _conn.commit()
+    return _conn
+
+
+def ekle(data_list):
+    """Sonuç satırını günlüğe ekler ve aktarıcıyı uyandırır. Tabloya gidilmez."""
+    kimlik = uuid.uuid4().hex
+    satir = list(data_list) + [kimlik]
+    with _kilit:
+        conn = _baglanti()
+        conn.execute(
+            "INSERT INTO gunluk (kimlik, sinif, okul_no, veri, durum, eklenme) VALUES (?, ?, ?, ?, ?, ?)",
+            (kimlik, str(satir[2]).strip(), str(satir[3]).strip(), json.dumps(satir, ensure_ascii=False), BEKLIYOR, time.time())
+        )
+        conn.commit()
+    _uyandir.set()
+    return kimlik
+
+
+def bekleyen_kayitlar(sinif, okul_no):
+    """Henüz tabloya aktarılmamış kayıtlar da sınav hakkından düşülmelidir."""
+    with _kilit:
+        rows = _baglanti().execute(
+            "SELECT veri FROM gunluk WHERE sinif = ? AND okul_no = ? AND durum IN (?, ?, ?) ORDER BY id",
+            (str(sinif).strip(), str(okul_no).strip(), BEKLIYOR, YAZILIYOR, BELIRSIZ)
+        ).fetchall()
+    kayitlar = [json.loads(r["veri"]) for r in rows]
+    return [{"Tarih": k[0], "Konu": k[4], "Puan": k[5]} for k in kayitlar]
+
+
+def durum_ozeti():
+    with _kilit:
+        rows = _baglanti().execute("SELECT durum, COUNT(*) AS adet FROM gunluk GROUP BY durum").fetchall()
+    ozet = {BEKLIYOR: 0, YAZILIYOR: 0, YAZILDI: 0, HATALI: 0, BELIRSIZ: 0}
+    ozet.update({r["durum"]: r["adet"] for r in rows})
+    return ozet
+
+
+def hatalilari_yeniden_dene():
+    with _kilit:
+        conn = _baglanti()
+        conn.execute("UPDATE gunluk SET durum = ?, deneme = 0, sonraki_deneme = 0 WHERE durum = ?", (BEKLIYOR, HATALI))
+        conn.commit()
+    _uyandir.set()
+
+
+# --- AKTARICI ---
+def _paket_al(durum=BEKLIYOR):
+    """
+    Verilen durumda zamanı gelen satırları 'yaziliyor' olarak işaretleyip döndürür.
+    Aynı günlüğü kullanan başka bir süreç satırı araya girip aldıysa koşullu UPDATE onu atlar.
+    """
+    simdi = time.time()
+    with _kilit:
+        conn = _baglanti()
+        rows = conn.execute(
+            "SELECT id, kimlik, veri, deneme FROM gunluk WHERE durum = ? AND sonraki_deneme <= ? ORDER BY id LIMIT ?",
+            (durum, simdi, PAKET_BOYUTU)
+        ).fetchall()
+        alinan = [
+            r for r in rows
+            if conn.execute(
+                "UPDATE gunluk SET durum = ?, sahip = ?, alinma = ? WHERE id = ? AND durum = ?",
+                (YAZILIYOR, SAHIP, simdi, r["id"], durum)
+            ).rowcount == 1
+        ]
+        conn.commit()
+    return alinan
+
+
+def _yazildi_isaretle(rows, ilk_satir):
+    if ilk_satir:
+        for i, r in enumerate(rows):
+            sonuc_indeksi.kayit_ekle(ilk_satir + i, json.loads(r["veri"]))
+    else:
+        # Satır numarası bilinmiyor (cevapta aralık yok veya satır sonradan tabloda bulundu); indeks tablodan okunur
+        sonuc_indeksi.senkron_iste()
+    with _kilit:
+        conn = _baglanti()
+        conn.executemany(
+            "UPDATE gunluk SET durum = ?, satir = ?, hata = NULL WHERE id = ?",
+            [(YAZILDI, ilk_satir + i if ilk_satir else None, r["id"]) for i, r in enumerate(rows)]
+        )
+        conn.commit()
+
+
+def _hata_isaretle(rows, hata, belirsiz=False):
+    """
+    Satırları üstel beklemeyle tekrar kuyruğa alır.
+    belirsiz: yazma sonucu bilinmiyor; satırlar tabloda aranmadan yazılmaz ve HATALI'ya düşmez
+    (hatalilari_yeniden_dene onları körlemesine tekrar yazdırmasın).
+    """
+    with _kilit:
+        conn = _baglanti()
+        for r in rows:
+            deneme = r["deneme"] + 1
+            # Üstel bekleme + rastgele sapma: tüm oturumlar aynı anda kotaya yüklenmesin
+            gecikme = min(AZAMI_GECIKME, 2 ** deneme) * random.uniform(0.5, 1.5)
+            if belirsiz:
+                durum = BELIRSIZ
+            else:
+                durum = HATALI if deneme >= AZAMI_DENEME else BEKLIYOR
+            conn.execute(
+                "UPDATE gunluk SET durum = ?, deneme = ?, sonraki_deneme = ?, hata = ? WHERE id = ?",
+                (durum, deneme, time.time() + gecikme, str(hata)[:500], r["id"])
+            )
+        conn.commit()
+
+
+def _tablodaki_kimlikler(sheet):
+    return set(sheet.col_values(KIMLIK_SUTUNU))
+
+
+def _sahip_yasiyor(sahip):
+    """Satırı alan başka bir süreç hâlâ çalışıyor mu (aynı makinede, süreç kimliğine göre)."""
+    if not sahip or sahip == SAHIP:
+        # Bu sürecin aktarıcısı toparlama sırasında yazma yapmıyor
+        return False
+    if os.name == "nt":
+        # Windows'ta os.kill(pid, 0) sinyal gönderir; sadece zaman aşımına güvenilir
+        return True
+    try:
+        os.kill(int(sahip.split(":")[0]), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+def _yarim_kalanlari_toparla(sheet):
+    """
+    Sahibi ölmüş veya takılmış 'yaziliyor' satırları tabloya ulaşmış olabilir.
+    Tabloda kimliği bulunanlar yazıldı sayılır, bulunmayanlar tekrar kuyruğa alınır.
+    Başka bir sürecin şu an yazmakta olduğu satırlara dokunulmaz.
+    """
+    esik = time.time() - SAHIPLIK_ZAMANASIMI
+    with _kilit:
+        rows = _baglanti().execute(
+            "SELECT id, kimlik, veri, deneme, sahip, alinma FROM gunluk WHERE durum = ?", (YAZILIYOR,)
+        ).fetchall()
+    rows = [r for r in rows if (r["alinma"] or 0) < esik or not _sahip_yasiyor(r["sahip"])]
+    if not rows:
+        return
+    mevcut = _tablodaki_kimlikler(sheet)
+    with _kilit:
+        conn = _baglanti()
+        for r in rows:
+            # Bu arada sahibi satırı bitirdiyse veya başka bir süreç kurtarıp aldıysa değiştirilmez
+            conn.execute(
+                "UPDATE gunluk SET durum = ? WHERE id = ? AND durum = ? AND sahip IS ? AND alinma IS ?",
+                (YAZILDI if r["kimlik"] in mevcut else BEKLIYOR, r["id"], YAZILIYOR, r["sahip"], r["alinma"])
+            )
+        conn.commit()
+
+
+def _paketi_aktar(sheet, rows):
+    try:
+        with olcum.asama("sheets_aktarim", satir=len(rows)):
+            cevap = sheet.append_rows([json.loads(r["veri"]) for r in rows])
+        _yazildi_isaretle(rows, sonuc_indeksi.satir_numarasi(cevap))
+    except Exception as e:
+        # Cevap gelmese de yazma gerçekleşmiş olabilir; tekrar denemeden önce tabloya bak
+        _tabloda_ara(sheet, rows, e)
+
+
+def _tabloda_ara(sheet, rows, hata):
+    """
+    Yazma sonucu bilinmeyen satırları tablodaki kimliklerle karşılaştırır: bulunanlar yazıldı sayılır,
+    bulunmayanlar tekrar kuyruğa alınır. Tablo okunamazsa satırlar 'belirsiz' kalır.
+    """
+    try:
+        mevcut = _tablodaki_kimlikler(sheet)
+    except Exception as e:
+        _hata_isaretle(rows, e, belirsiz=True)
+        return
+    yazilmis = [r for r in rows if r["kimlik"] in mevcut]
+    kalan = [r for r in rows if r["kimlik"] not in mevcut]
+    if yazilmis:
+        _yazildi_isaretle(yazilmis, None)
+    if kalan:
+        _hata_isaretle(kalan, hata)
+
+
+def _aktarici_dongusu(sheet_getir):
+    sheet = None
+    son_toparlama = None
+    while True:
+        _uyandir.wait(BEKLEME_ARALIGI)
+        _uyandir.clear()
+        try:
+            if sheet is None:
+                sheet = sheet_getir()
+                baslik = sheet.row_values(1)
+                if not baslik:
+                    sheet.append_row(BASLIK)
+                elif len(baslik) < KIMLIK_SUTUNU or not baslik[KIMLIK_SUTUNU - 1]:
+                    # Kimlik sütunu eklenmeden önce oluşturulmuş tablo
+                    sheet.update_cell(1, KIMLIK_SUTUNU, BASLIK[KIMLIK_SUTUNU - 1])
+                son_toparlama = None
+            # Çalışırken ölen diğer süreçlerin satırları da zaman aşımından sonra kurtarılır
+            if son_toparlama is None or time.monotonic() - son_toparlama >= SAHIPLIK_ZAMANASIMI:
+                _yarim_kalanlari_toparla(sheet)
+                son_toparlama = time.monotonic()
+            # Önce sonucu belirsiz kalan satırlar tabloda aranır, sonra bekleyenler yazılır
+            while True:
+                rows = _paket_al(BELIRSIZ)
+                if not rows:
+                    break
+                _tabloda_ara(sheet, rows, "Yazma sonucu belirsizdi; satır tabloda bulunamadı")
+            while True:
+                rows = _paket_al()
+                if not rows:
+                    break
+                _paketi_aktar(sheet, rows)
+        except Exception:
+            # Bağlantı koptuysa bir sonraki turda tablo yeniden açılır
+            sheet = None
+
+
+def baslat(sheet_getir):
+    """Süreç başına tek bir aktarıcı iş parçacığı başlatır."""
+    global _aktarici
+    with _kilit:
+        if _aktarici is not None and _aktarici.is_alive():
+            return
+        _aktarici = threading.Thread(target=_aktarici_dongusu, args=(sheet_getir,), name="sonuc-aktarici", daemon=True)
+        _aktarici.start()
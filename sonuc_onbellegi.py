@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import ortak_durum
+from yerel_depo import baglan
+
+# --- SONUÇ ÖNBELLEĞİ ---
+# Aynı ses kaydı (aynı konu, plan ve istem sürümüyle) tekrar gönderildiğinde
+# modele yeniden gidilmez. Anahtar içerik özetidir (SHA-256).
+# Önce bellekteki LRU'ya, sonra boyutu sınırlı yerel SQLite deposuna bakılır.
+# Ortak depo bu sürecin dışındaysa (birden çok sunucu süreci) sonuçlar ve kayıt işaretleri oraya da yazılır;
+# yerelde bulunamayan kayıt başka bir süreçte puanlanmış olabilir.
+
+DOSYA_ADI = "sonuc_onbellegi.db"
+BELLEK_KAPASITESI = 256          # kayıt
+DISK_KAPASITESI = 50 * 1024 ** 2  # bayt
+ORTAK_OMUR = 7 * 24 * 3600        # saniye; ortak depodaki kayıtların ömrü
+
+_kilit = threading.Lock()
+_bellek = OrderedDict()
+_conn = None
+
+
+def _baglanti():
+    global _conn
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS onbellek (
+                anahtar TEXT PRIMARY KEY,
+                sonuc TEXT,
+                boyut INTEGER,
+                son_erisim REAL
+            );
+            CREATE INDEX IF NOT EXISTS ix_onbellek_erisim ON onbellek (son_erisim);
+            CREATE TABLE IF NOT EXISTS kaydedilenler (
+                anahtar TEXT,
+                ogrenci TEXT,
+                PRIMARY KEY (anahtar, ogrenci)
+            );
+        """)
+        _conn.commit()
+    return _conn
+
+
+def _ortak_depo():
+    depo = ortak_durum.depo()
+    return depo if depo.uzak else None
+
+
+def anahtar_uret(audio_bytes, konu, detaylar, istem_surumu):
+    h = hashlib.sha256(audio_bytes)
+    h.update(b"\0")
+    h.update(json.dumps([konu, detaylar, istem_surumu], ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _bellege_koy(anahtar, sonuc):
+    _bellek[anahtar] = sonuc
+    _bellek.move_to_end(anahtar)
+    while len(_bellek) > BELLEK_KAPASITESI:
+        _bellek.popitem(last=False)
+
+
+def getir(anahtar):
+    with _kilit:
+        if anahtar in _bellek:
+            _bellek.move_to_end(anahtar)
+            return _bellek[anahtar]
+        conn = _baglanti()
+        row = conn.execute("SELECT sonuc FROM onbellek WHERE anahtar = ?", (anahtar,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE onbellek SET son_erisim = ? WHERE anahtar = ?", (time.time(), anahtar))
+            conn.commit()
+            sonuc = json.loads(row["sonuc"])
+            _bellege_koy(anahtar, sonuc)
+            return sonuc
+    depo = _ortak_depo()
+    metin = depo.getir(f"sonuc:{anahtar}") if depo else None
+    if metin is None:
+        return None
+    sonuc = json.loads(metin)
+    with _kilit:
+        _bellege_koy(anahtar, sonuc)
+    return sonuc
+
+
+def koy(anahtar, sonuc):
+    metin = json.dumps(sonuc, ensure_ascii=False)
+    with _kilit:
+        _bellege_koy(anahtar, sonuc)
+        conn = _baglanti()
+        conn.execute("INSERT OR REPLACE INTO onbellek VALUES (?, ?, ?, ?)", (anahtar, metin, len(metin.encode("utf-8")), time.time()))
+        # Disk sınırı aşıldıysa en uzun süredir kullanılmayanları sil
+        toplam = conn.execute("SELECT COALESCE(SUM(boyut), 0) FROM onbellek").fetchone()[0]
+        if toplam > DISK_KAPASITESI:
+            for row in conn.execute("SELECT anahtar, boyut FROM onbellek ORDER BY son_erisim").fetchall():
+                if toplam <= DISK_KAPASITESI:
+                    break
+                conn.execute("DELETE FROM onbellek WHERE anahtar = ?", (row["anahtar"],))
+                conn.execute("DELETE FROM kaydedilenler WHERE anahtar = ?", (row["anahtar"],))
+                toplam -= row["boyut"]
+        conn.commit()
+    depo = _ortak_depo()
+    if depo:
+        depo.koy(f"sonuc:{anahtar}", metin, ORTAK_OMUR)
+
+
+def kaydi_ayir(anahtar, ogrenci):
+    """
+    Kaydın bu öğrenci için kaydedildi işaretini atomik olarak alır. True dönerse satırı çağıran yazar;
+    yazamazsa kaydi_birak ile işareti geri bırakmalıdır. False: satır yazılmış veya şu an yazılıyor.
+    """
+    with _kilit:
+        conn = _baglanti()
+        cur = conn.execute("INSERT OR IGNORE INTO kaydedilenler VALUES (?, ?)", (anahtar, ogrenci))
+        conn.commit()
+    if cur.rowcount != 1:
+        return False
+    depo = _ortak_depo()
+    if depo is None:
+        return True
+    try:
+        # Başka bir süreç almışsa yerel işaret kalır; satırı o süreç yazar
+        return depo.koy_yoksa(f"kaydedildi:{anahtar}:{ogrenci}", "1", ORTAK_OMUR)
+    except BaseException:
+        kaydi_birak(anahtar, ogrenci, ortak=False)
+        raise
+
+
+def kaydi_birak(anahtar, ogrenci, ortak=True):
+    """kaydi_ayir ile alınan işareti, satır yazılamadığında geri bırakır."""
+    with _kilit:
+        conn = _baglanti()
+        conn.execute("DELETE FROM kaydedilenler WHERE anahtar = ? AND ogrenci = ?", (anahtar, ogrenci))
+        conn.commit()
+    depo = _ortak_depo() if ortak else None
+    if depo:
+        depo.sil(f"kaydedildi:{anahtar}:{ogrenci}")
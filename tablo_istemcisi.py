@@ -0,0 +1,21 @@
+from tembel_yukleme import tembel_modul
+
+# --- TABLO İSTEMCİSİ ---
+# Google Sheets erişimi (gspread + oauth2client) için cephe; kütüphaneler ilk bağlantıda yüklenir.
+
+KAPSAM = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+TABLO_ADI = "Sinav_Sonuclari"
+
+_gspread = tembel_modul("gspread")
+_servis_hesabi = tembel_modul("oauth2client.service_account")
+
+
+def kimlik_bilgisi(hesap_bilgisi):
+    """secrets içindeki gcp_service_account bölümünden kimlik bilgisi üretir."""
+    info = dict(hesap_bilgisi)
+    info["private_key"] = info["private_key"].replace("\\n", "\n")
+    return _servis_hesabi.ServiceAccountCredentials.from_json_keyfile_dict(info, KAPSAM)
+
+
+def sayfa_ac(creds, tablo_adi=TABLO_ADI):
+    return _gspread.authorize(creds).open(tablo_adi).sheet1
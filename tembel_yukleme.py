@@ -0,0 +1,37 @@
+import importlib
+import threading
+
+# --- TEMBEL YÜKLEME ---
+# Ağır kütüphaneler (pandas, Google SDK'ları, openpyxl) ilk kullanıldıkları anda içe aktarılır.
+# Giriş ekranını gören bir ziyaretçi için bu kütüphaneler hiç yüklenmez; ilk çizim beklemez.
+#
+#     pd = tembel_modul("pandas")
+#     pd.DataFrame(...)   # pandas burada yüklenir
+
+
+class TembelModul:
+    def __init__(self, ad):
+        self._ad = ad
+        self._modul = None
+        self._kilit = threading.Lock()
+
+    def _yukle(self):
+        if self._modul is None:
+            with self._kilit:
+                if self._modul is None:
+                    self._modul = importlib.import_module(self._ad)
+        return self._modul
+
+    @property
+    def yuklendi_mi(self):
+        return self._modul is not None
+
+    def __getattr__(self, ad):
+        return getattr(self._yukle(), ad)
+
+    def __repr__(self):
+        return f"<tembel modül {self._ad} ({'yüklü' if self._modul is not None else 'yüklenmedi'})>"
+
+
+def tembel_modul(ad):
+    return TembelModul(ad)
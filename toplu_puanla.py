@@ -0,0 +1,197 @@
+"""
+Önceden kaydedilmiş konuşmaları toplu olarak puanlar.
+
+    python toplu_puanla.py KAYIT_KLASORU liste.csv [--is-sayisi 4]
+
+liste.csv sütunları: Dosya, Ad Soyad, Sınıf, Okul No, Konu
+(Dosya, KAYIT_KLASORU içindeki ses dosyasının adıdır.)
+
+Puanlanan her dosya KAYIT_KLASORU/.toplu_puanla.jsonl dosyasına işlenir; yarıda kalan bir çalıştırma
+aynı komutla devam ettirildiğinde bu dosyalar tekrar puanlanmaz. Sonuçlar yerel sonuç günlüğü
+üzerinden append_rows ile toplu olarak 'Sinav_Sonuclari' tablosuna yazılır.
+
+Komut, çalışan uygulamanın günlüğüne karışmamak için kendi veri klasörünü kullanır
+(--veri-klasoru, varsayılan .yerel_veri_toplu). Tabloya aktarılamadan kalan satırlar aynı komut
+tekrar çalıştırıldığında aktarılır. Gemini kotasının uygulamayla paylaşılması için ORTAK_DEPO
+iki tarafta da aynı ortak depoyu göstermelidir (ör. sqlite:////yol/ortak.db).
+
+API anahtarı ve servis hesabı GOOGLE_API_KEY ortam değişkeninden veya .streamlit/secrets.toml dosyasından okunur.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+import gemini_istemcisi
+import konu_katalogu
+import puanlama
+import sonuc_kuyrugu
+import sonuc_onbellegi
+import tablo_istemcisi
+import yerel_depo
+
+KONTROL_NOKTASI = ".toplu_puanla.jsonl"
+MANIFEST_SUTUNLARI = ["Dosya", "Ad Soyad", "Sınıf", "Okul No", "Konu"]
+
+
+def sirlari_oku(yol=".streamlit/secrets.toml"):
+    try:
+        with open(yol, "rb") as f:
+            return tomllib.load(f)
+    except OSError:
+        return {}
+
+
+def sheet_getirici(sirlar):
+    def get_sheet():
+        return tablo_istemcisi.sayfa_ac(tablo_istemcisi.kimlik_bilgisi(sirlar["gcp_service_account"]))
+    return get_sheet
+
+
+def manifest_oku(yol):
+    with open(yol, encoding="utf-8-sig", newline="") as f:
+        okuyucu = csv.DictReader(f)
+        eksik = [s for s in MANIFEST_SUTUNLARI if s not in (okuyucu.fieldnames or [])]
+        if eksik:
+            raise SystemExit(f"Listede eksik sütun(lar): {', '.join(eksik)}")
+        return [{k: (v or "").strip() for k, v in satir.items()} for satir in okuyucu]
+
+
+def tamamlananlari_oku(klasor):
+    tamamlanan = set()
+    try:
+        with open(os.path.join(klasor, KONTROL_NOKTASI), encoding="utf-8") as f:
+            for satir in f:
+                if satir.strip():
+                    tamamlanan.add(json.loads(satir)["dosya"])
+    except OSError:
+        pass
+    return tamamlanan
+
+
+class KontrolNoktasi:
+    def __init__(self, klasor):
+        self.yol = os.path.join(klasor, KONTROL_NOKTASI)
+        self.kilit = threading.Lock()
+
+    def isle(self, kayit):
+        with self.kilit, open(self.yol, "a", encoding="utf-8") as f:
+            f.write(json.dumps(kayit, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def puanla(klasor, ogrenci, konular):
+    """Tek dosyayı puanlar ve sonucu günlüğe ekler. Dönüş: (süre, sonuç)."""
+    with open(os.path.join(klasor, ogrenci["Dosya"]), "rb") as f:
+        veri = f.read()
+    baslangic = time.perf_counter()
+    sonuc, anahtar, _ = puanlama.onbellekli_analiz_et(veri, ogrenci["Konu"], konular.get(ogrenci["Konu"], {}), oturum="toplu")
+    sure = time.perf_counter() - baslangic
+    # Kontrol noktası yazılmadan kesilen bir çalıştırmada satır zaten günlüğe eklenmiş olabilir
+    kimlik = f"{ogrenci['Sınıf']}|{ogrenci['Okul No']}"
+    if "hata" not in sonuc and sonuc_onbellegi.kaydi_ayir(anahtar, kimlik):
+        try:
+            sonuc_kuyrugu.ekle(puanlama.sonuc_satiri(
+                ogrenci["Ad Soyad"], ogrenci["Sınıf"], ogrenci["Okul No"], ogrenci["Konu"], sonuc,
+                datetime.now().strftime("%Y-%m-%d %H:%M")
+            ))
+        except Exception:
+            sonuc_onbellegi.kaydi_birak(anahtar, kimlik)
+            raise
+    return sure, sonuc
+
+
+def aktarimi_bekle(zaman_asimi):
+    """Günlükteki bekleyen satırlar tabloya aktarılana kadar bekler."""
+    bitis = time.time() + zaman_asimi
+    while time.time() < bitis:
+        ozet = sonuc_kuyrugu.durum_ozeti()
+        if ozet["bekliyor"] + ozet["yaziliyor"] + ozet["belirsiz"] == 0:
+            return True
+        time.sleep(1)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("klasor", help="ses dosyalarının bulunduğu klasör")
+    parser.add_argument("liste", help="öğrenci listesi (CSV)")
+    parser.add_argument("--is-sayisi", type=int, default=4, help="aynı anda puanlanacak dosya sayısı")
+    parser.add_argument("--konular", default="konusma_konulari.xlsx", help="konu çalışma kitabı")
+    parser.add_argument("--aktarim-bekleme", type=int, default=300, help="tabloya aktarım için en fazla beklenecek saniye")
+    parser.add_argument("--veri-klasoru", default=".yerel_veri_toplu", help="sonuç günlüğü ve yerel önbelleklerin klasörü")
+    args = parser.parse_args()
+    # Yerel veritabanlarına ilk kullanımda bağlanılır; klasör ondan önce ayarlanmalı
+    yerel_depo.VERI_KLASORU = args.veri_klasoru
+
+    sirlar = sirlari_oku()
+    api_key = os.environ.get("GOOGLE_API_KEY") or sirlar.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise SystemExit("GOOGLE_API_KEY bulunamadı.")
+    gemini_istemcisi.configure(api_key=api_key)
+
+    konular = konu_katalogu.katalog_yukle(args.konular)
+    ogrenciler = manifest_oku(args.liste)
+    tamamlanan = tamamlananlari_oku(args.klasor)
+    bekleyen = [o for o in ogrenciler if o["Dosya"] not in tamamlanan]
+    bilinmeyen = sorted({o["Konu"] for o in bekleyen if o["Konu"] not in konular})
+    if bilinmeyen:
+        print(f"Uyarı: katalogda olmayan konu(lar): {', '.join(bilinmeyen)}", file=sys.stderr)
+    print(f"{len(ogrenciler)} kayıt, {len(ogrenciler) - len(bekleyen)} tanesi önceki çalıştırmada tamamlanmış.")
+
+    if "gcp_service_account" in sirlar:
+        sonuc_kuyrugu.baslat(sheet_getirici(sirlar))
+    else:
+        print("Uyarı: servis hesabı bulunamadı; sonuçlar yerel günlükte bekleyecek.", file=sys.stderr)
+
+    kontrol = KontrolNoktasi(args.klasor)
+    sureler, hatalar = [], []
+    baslangic = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.is_sayisi) as havuz:
+        gorevler = {havuz.submit(puanla, args.klasor, o, konular): o for o in bekleyen}
+        for i, gorev in enumerate(as_completed(gorevler), start=1):
+            ogrenci = gorevler[gorev]
+            try:
+                sure, sonuc = gorev.result()
+            except Exception as e:
+                hatalar.append((ogrenci["Dosya"], str(e)))
+                print(f"[{i}/{len(bekleyen)}] {ogrenci['Dosya']}: HATA {e}")
+                continue
+            if "hata" in sonuc:
+                # Yedek sonuç kaydedilmez; sonraki çalıştırmada tekrar denenir
+                hatalar.append((ogrenci["Dosya"], sonuc["hata"]))
+                print(f"[{i}/{len(bekleyen)}] {ogrenci['Dosya']}: HATA {sonuc['hata']}")
+                continue
+            sureler.append(sure)
+            kontrol.isle({"dosya": ogrenci["Dosya"], "puan": sonuc.get("yuzluk_sistem_puani"), "sure": round(sure, 2)})
+            print(f"[{i}/{len(bekleyen)}] {ogrenci['Dosya']}: {sonuc.get('yuzluk_sistem_puani')} ({sure:.1f} sn)")
+    toplam = time.perf_counter() - baslangic
+
+    if "gcp_service_account" in sirlar:
+        print("Tabloya aktarım bekleniyor...")
+        if not aktarimi_bekle(args.aktarim_bekleme):
+            print("Uyarı: bazı sonuçlar henüz tabloya aktarılmadı; komut tekrar çalıştırıldığında aktarılacak.", file=sys.stderr)
+
+    print("\n--- ÖZET ---")
+    print(f"Puanlanan: {len(sureler)}  Hatalı: {len(hatalar)}  Atlanan: {len(ogrenciler) - len(bekleyen)}")
+    if sureler:
+        p50, p95 = np.percentile(sureler, [50, 95])
+        print(f"Toplam süre: {toplam:.1f} sn  Verim: {len(sureler) / toplam * 60:.1f} kayıt/dk")
+        print(f"Kayıt başına süre: p50 {p50:.1f} sn, p95 {p95:.1f} sn (iş sayısı {args.is_sayisi})")
+    for dosya, hata in hatalar:
+        print(f"  {dosya}: {hata}")
+    if hatalar:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import hashlib
+import threading
+import time
+
+from yerel_depo import baglan
+
+# --- TRANSKRİPT DEPOSU ---
+# İki aşamalı puanlamada (önce transkript, sonra puan) sesten çıkarılan transkriptler.
+# Anahtar ses içeriğinin özeti ve transkript istem sürümüdür; konu, plan veya puanlama istemi
+# değişse bile aynı kayıt tekrar geldiğinde ses yeniden yüklenmez, sadece metin puanlanır.
+
+DOSYA_ADI = "transkriptler.db"
+
+_kilit = threading.Lock()
+_conn = None
+
+
+def _baglanti():
+    global _conn
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS transkriptler (
+                anahtar TEXT PRIMARY KEY,
+                transkript TEXT,
+                zaman REAL
+            );
+        """)
+        _conn.commit()
+    return _conn
+
+
+def anahtar_uret(audio_bytes, surum):
+    h = hashlib.sha256(audio_bytes)
+    h.update(b"\0")
+    h.update(str(surum).encode("utf-8"))
+    return h.hexdigest()
+
+
+def getir(anahtar):
+    with _kilit:
+        row = _baglanti().execute("SELECT transkript FROM transkriptler WHERE anahtar = ?", (anahtar,)).fetchone()
+    return row["transkript"] if row else None
+
+
+def koy(anahtar, transkript):
+    with _kilit:
+        conn = _baglanti()
+        conn.execute("INSERT OR REPLACE INTO transkriptler VALUES (?, ?, ?)", (anahtar, transkript, time.time()))
+        conn.commit()
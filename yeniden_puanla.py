@@ -0,0 +1,197 @@
+"""
+Saklanan transkriptleri ses kaydı olmadan yeniden puanlar (istem veya kriterler değiştiğinde).
+
+    python yeniden_puanla.py --sinif 5/C [--konu "Teknoloji"] [--grup 15] [--cikti 5C.csv]
+
+Transkriptler sonuç indeksinden ('Sinav_Sonuclari' tablosunun yerel kopyası) okunur; servis hesabı
+varsa önce tabloyla senkronize edilir. Aynı konudaki transkriptler --grup kadarlık gruplar halinde
+tek istekte gönderilir ve her öğrenci için ayrı sonuç alınır (puanlama.transkriptleri_puanla).
+
+Sonuçlar puanlama.PUANLAMA_SURUMU etiketiyle yerel yeniden_puanlama.db'ye yazılır; bu sürümle
+puanlanmış satırlar tekrar gönderilmez, yarıda kalan bir çalıştırma aynı komutla devam ettirilir.
+Tablodaki mevcut sonuçlar değiştirilmez; --cikti ile eski ve yeni puanlar CSV olarak alınır.
+
+API anahtarı ve servis hesabı GOOGLE_API_KEY ortam değişkeninden veya .streamlit/secrets.toml dosyasından okunur.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import gemini_istemcisi
+import konu_katalogu
+import puanlama
+import sonuc_indeksi
+from toplu_puanla import sheet_getirici, sirlari_oku
+from yerel_depo import baglan
+
+DOSYA_ADI = "yeniden_puanlama.db"
+GRUP_BOYUTU = 15
+CIKTI_SUTUNLARI = [
+    "Satır", "Ad Soyad", "Sınıf", "Okul No", "Konu", "Eski Puan", "Yeni Puan",
+    "İçerik", "Düzen", "Dil", "Akıcılık", "Öğretmen Yorumu", "İstem Sürümü",
+]
+
+_kilit = threading.Lock()
+_conn = None
+
+
+def _baglanti():
+    global _conn
+    if _conn is None:
+        _conn = baglan(DOSYA_ADI)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sonuclar (
+                satir INTEGER,
+                istem_surumu TEXT,
+                sinif TEXT,
+                okul_no TEXT,
+                ad_soyad TEXT,
+                konu TEXT,
+                eski_puan REAL,
+                sonuc TEXT,
+                zaman REAL,
+                PRIMARY KEY (satir, istem_surumu)
+            );
+        """)
+        _conn.commit()
+    return _conn
+
+
+def tamamlananlar(surum):
+    with _kilit:
+        return {r["satir"] for r in _baglanti().execute("SELECT satir FROM sonuclar WHERE istem_surumu = ?", (surum,))}
+
+
+def sonuc_yaz(kayit, sonuc):
+    with _kilit:
+        conn = _baglanti()
+        conn.execute(
+            "INSERT OR REPLACE INTO sonuclar VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (kayit["satir"], sonuc["istem_surumu"], kayit["sinif"], kayit["okul_no"], kayit["ad_soyad"],
+             kayit["konu"], kayit["puan_sayi"], json.dumps(sonuc, ensure_ascii=False), time.time())
+        )
+        conn.commit()
+
+
+def puanlanacaklar(sinif=None, konu=None):
+    """İndeksteki transkriptli kayıtlar; boş ve puanlama hatası yedeği olan satırlar atlanır."""
+    for kayit in sonuc_indeksi.disa_aktarim_satirlari(transkript=True, sinif=sinif, konu=konu):
+        metin = (kayit["transkript"] or "").strip()
+        if metin and not metin.startswith("Sistem Hatası"):
+            yield kayit
+
+
+def gruplara_ayir(kayitlar, boyut):
+    """Aynı konudaki kayıtları en fazla boyut kadarlık gruplara böler (istem konu ve plana göre değişir)."""
+    konular = {}
+    for kayit in kayitlar:
+        konular.setdefault(kayit["konu"], []).append(kayit)
+    return [(konu, liste[i:i + boyut]) for konu, liste in konular.items() for i in range(0, len(liste), boyut)]
+
+
+def grubu_puanla(konu, grup, konular):
+    """Bir grubu tek istekle puanlar ve gelen sonuçları yazar. Dönüş: puanlanan kayıt sayısı."""
+    sonuclar = puanlama.transkriptleri_puanla(
+        [(kayit["satir"], kayit["transkript"]) for kayit in grup], konu, konular.get(konu, {}), oturum="yeniden_puanlama"
+    )
+    for kayit in grup:
+        sonuc = sonuclar.get(str(kayit["satir"]))
+        if sonuc is not None:
+            sonuc_yaz(kayit, sonuc)
+    return len(sonuclar)
+
+
+def cikti_yaz(yol, surum, sinif=None, konu=None):
+    kosullar, parametreler = ["istem_surumu = ?"], [surum]
+    if sinif:
+        kosullar.append("sinif = ?")
+        parametreler.append(sinif)
+    if konu:
+        kosullar.append("konu = ?")
+        parametreler.append(konu)
+    with _kilit:
+        rows = _baglanti().execute(
+            f"SELECT * FROM sonuclar WHERE {' AND '.join(kosullar)} ORDER BY sinif, CAST(okul_no AS INTEGER), satir",
+            parametreler
+        ).fetchall()
+    with open(yol, "w", encoding="utf-8-sig", newline="") as f:
+        yazici = csv.writer(f)
+        yazici.writerow(CIKTI_SUTUNLARI)
+        for r in rows:
+            sonuc = json.loads(r["sonuc"])
+            kp = sonuc["kriter_puanlari"]
+            yazici.writerow([
+                r["satir"], r["ad_soyad"], r["sinif"], r["okul_no"], r["konu"], r["eski_puan"],
+                sonuc["yuzluk_sistem_puani"], kp["konu_icerik"], kp["duzen"], kp["dil"], kp["akicilik"],
+                sonuc["ogretmen_yorumu"], r["istem_surumu"],
+            ])
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sinif", help="sadece bu sınıf")
+    parser.add_argument("--konu", help="sadece bu konu")
+    parser.add_argument("--grup", type=int, default=GRUP_BOYUTU, help="bir istekte gönderilecek transkript sayısı")
+    parser.add_argument("--is-sayisi", type=int, default=2, help="aynı anda gönderilecek istek sayısı")
+    parser.add_argument("--konular", default="konusma_konulari.xlsx", help="konu çalışma kitabı")
+    parser.add_argument("--cikti", help="eski ve yeni puanların yazılacağı CSV dosyası")
+    args = parser.parse_args()
+
+    sirlar = sirlari_oku()
+    api_key = os.environ.get("GOOGLE_API_KEY") or sirlar.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise SystemExit("GOOGLE_API_KEY bulunamadı.")
+    gemini_istemcisi.configure(api_key=api_key)
+
+    if "gcp_service_account" in sirlar:
+        sonuc_indeksi.senkronize_et(sheet_getirici(sirlar), zorla=True)
+    else:
+        print("Uyarı: servis hesabı bulunamadı; yerel indeksteki kayıtlar kullanılacak.", file=sys.stderr)
+
+    surum = puanlama.PUANLAMA_SURUMU
+    konular = konu_katalogu.katalog_yukle(args.konular)
+    kayitlar = list(puanlanacaklar(args.sinif, args.konu))
+    onceki = tamamlananlar(surum)
+    bekleyen = [k for k in kayitlar if k["satir"] not in onceki]
+    gruplar = gruplara_ayir(bekleyen, max(1, args.grup))
+    print(f"{len(kayitlar)} transkript, {len(kayitlar) - len(bekleyen)} tanesi '{surum}' sürümüyle önceden puanlanmış; "
+          f"{len(bekleyen)} kayıt {len(gruplar)} istekte gönderilecek.")
+
+    puanlanan, hatalar = 0, []
+    baslangic = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.is_sayisi) as havuz:
+        gorevler = {havuz.submit(grubu_puanla, konu, grup, konular): (konu, grup) for konu, grup in gruplar}
+        for i, gorev in enumerate(as_completed(gorevler), start=1):
+            konu, grup = gorevler[gorev]
+            try:
+                adet = gorev.result()
+            except Exception as e:
+                hatalar.append((konu, len(grup), str(e)))
+                print(f"[{i}/{len(gruplar)}] {konu}: HATA {e}")
+                continue
+            puanlanan += adet
+            if adet < len(grup):
+                hatalar.append((konu, len(grup) - adet, "modelden geçerli sonuç alınamadı"))
+            print(f"[{i}/{len(gruplar)}] {konu}: {adet}/{len(grup)} kayıt")
+    toplam = time.perf_counter() - baslangic
+
+    print("\n--- ÖZET ---")
+    print(f"Puanlanan: {puanlanan}  Alınamayan: {sum(h[1] for h in hatalar)}  Atlanan: {len(kayitlar) - len(bekleyen)}")
+    if puanlanan:
+        print(f"Toplam süre: {toplam:.1f} sn  Verim: {puanlanan / toplam * 60:.1f} kayıt/dk")
+    if args.cikti:
+        print(f"{cikti_yaz(args.cikti, surum, args.sinif, args.konu)} satır {args.cikti} dosyasına yazıldı.")
+    for konu, adet, hata in hatalar:
+        print(f"  {konu} ({adet} kayıt): {hata}")
+    if hatalar:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+
+# --- YEREL VERİ KLASÖRÜ ---
+# Google Sheets'e gitmeden hızlı okuma yapabilmek için tutulan yerel SQLite dosyaları burada durur.
+VERI_KLASORU = os.environ.get("KONUSMA_VERI_KLASORU", ".yerel_veri")
+
+
+def veri_yolu(dosya_adi):
+    os.makedirs(VERI_KLASORU, exist_ok=True)
+    return os.path.join(VERI_KLASORU, dosya_adi)
+
+
+def baglan(dosya_adi):
+    """
+    Yerel SQLite dosyasına bağlanır.
+    Birden fazla Streamlit oturumu aynı dosyayı kullandığı için WAL modu açılır.
+    """
+    conn = sqlite3.connect(veri_yolu(dosya_adi), timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn